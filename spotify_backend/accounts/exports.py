@@ -0,0 +1,61 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from music.streaming import streaming_response
+
+# Cột trả về cho admin; password và các cột không dùng không bao giờ được đọc
+USER_LIST_FIELDS = ('id', 'username', 'email', 'is_superuser', 'is_premium', 'profile_picture', 'gender', 'date_of_birth')
+USER_EXPORT_FIELDS = USER_LIST_FIELDS + ('is_staff', 'is_active', 'date_joined', 'last_login')
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """ File-like object for csv.writer that hands back each line instead of buffering it """
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _jsonl_lines(rows, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    chunk = []
+    for row in rows:
+        chunk.append(encoder.encode(dict(zip(fields, row))) + '\n')
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_export(request, queryset, fields, output, filename):
+    """
+    Stream ``fields`` of every row of ``queryset`` as CSV or JSON Lines.
+    Rows come from ``values_list().iterator()``, a server-side cursor on
+    PostgreSQL, and are written out one chunk at a time, so memory stays
+    flat however many rows there are, under WSGI and ASGI alike.
+    """
+    rows = queryset.values_list(*fields).order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    lines = _csv_lines(rows, fields) if output == 'csv' else _jsonl_lines(rows, fields)
+    response = streaming_response(request, lines, content_type=FORMATS[output])
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (filename, output)
+    return response
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_principal(sender, instance, **kwargs):
+    # Hồ sơ, is_premium, is_staff... thay đổi thì request sau phải đọc lại từ DB
+    forget_user(instance.pk)
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import UserRegistrationView, CustomTokenObtainPairView, GetAllUserView, GetUserByIdView, UserProfileView
+from .views import UserRegistrationView, CustomTokenObtainPairView, GetAllUserView, UserExportView, GetUserByIdView, UserProfileView
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('users/', GetAllUserView.as_view(), name='get_all_user'),
+    path('users/export/', UserExportView.as_view(), name='user-export'),
     path('user/<int:pk>', GetUserByIdView.as_view(), name='get_user_by_id'),
     path('me/', UserProfileView.as_view(), name='user-profile')
 ]
\ No newline at end of file
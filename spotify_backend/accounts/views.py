@@ -9,6 +9,8 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from .permissions import IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
+from music.pagination import KeysetPagination
+from .exports import FORMATS as EXPORT_FORMATS, USER_EXPORT_FIELDS, USER_LIST_FIELDS, stream_export
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -75,9 +77,74 @@ class UserRegistrationView(generics.CreateAPIView):
         )
 
 class GetAllUserView(generics.ListAPIView):
-    queryset = CustomUser.objects.all()
-    serializer_class = UserRegistrationSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = 'id'
+
+    def get_queryset(self):
+        # Chỉ đọc các cột cần trả về, không dựng model (và không đọc password)
+        return CustomUser.objects.values(*USER_LIST_FIELDS)
+
+    @swagger_auto_schema(
+        operation_description="List users (admin only), ordered by id",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Users per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of users",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {
+                                "id": 1,
+                                "username": "testuser",
+                                "email": "testuser@example.com",
+                                "is_superuser": False,
+                                "is_premium": False,
+                                "profile_picture": None,
+                                "gender": "M",
+                                "date_of_birth": "2000-01-01"
+                            }
+                        ],
+                        "next": "eyJrIjoxLCJpIjoxLCJkIjoibiJ9",
+                        "prev": None
+                    }
+                }
+            ),
+            401: openapi.Response(description="Unauthorized"),
+            403: openapi.Response(description="Forbidden")
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(page)
+
+class UserExportView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Export every user (admin only) as a streamed CSV or JSON Lines file",
+        manual_parameters=[
+            openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS), default='csv', description="File format"),
+        ],
+        responses={
+            200: openapi.Response(description="Streamed file"),
+            400: openapi.Response(description="Unsupported format"),
+            401: openapi.Response(description="Unauthorized"),
+            403: openapi.Response(description="Forbidden")
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"status": "error", "message": f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return stream_export(request._request, CustomUser.objects.all(), USER_EXPORT_FIELDS, output, 'users')
 
 class GetUserByIdView(generics.RetrieveAPIView):
     queryset = CustomUser.objects.all()
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from .persistence import chat_write_buffer
+
+MAX_MESSAGE_LENGTH = getattr(settings, 'CHAT_MAX_MESSAGE_LENGTH', 4000)
+
+
+def user_group(user_id):
+    return 'chat.user.%s' % user_id
+
+
+@database_sync_to_async
+def _existing_user_ids(user_ids):
+    return set(CustomUser.objects.filter(pk__in=user_ids, is_active=True).values_list('pk', flat=True))
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    One socket per connected client. Every user listens on their own group,
+    so a message goes to the receiver's devices and the sender's other
+    devices with two ``group_send`` calls. Persistence goes through
+    ``chat_write_buffer`` and never blocks a frame on the database.
+
+    Client frames:
+        {"type": "message", "to": <user id>, "message": "...", "client_id": "..."}
+        {"type": "read", "from": <user id>, "until": "<timestamp of the last message seen>"}
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.user_id = user.pk
+        self.group = user_group(self.user_id)
+        # ID người nhận đã kiểm tra, để mỗi cuộc trò chuyện chỉ tốn 1 query
+        self.known_partners = set()
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if not isinstance(content, dict):
+            await self.send_error("Dữ liệu không hợp lệ")
+            return
+        kind = content.get('type')
+        if kind == 'message':
+            await self.handle_message(content)
+        elif kind == 'read':
+            await self.handle_read(content)
+        else:
+            await self.send_error(f"Loại tin không hỗ trợ: {kind}")
+
+    async def handle_message(self, content):
+        receiver_id = content.get('to')
+        text = content.get('message')
+        if isinstance(receiver_id, bool) or not isinstance(receiver_id, int):
+            await self.send_error("Người nhận không hợp lệ", content)
+            return
+        if not isinstance(text, str) or not text.strip():
+            await self.send_error("Tin nhắn không được để trống", content)
+            return
+        if len(text) > MAX_MESSAGE_LENGTH:
+            await self.send_error(f"Tin nhắn dài tối đa {MAX_MESSAGE_LENGTH} ký tự", content)
+            return
+        if receiver_id not in self.known_partners:
+            if receiver_id not in await _existing_user_ids([receiver_id]):
+                await self.send_error("Người nhận không tồn tại", content)
+                return
+            self.known_partners.add(receiver_id)
+
+        timestamp = timezone.now()
+        chat_write_buffer.add_message(self.user_id, receiver_id, text, timestamp)
+        event = {
+            'type': 'chat.message',
+            'from': self.user_id,
+            'to': receiver_id,
+            'message': text,
+            'timestamp': timestamp.isoformat(),
+            'client_id': content.get('client_id'),
+        }
+        await self.channel_layer.group_send(user_group(receiver_id), event)
+        if receiver_id != self.user_id:
+            await self.channel_layer.group_send(self.group, event)
+
+    async def handle_read(self, content):
+        partner_id = content.get('from')
+        try:
+            until = datetime.fromisoformat(content.get('until'))
+        except (TypeError, ValueError):
+            await self.send_error("Thời điểm 'until' không hợp lệ", content)
+            return
+        if isinstance(partner_id, bool) or not isinstance(partner_id, int):
+            await self.send_error("Người gửi không hợp lệ", content)
+            return
+        if timezone.is_naive(until):
+            until = timezone.make_aware(until)
+
+        chat_write_buffer.add_read(self.user_id, partner_id, until)
+        await self.channel_layer.group_send(user_group(partner_id), {
+            'type': 'chat.read',
+            'by': self.user_id,
+            'until': until.isoformat(),
+        })
+
+    async def chat_message(self, event):
+        await self.send_json({
+            'type': 'message',
+            'from': event['from'],
+            'to': event['to'],
+            'message': event['message'],
+            'timestamp': event['timestamp'],
+            'client_id': event['client_id'],
+        })
+
+    async def chat_read(self, event):
+        await self.send_json({'type': 'read', 'by': event['by'], 'until': event['until']})
+
+    async def send_error(self, message, content=None):
+        payload = {'type': 'error', 'message': message}
+        if isinstance(content, dict) and content.get('client_id') is not None:
+            payload['client_id'] = content['client_id']
+        await self.send_json(payload)
@@ -0,0 +1,83 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import ChatMessage, Conversation
+
+
+def _pairs_filter(pairs):
+    return reduce(or_, (Q(owner_id=owner, partner_id=partner) for owner, partner in pairs))
+
+
+def record_messages(messages):
+    """
+    Fold a batch of saved messages into the Conversation rows of both sides:
+    one INSERT of the missing pairs, one SELECT ... FOR UPDATE and one UPDATE
+    for the whole batch. The receiver's ``unread_count`` grows by the
+    messages in the batch.
+    """
+    latest = {}
+    unread = Counter()
+    for message in messages:
+        for pair in {(message.sender_id, message.receiver_id), (message.receiver_id, message.sender_id)}:
+            current = latest.get(pair)
+            if current is None or (message.timestap, message.pk) > (current.timestap, current.pk):
+                latest[pair] = message
+        unread[(message.receiver_id, message.sender_id)] += 1
+
+    # Tạo trước các cặp chưa có để FOR UPDATE khoá được cả chúng: lô của process
+    # khác ghi cùng cặp sẽ chờ rồi cộng tiếp, không ghi đè unread_count của nhau
+    Conversation.objects.bulk_create(
+        [
+            Conversation(owner_id=owner, partner_id=partner, last_message_at=latest[(owner, partner)].timestap)
+            for owner, partner in sorted(latest)
+        ],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    rows = list(Conversation.objects.select_for_update().filter(_pairs_filter(latest)).order_by('pk'))
+    for row in rows:
+        message = latest[(row.owner_id, row.partner_id)]
+        # Lô của process khác có thể đã ghi tin mới hơn
+        if row.last_message_id is None or message.timestap >= row.last_message_at:
+            row.last_message_id = message.pk
+            row.last_message_at = message.timestap
+        row.unread_count += unread[(row.owner_id, row.partner_id)]
+    Conversation.objects.bulk_update(rows, ['last_message', 'last_message_at', 'unread_count'], batch_size=1000)
+
+
+def refresh_unread(pairs):
+    """ Recount ``unread_count`` of the given (owner, partner) rows with one UPDATE """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    unread = (
+        ChatMessage.objects.filter(receiver_id=OuterRef('owner_id'), sender_id=OuterRef('partner_id'), is_read=False)
+        .order_by().values('receiver_id').annotate(total=Count('id')).values('total')
+    )
+    Conversation.objects.filter(_pairs_filter(pairs)).update(unread_count=Coalesce(Subquery(unread), Value(0)))
+
+
+def mark_read(reader_id, partner_id, until=None):
+    """
+    Mark every message from ``partner_id`` to ``reader_id`` (sent up to
+    ``until`` if given) as read in one UPDATE; returns the number marked.
+    """
+    messages = ChatMessage.objects.filter(receiver_id=reader_id, sender_id=partner_id, is_read=False)
+    if until is not None:
+        messages = messages.filter(timestap__lte=until)
+    with transaction.atomic():
+        updated = messages.update(is_read=True)
+        if updated:
+            refresh_unread([(reader_id, partner_id)])
+    return updated
+
+
+def conversation_messages(user_id, partner_id):
+    """ Both directions of a conversation; each branch is a range on ``chat_msg_pair_time_idx`` """
+    return ChatMessage.objects.filter(
+        Q(sender_id=user_id, receiver_id=partner_id) | Q(sender_id=partner_id, receiver_id=user_id)
+    )
@@ -0,0 +1,124 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser
+from chat import persistence
+from chat.models import ChatMessage, Conversation
+from spotify_backend.asgi import application
+
+
+class Command(BaseCommand):
+    help = 'Load-test the chat WebSocket consumer with many concurrent sockets (uses the configured channel layer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', default=200, type=int, help='Number of concurrent sockets')
+        parser.add_argument('--users', default=50, type=int, help='Distinct users the sockets are spread over')
+        parser.add_argument('--messages', default=20, type=int, help='Messages sent by each socket')
+        parser.add_argument('--seed', default=42, type=int, help='Random seed')
+        parser.add_argument('--timeout', default=30.0, type=float, help='Seconds to wait for deliveries')
+        parser.add_argument('--keep', action='store_true', help='Keep the messages written by the run')
+
+    def handle(self, *args, **options):
+        users = list(CustomUser.objects.filter(is_active=True).order_by('id')[:options['users']])
+        if len(users) < 2:
+            raise CommandError('Cần ít nhất 2 người dùng (chạy seed_data trước).')
+        marker = 'bench_chat:%s:' % uuid.uuid4().hex[:8]
+        # Ảnh chụp các cuộc trò chuyện sẵn có giữa những người dùng này để trả lại sau khi chạy
+        among = Conversation.objects.filter(owner__in=users, partner__in=users)
+        snapshot = list(among.only('id', 'last_message', 'last_message_at', 'unread_count'))
+
+        batches = []
+        original = persistence.write_chat_batch
+
+        def counting_write(messages, reads):
+            batches.append(len(messages))
+            return original(messages, reads)
+
+        persistence.write_chat_batch = counting_write
+        try:
+            stats = asyncio.run(self.run(users, marker, options))
+            persistence.chat_write_buffer.flush()
+        finally:
+            persistence.write_chat_batch = original
+
+        written = ChatMessage.objects.filter(message__startswith=marker).count()
+        if not options['keep']:
+            with transaction.atomic():
+                ChatMessage.objects.filter(message__startswith=marker).delete()
+                among.exclude(pk__in=[row.pk for row in snapshot]).delete()
+                Conversation.objects.bulk_update(
+                    snapshot, ['last_message', 'last_message_at', 'unread_count'], batch_size=1000,
+                )
+
+        sent, delivered, expected, elapsed = stats
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["sockets"]} sockets, {sent} tin nhắn trong {elapsed:.2f}s: {sent / elapsed:,.0f} msg/s, '
+            f'{delivered}/{expected} frame đã giao, {written} dòng ghi bằng {len(batches)} lần INSERT'
+        ))
+
+    async def run(self, users, marker, options):
+        rng = random.Random(options['seed'])
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in users}
+        owners = [users[i % len(users)].pk for i in range(options['sockets'])]
+        sockets_per_user = Counter(owners)
+
+        sockets = [WebsocketCommunicator(application, f'/ws/chat/?token={tokens[owner]}') for owner in owners]
+        results = await asyncio.gather(*(socket.connect() for socket in sockets))
+        if not all(connected for connected, _ in results):
+            raise CommandError('Không mở được WebSocket (kiểm tra token/channel layer).')
+
+        # Mỗi tin nhắn tới mọi socket của người nhận và mọi socket của người gửi (kể cả socket gửi, làm ack)
+        plan = []
+        expected = 0
+        for owner in owners:
+            frames = []
+            for _ in range(options['messages']):
+                receiver = rng.choice(users).pk
+                while receiver == owner:
+                    receiver = rng.choice(users).pk
+                frames.append(receiver)
+                expected += sockets_per_user[receiver] + sockets_per_user[owner]
+            plan.append(frames)
+
+        delivered = 0
+        done = asyncio.Event()
+
+        async def reader(socket):
+            nonlocal delivered
+            while True:
+                try:
+                    frame = await socket.receive_json_from(timeout=options['timeout'])
+                except asyncio.TimeoutError:
+                    return
+                if frame.get('type') == 'message':
+                    delivered += 1
+                    if delivered >= expected:
+                        done.set()
+
+        async def writer(socket, frames, index):
+            for n, receiver in enumerate(frames):
+                await socket.send_json_to({
+                    'type': 'message', 'to': receiver, 'message': f'{marker}{index}:{n}', 'client_id': f'{index}:{n}',
+                })
+
+        readers = [asyncio.create_task(reader(socket)) for socket in sockets]
+        started = time.perf_counter()
+        await asyncio.gather(*(writer(socket, frames, i) for i, (socket, frames) in enumerate(zip(sockets, plan))))
+        try:
+            await asyncio.wait_for(done.wait(), options['timeout'])
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*(socket.disconnect() for socket in sockets), return_exceptions=True)
+        return sum(len(frames) for frames in plan), delivered, expected, elapsed
@@ -0,0 +1,41 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from accounts.authentication import CachedJWTAuthentication
+
+# Cùng cache user với REST API: mở lại kết nối hàng loạt không dồn query vào DB
+authentication = CachedJWTAuthentication()
+
+
+@database_sync_to_async
+def get_user(token):
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+def _token(scope):
+    # Trình duyệt không gửi được header Authorization khi mở WebSocket nên nhận cả ?token=
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode('latin1').split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin1')).get('token')
+    return tokens[0] if tokens else None
+
+
+class JWTAuthMiddleware:
+    """ Set ``scope['user']`` from a SimpleJWT access token, the same one the REST API uses """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        token = _token(scope)
+        user = await get_user(token) if token else AnonymousUser()
+        return await self.app(dict(scope, user=user), receive, send)
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='timestap',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
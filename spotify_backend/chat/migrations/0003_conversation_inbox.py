@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_conversations(apps, schema_editor):
+    """ Build both sides' inbox rows from the messages already stored """
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    Conversation = apps.get_model('chat', 'Conversation')
+    rows = {}
+    messages = ChatMessage.objects.order_by('timestap', 'id').values_list('id', 'sender_id', 'receiver_id', 'timestap', 'is_read')
+    for pk, sender, receiver, timestap, is_read in messages.iterator(chunk_size=5000):
+        for owner, partner in {(sender, receiver), (receiver, sender)}:
+            row = rows.setdefault((owner, partner), Conversation(owner_id=owner, partner_id=partner))
+            row.last_message_id = pk
+            row.last_message_at = timestap
+        if not is_read:
+            rows[(receiver, sender)].unread_count += 1
+    Conversation.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatmessage_timestap_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField()),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['sender', 'receiver', 'timestap', 'id'], name='chat_msg_pair_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', 'sender', 'timestap'], name='chat_msg_unread_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='partner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['owner', 'last_message_at', 'id'], name='conversation_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('owner', 'partner'), name='unique_conversation'),
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from accounts.models import CustomUser
 
@@ -7,5 +8,38 @@ class ChatMessage(models.Model):
     sender = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_message')
     receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_message')
     message = models.TextField()
-    timestap = models.DateTimeField(auto_now_add=True)
+    # Không dùng auto_now_add: thời điểm là lúc server nhận tin, không phải lúc ghi theo lô
+    timestap = models.DateTimeField(default=timezone.now)
     is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Lịch sử 1 chiều của cuộc trò chuyện, duyệt theo thời gian (keyset)
+            models.Index(fields=['sender', 'receiver', 'timestap', 'id'], name='chat_msg_pair_time_idx'),
+            # Chỉ tin chưa đọc: đếm unread và đánh dấu đã đọc không phải quét cả lịch sử
+            models.Index(
+                fields=['receiver', 'sender', 'timestap'], name='chat_msg_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
+
+
+class Conversation(models.Model):
+    """
+    Inbox row of ``owner`` for the conversation with ``partner``; every
+    conversation has two rows, one per side. Maintained by the chat writer
+    so the inbox never has to group the message table.
+    """
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='conversations')
+    partner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(ChatMessage, on_delete=models.SET_NULL, null=True, related_name='+')
+    last_message_at = models.DateTimeField()
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'partner'], name='unique_conversation'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'last_message_at', 'id'], name='conversation_inbox_idx'),
+        ]
@@ -0,0 +1,164 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from accounts.models import CustomUser
+
+from .conversations import record_messages, refresh_unread
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = getattr(settings, 'CHAT_FLUSH_SIZE', 200)
+FLUSH_INTERVAL = getattr(settings, 'CHAT_FLUSH_INTERVAL', 0.5)
+# Khi ghi lỗi liên tục (DB sập), giữ tối đa bấy nhiêu tin và chờ lâu nhất bấy nhiêu giây giữa 2 lần thử
+MAX_PENDING = getattr(settings, 'CHAT_MAX_PENDING', 100000)
+MAX_RETRY_DELAY = getattr(settings, 'CHAT_MAX_RETRY_DELAY', 30.0)
+
+
+class ChatWriteBuffer:
+    """
+    Buffer between the WebSocket consumers and the database.
+
+    Messages are fanned out through the channel layer immediately and only
+    queued here; a background thread writes them with one ``bulk_create``
+    every ``flush_interval`` seconds, or as soon as ``flush_size`` are
+    pending. Read receipts are coalesced per (reader, partner) pair to the
+    latest timestamp, so a client acknowledging every frame still costs one
+    UPDATE per conversation per flush. ``add_*`` never touches the database,
+    which keeps the event loop free. Messages were already delivered when
+    they reach the buffer, so a failed write is logged and the batch is
+    put back and retried with exponential backoff rather than dropped.
+    """
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, background=True, max_pending=MAX_PENDING):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self.max_pending = max_pending
+        self._messages = []
+        self._reads = {}
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add_message(self, sender_id, receiver_id, message, timestamp):
+        with self._lock:
+            self._messages.append(ChatMessage(
+                sender_id=sender_id, receiver_id=receiver_id, message=message, timestap=timestamp,
+            ))
+            due = len(self._messages) >= self.flush_size
+        self._started()
+        if due:
+            self._wakeup.set()
+
+    def add_read(self, reader_id, partner_id, until):
+        """ Mark messages from ``partner_id`` to ``reader_id`` sent up to ``until`` as read """
+        key = (reader_id, partner_id)
+        with self._lock:
+            current = self._reads.get(key)
+            if current is None or until > current:
+                self._reads[key] = until
+        self._started()
+
+    def pending(self):
+        with self._lock:
+            return len(self._messages), len(self._reads)
+
+    def flush(self):
+        """ Write everything pending; returns ``(messages, read_updates)`` written, ``(0, 0)`` when the write failed """
+        with self._flush_lock:
+            with self._lock:
+                messages, self._messages = self._messages, []
+                reads, self._reads = self._reads, {}
+            if not messages and not reads:
+                return 0, 0
+            try:
+                written = write_chat_batch(messages, reads)
+            except Exception:
+                logger.exception('Ghi %d tin nhắn và %d receipt thất bại, sẽ thử lại', len(messages), len(reads))
+                self._requeue(messages, reads)
+                return 0, 0
+            with self._lock:
+                self._failures = 0
+                self._retry_at = 0.0
+            return written, len(reads)
+
+    def _requeue(self, messages, reads):
+        with self._lock:
+            self._messages[:0] = messages
+            dropped = len(self._messages) - self.max_pending
+            if dropped > 0:
+                del self._messages[:dropped]
+                logger.error('Bỏ %d tin nhắn cũ nhất vì buffer đầy', dropped)
+            for key, until in reads.items():
+                current = self._reads.get(key)
+                if current is None or until > current:
+                    self._reads[key] = until
+            self._failures += 1
+            self._retry_at = time.monotonic() + min(self.flush_interval * 2 ** self._failures, MAX_RETRY_DELAY)
+
+    def _started(self):
+        if not self.background:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(max(self.flush_interval, self._retry_at - time.monotonic()))
+            self._wakeup.clear()
+            if time.monotonic() < self._retry_at:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                # Không để thread ghi chết vì một lỗi bất ngờ
+                logger.exception('Chat writer lỗi')
+            finally:
+                close_old_connections()
+
+
+def write_chat_batch(messages, reads):
+    """
+    Persist a batch: one INSERT for the messages and one upsert of the
+    inbox rows, then one UPDATE per coalesced read receipt and a single
+    recount of the unread counters they touched. Messages whose sender or
+    receiver was deleted meanwhile are dropped instead of failing the batch.
+    Returns the number of messages written.
+    """
+    with transaction.atomic():
+        if messages:
+            users = set(CustomUser.objects.filter(
+                pk__in={message.sender_id for message in messages} | {message.receiver_id for message in messages},
+            ).values_list('pk', flat=True))
+            valid = [message for message in messages if message.sender_id in users and message.receiver_id in users]
+            if len(valid) < len(messages):
+                logger.warning('Bỏ %d tin nhắn của user đã bị xoá', len(messages) - len(valid))
+            messages = valid
+        # Ghi tin nhắn trước để receipt trong cùng lô cũng đánh dấu được chúng
+        ChatMessage.objects.bulk_create(messages, batch_size=1000)
+        if messages:
+            record_messages(messages)
+        for (reader_id, partner_id), until in reads.items():
+            ChatMessage.objects.filter(
+                sender_id=partner_id, receiver_id=reader_id, timestap__lte=until, is_read=False,
+            ).update(is_read=True)
+        refresh_unread(reads)
+    return len(messages)
+
+
+chat_write_buffer = ChatWriteBuffer()
+atexit.register(chat_write_buffer.flush)
@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from accounts.models import CustomUser
+
+from .models import ChatMessage, Conversation
+
+
+class ChatPartnerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'profile_picture']
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'sender', 'receiver', 'message', 'timestap', 'is_read']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    partner = ChatPartnerSerializer(read_only=True)
+    last_message = ChatMessageSerializer(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'partner', 'last_message', 'last_message_at', 'unread_count']
+
+
+class MarkReadSerializer(serializers.Serializer):
+    until = serializers.DateTimeField(required=False)
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from .consumers import ChatConsumer
+from .models import ChatMessage, Conversation
+from .persistence import ChatWriteBuffer
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class ChatConsumerTests(TransactionTestCase):
+    """ Consumer over InMemoryChannelLayer; the write buffer is flushed by hand instead of by its thread """
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.bob = CustomUser.objects.create_user(username='bob', email='bob@example.com', password='x')
+        self.buffer = ChatWriteBuffer(background=False)
+        patcher = mock.patch('chat.consumers.chat_write_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), '/ws/chat/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_rejects_anonymous(self):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), '/ws/chat/')
+        communicator.scope['user'] = mock.Mock(is_authenticated=False)
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_message_fans_out_and_echoes(self):
+        alice = await self.connect(self.alice)
+        alice_phone = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+
+        await alice.send_json_to({'type': 'message', 'to': self.bob.pk, 'message': 'hi', 'client_id': 'c1'})
+        for communicator in (bob, alice, alice_phone):
+            frame = await communicator.receive_json_from()
+            self.assertEqual(frame['type'], 'message')
+            self.assertEqual((frame['from'], frame['to'], frame['message']), (self.alice.pk, self.bob.pk, 'hi'))
+            # client_id cho phép người gửi khớp bản echo với tin đã gửi
+            self.assertEqual(frame['client_id'], 'c1')
+        for communicator in (alice, alice_phone, bob):
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+    async def test_invalid_receiver_is_an_error(self):
+        alice = await self.connect(self.alice)
+        await alice.send_json_to({'type': 'message', 'to': 999999, 'message': 'hi', 'client_id': 'c1'})
+        frame = await alice.receive_json_from()
+        self.assertEqual((frame['type'], frame['client_id']), ('error', 'c1'))
+        self.assertEqual(self.buffer.pending(), (0, 0))
+        await alice.disconnect()
+
+    async def test_messages_are_persisted_in_one_batch(self):
+        alice = await self.connect(self.alice)
+        for text in ('one', 'two', 'three'):
+            await alice.send_json_to({'type': 'message', 'to': self.bob.pk, 'message': text})
+            await alice.receive_json_from()
+        await alice.disconnect()
+
+        # Chưa có gì được ghi trước khi flush
+        self.assertEqual(self.buffer.pending(), (3, 0))
+        self.assertEqual(await database_sync_to_async(ChatMessage.objects.count)(), 0)
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', wraps=ChatMessage.objects.bulk_create) as bulk_create:
+            self.assertEqual(await database_sync_to_async(self.buffer.flush)(), (3, 0))
+        self.assertEqual(bulk_create.call_count, 1)
+
+        texts = await database_sync_to_async(
+            lambda: list(ChatMessage.objects.order_by('timestap').values_list('message', flat=True))
+        )()
+        self.assertEqual(texts, ['one', 'two', 'three'])
+        inbox = await database_sync_to_async(Conversation.objects.get)(owner=self.bob, partner=self.alice)
+        self.assertEqual(inbox.unread_count, 3)
+
+    async def test_read_receipts_are_coalesced(self):
+        now = timezone.now()
+        await database_sync_to_async(self._save_messages)(now)
+        bob = await self.connect(self.bob)
+        alice = await self.connect(self.alice)
+        for offset in (0, 2, 1):
+            await bob.send_json_to({
+                'type': 'read', 'from': self.alice.pk, 'until': (now - timedelta(seconds=10 - offset)).isoformat(),
+            })
+            frame = await alice.receive_json_from()
+            self.assertEqual((frame['type'], frame['by']), ('read', self.bob.pk))
+        await bob.disconnect()
+        await alice.disconnect()
+
+        # 3 receipt cho cùng cuộc trò chuyện chỉ còn 1, với mốc muộn nhất
+        self.assertEqual(self.buffer.pending(), (0, 1))
+        self.assertEqual(await database_sync_to_async(self.buffer.flush)(), (0, 1))
+        read = await database_sync_to_async(
+            lambda: list(ChatMessage.objects.order_by('timestap').values_list('is_read', flat=True))
+        )()
+        self.assertEqual(read, [True, True, False])
+        inbox = await database_sync_to_async(Conversation.objects.get)(owner=self.bob, partner=self.alice)
+        self.assertEqual(inbox.unread_count, 1)
+
+    def _save_messages(self, now):
+        buffer = ChatWriteBuffer(background=False)
+        for seconds in (10, 8, 1):
+            buffer.add_message(self.alice.pk, self.bob.pk, 'm%d' % seconds, now - timedelta(seconds=seconds))
+        buffer.flush()
+
+
+class ChatWriteBufferTests(TransactionTestCase):
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.bob = CustomUser.objects.create_user(username='bob', email='bob@example.com', password='x')
+        self.buffer = ChatWriteBuffer(background=False)
+
+    def test_failed_write_is_retried(self):
+        self.buffer.add_message(self.alice.pk, self.bob.pk, 'hi', timezone.now())
+        self.buffer.add_read(self.bob.pk, self.alice.pk, timezone.now())
+        with mock.patch('chat.persistence.write_chat_batch', side_effect=RuntimeError('db down')), \
+                self.assertLogs('chat.persistence', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), (0, 0))
+        self.assertEqual(self.buffer.pending(), (1, 1))
+        self.assertEqual(self.buffer.flush(), (1, 1))
+        self.assertEqual(ChatMessage.objects.count(), 1)
+
+    def test_messages_of_deleted_users_do_not_sink_the_batch(self):
+        self.buffer.add_message(self.alice.pk, self.bob.pk, 'kept', timezone.now())
+        self.buffer.add_message(self.alice.pk, 999999, 'dropped', timezone.now())
+        with self.assertLogs('chat.persistence', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), (1, 0))
+        self.assertEqual(list(ChatMessage.objects.values_list('message', flat=True)), ['kept'])
+
+    def test_late_batch_adds_unread_without_moving_last_message_back(self):
+        now = timezone.now()
+        self.buffer.add_message(self.alice.pk, self.bob.pk, 'new', now)
+        self.buffer.flush()
+        # Lô của process khác ghi sau nhưng chứa tin cũ hơn
+        self.buffer.add_message(self.alice.pk, self.bob.pk, 'old', now - timedelta(seconds=5))
+        self.buffer.flush()
+        inbox = Conversation.objects.select_related('last_message').get(owner=self.bob, partner=self.alice)
+        self.assertEqual((inbox.last_message.message, inbox.last_message_at), ('new', now))
+        self.assertEqual(inbox.unread_count, 2)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import ConversationListView, ConversationMessagesView, ConversationReadView
+
+urlpatterns = [
+    path('conversations/', ConversationListView.as_view(), name='conversation-list'),
+    path('conversations/<int:partner_id>/messages/', ConversationMessagesView.as_view(), name='conversation-messages'),
+    path('conversations/<int:partner_id>/read/', ConversationReadView.as_view(), name='conversation-read'),
+]
@@ -1,3 +1,130 @@
-from django.shortcuts import render
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.models import CustomUser
+from music.pagination import KeysetPagination
+
+from .consumers import user_group
+from .conversations import conversation_messages, mark_read
+from .models import Conversation
+from .serializers import ChatMessageSerializer, ConversationSerializer, MarkReadSerializer
+
+
+class ConversationListView(generics.ListAPIView):
+    serializer_class = ConversationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = '-last_message_at'
+
+    def get_queryset(self):
+        # 1 range scan trên conversation_inbox_idx, không GROUP BY bảng tin nhắn
+        return Conversation.objects.filter(owner=self.request.user).select_related('partner', 'last_message')
+
+    @swagger_auto_schema(
+        operation_description="Inbox of the authenticated user: one entry per partner with the last message and unread count, most recent first",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Conversations per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of conversations",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {
+                                "id": 4,
+                                "partner": {"id": 2, "username": "user2", "profile_picture": None},
+                                "last_message": {"id": 91, "sender": 2, "receiver": 1, "message": "Hello", "timestap": "2025-03-23T10:00:00Z", "is_read": False},
+                                "last_message_at": "2025-03-23T10:00:00Z",
+                                "unread_count": 3
+                            }
+                        ],
+                        "next": None,
+                        "prev": None
+                    }
+                }
+            ),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ConversationMessagesView(generics.ListAPIView):
+    serializer_class = ChatMessageSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = '-timestap'
+
+    def get_queryset(self):
+        return conversation_messages(self.request.user.pk, self.kwargs['partner_id'])
+
+    @swagger_auto_schema(
+        operation_description="Messages exchanged with a partner, newest first",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Messages per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of messages",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {"id": 91, "sender": 2, "receiver": 1, "message": "Hello", "timestap": "2025-03-23T10:00:00Z", "is_read": False}
+                        ],
+                        "next": "eyJrIjoiMjAyNS0wMy0yM1QxMDowMDowMFoiLCJpIjo5MSwiZCI6Im4ifQ==",
+                        "prev": None
+                    }
+                }
+            ),
+            401: openapi.Response(description="Unauthorized"),
+            404: openapi.Response(description="User not found")
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        if not CustomUser.objects.filter(pk=kwargs['partner_id']).exists():
+            return Response({"status": "error", "message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ConversationReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Mark the messages received from a partner as read, up to 'until' if given, in one UPDATE. The partner's open sockets get a read receipt.",
+        request_body=MarkReadSerializer,
+        responses={
+            200: openapi.Response(
+                description="Messages marked as read",
+                examples={"application/json": {"status": "success", "data": {"updated": 3}}}
+            ),
+            400: openapi.Response(description="Invalid 'until'"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def post(self, request, partner_id):
+        serializer = MarkReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"status": "error", "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        until = serializer.validated_data.get('until')
+        updated = mark_read(request.user.pk, partner_id, until)
+        if updated:
+            event = {'type': 'chat.read', 'by': request.user.pk, 'until': until.isoformat() if until else None}
+            transaction.on_commit(lambda: async_to_sync(get_channel_layer().group_send)(user_group(partner_id), event))
+        return Response({"status": "success", "data": {"updated": updated}}, status=status.HTTP_200_OK)
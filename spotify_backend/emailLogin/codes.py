@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailLoginCode
+
+CODE_TTL = timedelta(minutes=getattr(settings, 'EMAIL_LOGIN_CODE_TTL_MINUTES', 3))
+PURGE_CHUNK_SIZE = 5000
+
+
+def consume_code(email, code, now=None):
+    """
+    Use up a valid code in one conditional UPDATE, so two concurrent
+    verifications of the same code cannot both succeed. Returns None on
+    success, otherwise the reason: ``'expired'`` or ``'invalid'``.
+    """
+    now = now or timezone.now()
+    unused = EmailLoginCode.objects.filter(email=email, code=code, is_used=False)
+    if unused.filter(created_at__gte=now - CODE_TTL).update(is_used=True):
+        return None
+    # Chỉ đường thất bại mới cần thêm 1 query để phân biệt lý do
+    return 'expired' if unused.exists() else 'invalid'
+
+
+def purge_codes(chunk_size=PURGE_CHUNK_SIZE, now=None):
+    """
+    Delete used and expired codes in id order, ``chunk_size`` rows per
+    short transaction, so the sweep never holds long locks. Returns the
+    number of rows deleted.
+    """
+    cutoff = (now or timezone.now()) - CODE_TTL
+    stale = EmailLoginCode.objects.filter(Q(is_used=True) | Q(created_at__lt=cutoff))
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(stale.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            count, _ = EmailLoginCode.objects.filter(id__in=ids).delete()
+        deleted += count
+        last_id = ids[-1]
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from emailLogin.codes import CODE_TTL, consume_code
+from emailLogin.models import EmailLoginCode
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login code verification over a large code history (runs in a rolled back transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codes', default=10_000_000, type=int, help='Historical codes to generate')
+        parser.add_argument('--emails', default=100_000, type=int, help='Distinct emails the history is spread over')
+        parser.add_argument('--verifications', default=1000, type=int, help='Verifications to time')
+        parser.add_argument('--seed', default=42, type=int, help='Random seed')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._generate(options['codes'], options['emails'])
+            self.stdout.write(f'Tạo {options["codes"]:,} mã lịch sử trong {time.perf_counter() - started:.1f}s')
+
+            now = timezone.now()
+            fresh = [
+                EmailLoginCode(email=f'bench{rng.randrange(options["emails"])}@example.com', code=f'{rng.randint(100000, 999999)}', created_at=now)
+                for _ in range(options['verifications'])
+            ]
+            EmailLoginCode.objects.bulk_create(fresh, batch_size=1000)
+
+            timings = []
+            failures = 0
+            for record in fresh:
+                started = time.perf_counter()
+                failures += consume_code(record.email, record.code) is not None
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'verify: p50 {statistics.median(timings):.3f} ms, p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms, '
+                f'{failures} thất bại'
+            )
+            if connection.vendor == 'postgresql':
+                sample = fresh[0]
+                with connection.cursor() as cursor:
+                    sql, params = EmailLoginCode.objects.filter(
+                        email=sample.email, code=sample.code, is_used=False, created_at__gte=now - CODE_TTL,
+                    ).query.sql_with_params()
+                    cursor.execute('EXPLAIN ' + sql, params)
+                    self.stdout.write('\n'.join(row[0] for row in cursor.fetchall()))
+
+            transaction.set_rollback(True)
+
+    def _generate(self, total, emails):
+        old = timezone.now() - timedelta(days=30)
+        table = connection.ops.quote_name(EmailLoginCode._meta.db_table)
+        if connection.vendor == 'postgresql':
+            # INSERT ... SELECT: không phải gửi 10M dòng qua driver
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (email, code, created_at, is_used) '
+                    "SELECT 'bench' || (i %% %s) || '@example.com', lpad(((i * 7919) %% 900000 + 100000)::text, 6, '0'), "
+                    "%s + (i || ' milliseconds')::interval, i %% 10 <> 0 "
+                    'FROM generate_series(1::bigint, %s) AS i',
+                    [emails, old, total],
+                )
+                cursor.execute(f'ANALYZE {table}')
+            return
+        batch = []
+        for i in range(total):
+            batch.append(EmailLoginCode(
+                email=f'bench{i % emails}@example.com', code=f'{(i * 7919) % 900000 + 100000}',
+                created_at=old + timedelta(milliseconds=i), is_used=i % 10 != 0,
+            ))
+            if len(batch) >= 10000:
+                EmailLoginCode.objects.bulk_create(batch)
+                batch = []
+        EmailLoginCode.objects.bulk_create(batch)
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from emailLogin.codes import PURGE_CHUNK_SIZE, purge_codes
+
+
+class Command(BaseCommand):
+    help = 'Delete used and expired email login codes in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', default=PURGE_CHUNK_SIZE, type=int, help='Rows deleted per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = purge_codes(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã xoá {deleted} mã đăng nhập đã dùng hoặc hết hạn trong {time.perf_counter() - started:.2f}s'
+        ))
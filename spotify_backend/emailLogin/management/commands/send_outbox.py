@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from emailLogin.outbox import BATCH_SIZE, send_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches over one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', default=BATCH_SIZE, type=int, help='Emails sent per SMTP session')
+        parser.add_argument('--interval', default=1.0, type=float, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the due emails and exit')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, retried, failed = send_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or retried or failed:
+                self.stdout.write(f'Đã gửi {sent} email, {retried} sẽ thử lại, {failed} thất bại hẳn')
+                # Còn thư đến hạn thì gửi tiếp ngay, không ngủ
+                continue
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Tổng cộng: {total_sent} đã gửi, {total_failed} thất bại'))
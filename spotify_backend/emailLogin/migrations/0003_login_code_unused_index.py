@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emailLogin', '0002_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emaillogincode',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['email', 'code', 'created_at'], name='login_code_unused_idx'),
+        ),
+    ]
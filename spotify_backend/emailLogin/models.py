@@ -9,6 +9,47 @@ class EmailLoginCode(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Khớp đúng truy vấn verify; mã đã dùng không nằm trong index
+            models.Index(
+                fields=['email', 'code', 'created_at'], name='login_code_unused_idx',
+                condition=models.Q(is_used=False),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.email} - {self.code}"
 
+
+class OutboxEmail(models.Model):
+    """ Email queued by a request and delivered by the ``send_outbox`` worker """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    to = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Thư vô nghĩa sau thời điểm này (vd. mã đăng nhập đã hết hạn): không gửi nữa
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker chỉ đọc thư đang chờ; thư đã gửi không làm index phình ra
+            models.Index(
+                fields=['next_attempt_at', 'id'], name='outbox_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+# Lần thử lại thứ n chờ RETRY_DELAYS[n - 1] giây
+RETRY_DELAYS = (10, 60, 300, 1800)
+
+
+def enqueue(to, subject, body, from_email=None, expires_at=None):
+    """ Queue one email, dropped instead of sent after ``expires_at``; the request only pays for an INSERT """
+    return OutboxEmail.objects.create(
+        to=to, subject=subject, body=body, from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        expires_at=expires_at,
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=RETRY_DELAYS[min(attempts, len(RETRY_DELAYS)) - 1])
+
+
+def send_batch(batch_size=BATCH_SIZE, connection=None):
+    """
+    Deliver up to ``batch_size`` due emails over one SMTP session.
+
+    Rows are claimed with ``SKIP LOCKED`` so several workers can run side by
+    side. A failed send is retried with backoff until ``MAX_ATTEMPTS``, then
+    marked failed; a failure of the connection itself counts against every
+    email of the batch. Emails past ``expires_at`` are marked failed without
+    being sent, and are not retried past it. Returns ``(sent, retried, failed)``.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        claimed = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not claimed:
+            return 0, 0, 0
+        expired = [email for email in claimed if email.expires_at is not None and email.expires_at <= now]
+        for email in expired:
+            email.status = OutboxEmail.FAILED
+            email.last_error = 'Hết hạn trước khi gửi được'
+        batch = [email for email in claimed if email.status == OutboxEmail.PENDING]
+
+        sent = retried = 0
+        failed = len(expired)
+        if not batch:
+            OutboxEmail.objects.bulk_update(expired, ['status', 'last_error'], batch_size=500)
+            return sent, retried, failed
+
+        connection = connection or get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            errors = {email.pk: exc for email in batch}
+        else:
+            errors = {}
+            try:
+                for email in batch:
+                    message = EmailMessage(
+                        email.subject, email.body, email.from_email, [email.to], connection=connection,
+                    )
+                    try:
+                        message.send()
+                    except Exception as exc:
+                        errors[email.pk] = exc
+            finally:
+                connection.close()
+
+        now = timezone.now()
+        for email in batch:
+            error = errors.get(email.pk)
+            email.attempts += 1
+            if error is None:
+                email.status = OutboxEmail.SENT
+                email.sent_at = now
+                email.last_error = ''
+                sent += 1
+                continue
+            email.last_error = repr(error)
+            next_attempt_at = now + retry_delay(email.attempts)
+            if email.attempts >= MAX_ATTEMPTS or (email.expires_at is not None and next_attempt_at >= email.expires_at):
+                email.status = OutboxEmail.FAILED
+                failed += 1
+            else:
+                email.next_attempt_at = next_attempt_at
+                retried += 1
+        OutboxEmail.objects.bulk_update(
+            batch + expired, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'], batch_size=500,
+        )
+    return sent, retried, failed
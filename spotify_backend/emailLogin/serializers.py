@@ -1,11 +1,11 @@
 import random
 from rest_framework import serializers
 from .models import EmailLoginCode
-from django.core.mail import send_mail
+from .codes import CODE_TTL, consume_code
+from .outbox import enqueue
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.utils import timezone
-from datetime import timedelta
+from django.db import transaction
 
 class SendEmailCodeSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -21,16 +21,16 @@ class SendEmailCodeSerializer(serializers.Serializer):
         code = f"{random.randint(100000, 999999)}"
         email = validated_data['email']
 
-        # Lưu mã vào DB
-        EmailLoginCode.objects.create(email=email, code=code)
-
-        # Gửi email (tùy cấu hình EMAIL_BACKEND)
-        send_mail(
-            subject="Mã đăng nhập của bạn",
-            message=f"Mã xác nhận đăng nhập của bạn là: {code}",
-            from_email="noreply@yourdomain.com",
-            recipient_list=[email],
-        )
+        # Lưu mã và xếp email vào outbox; worker send_outbox gửi qua SMTP
+        with transaction.atomic():
+            login_code = EmailLoginCode.objects.create(email=email, code=code)
+            enqueue(
+                to=email,
+                subject="Mã đăng nhập của bạn",
+                body=f"Mã xác nhận đăng nhập của bạn là: {code}",
+                # Mã hết hạn thì gửi muộn cũng vô ích
+                expires_at=login_code.created_at + CODE_TTL,
+            )
         return {"message": "Mã xác thực đã được gửi đến email."}
     
 class VerifyEmailCodeSerializer(serializers.Serializer):
@@ -41,19 +41,13 @@ class VerifyEmailCodeSerializer(serializers.Serializer):
         email = data['email']
         code = data['code']
 
-        try:
-            record = EmailLoginCode.objects.filter(email=email, code=code, is_used=False).latest('created_at')
-        except EmailLoginCode.DoesNotExist:
+        # Kiểm tra và đánh dấu đã dùng trong cùng 1 câu UPDATE
+        error = consume_code(email, code)
+        if error == 'invalid':
             raise serializers.ValidationError("Mã xác nhận không hợp lệ.")
-
-        # Kiểm tra thời gian hết hạn (5 phút)
-        if timezone.now() - record.created_at > timedelta(minutes=3):
+        if error == 'expired':
             raise serializers.ValidationError("Mã đã hết hạn.")
 
-        # Đánh dấu là đã dùng
-        record.is_used = True
-        record.save()
-
         return data
 
     def create(self, validated_data):
@@ -1,3 +1,114 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from . import outbox
+from .codes import CODE_TTL, consume_code, purge_codes
+from .models import EmailLoginCode, OutboxEmail
+from .serializers import SendEmailCodeSerializer
+
+LOCMEM_EMAIL = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+def failing_connection():
+    connection = mock.Mock()
+    connection.open.side_effect = OSError('smtp down')
+    return connection
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM_EMAIL)
+class OutboxTests(TestCase):
+
+    def test_request_only_queues_the_email(self):
+        CustomUser.objects.create_user(username='alice', email='alice@example.com', password='x')
+        serializer = SendEmailCodeSerializer(data={'email': 'alice@example.com'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Request không mở kết nối SMTP
+        self.assertEqual(mail.outbox, [])
+        email = OutboxEmail.objects.get()
+        code = EmailLoginCode.objects.get()
+        self.assertEqual((email.to, email.status), ('alice@example.com', OutboxEmail.PENDING))
+        self.assertIn(code.code, email.body)
+        self.assertEqual(email.expires_at, code.created_at + CODE_TTL)
+
+    def test_send_batch_delivers_pending_emails(self):
+        for to in ('a@example.com', 'b@example.com'):
+            outbox.enqueue(to, 'Subject', 'Body')
+        self.assertEqual(outbox.send_batch(), (2, 0, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT, sent_at__isnull=False).count(), 2)
+        # Không gửi lại lần hai
+        self.assertEqual(outbox.send_batch(), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_connection_is_retried_with_backoff(self):
+        email = outbox.enqueue('a@example.com', 'Subject', 'Body')
+        before = timezone.now()
+        self.assertEqual(outbox.send_batch(connection=failing_connection()), (0, 1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+        self.assertGreaterEqual(email.next_attempt_at, before + outbox.retry_delay(1))
+        self.assertIn('smtp down', email.last_error)
+        # Chưa tới hạn thử lại thì worker bỏ qua
+        self.assertEqual(outbox.send_batch(), (0, 0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_email_fails_after_max_attempts(self):
+        email = outbox.enqueue('a@example.com', 'Subject', 'Body')
+        for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+            OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            expected = (0, 0, 1) if attempt == outbox.MAX_ATTEMPTS else (0, 1, 0)
+            self.assertEqual(outbox.send_batch(connection=failing_connection()), expected)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.FAILED, outbox.MAX_ATTEMPTS))
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.send_batch(), (0, 0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_expired_email_is_not_delivered(self):
+        email = outbox.enqueue('a@example.com', 'Subject', 'Body', expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.send_batch(), (0, 0, 1))
+        self.assertEqual(mail.outbox, [])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.FAILED, 0))
+
+    def test_retry_is_not_scheduled_past_expiry(self):
+        # Lần thử lại thứ 2 (sau 60s) đã quá hạn của mã
+        email = outbox.enqueue('a@example.com', 'Subject', 'Body', expires_at=timezone.now() + timedelta(seconds=30))
+        self.assertEqual(outbox.send_batch(connection=failing_connection()), (0, 1, 0))
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.send_batch(connection=failing_connection()), (0, 0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.FAILED, 2))
+
+
+class LoginCodeTests(TestCase):
+
+    def test_code_is_consumed_once(self):
+        EmailLoginCode.objects.create(email='a@example.com', code='123456')
+        self.assertEqual(consume_code('a@example.com', '654321'), 'invalid')
+        self.assertIsNone(consume_code('a@example.com', '123456'))
+        # Dùng lại mã đã dùng là không hợp lệ
+        self.assertEqual(consume_code('a@example.com', '123456'), 'invalid')
+
+    def test_expired_code_is_rejected(self):
+        EmailLoginCode.objects.create(
+            email='a@example.com', code='123456', created_at=timezone.now() - CODE_TTL - timedelta(seconds=1),
+        )
+        self.assertEqual(consume_code('a@example.com', '123456'), 'expired')
+        self.assertFalse(EmailLoginCode.objects.get().is_used)
+
+    def test_purge_deletes_only_used_and_expired_codes(self):
+        now = timezone.now()
+        EmailLoginCode.objects.create(email='a@example.com', code='000001', is_used=True)
+        EmailLoginCode.objects.create(email='a@example.com', code='000002', created_at=now - CODE_TTL * 2)
+        fresh = EmailLoginCode.objects.create(email='a@example.com', code='000003')
+        self.assertEqual(purge_codes(chunk_size=1, now=now), 2)
+        self.assertEqual(list(EmailLoginCode.objects.values_list('pk', flat=True)), [fresh.pk])
@@ -0,0 +1,150 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_ALIAS = getattr(settings, 'MUSIC_CACHE_ALIAS', 'default')
+# Thời gian một response được coi là "mới"
+CACHE_TIMEOUT = getattr(settings, 'MUSIC_CACHE_TIMEOUT', 300)
+# Sau khi hết hạn, entry cũ vẫn được giữ thêm để phục vụ trong lúc 1 request tính lại
+STALE_GRACE = getattr(settings, 'MUSIC_CACHE_STALE_GRACE', 60)
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+
+KEY_PREFIX = 'music'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return '%s:tag:%s' % (KEY_PREFIX, tag)
+
+
+def _new_version():
+    # Khởi tạo theo thời gian để version không bao giờ quay lại giá trị cũ khi key bị evict
+    return time.time_ns() // 1000
+
+
+def tag_versions(tags):
+    """ Current version of each tag, creating missing ones; one round trip when they exist """
+    cache = get_cache()
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_tags(*tags):
+    """ Invalidate every cached response that depends on one of ``tags`` """
+    cache = get_cache()
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def invalidate(*tags):
+    """ Bump ``tags`` once the current transaction commits (immediately outside one) """
+    tags = tuple(tag for tag in tags if tag)
+    if tags:
+        transaction.on_commit(lambda: bump_tags(*tags))
+
+
+def response_cache_key(request, tags, scope='public'):
+    """
+    Key on path, sorted query params, auth scope and the version of every tag,
+    so a bumped tag simply makes old entries unreachable. Behind
+    ``conditional_response`` the ETag is part of the key as well, so the
+    cached body always matches the validator sent with it.
+    """
+    if scope == 'user':
+        user = request.user
+        scope_part = 'user:%s' % user.pk if user.is_authenticated else 'anon'
+    else:
+        scope_part = 'public'
+    params = sorted(request.query_params.lists())
+    raw = '|'.join([
+        scope_part,
+        request.path,
+        repr(params),
+        repr(tag_versions(tags)),
+        getattr(request, 'resource_etag', ''),
+    ])
+    return '%s:resp:%s' % (KEY_PREFIX, hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def cached_response(request, tags, build, scope='public', timeout=None):
+    """
+    Return a cached ``Response`` for ``request`` or compute it with ``build()``.
+
+    Only 200 responses are stored. When an entry expires, a single request
+    takes the recompute lock while the others keep serving the stale copy (or
+    wait briefly for the winner if there is none), so a hot key expiring does
+    not send a burst of identical queries to the database.
+    """
+    cache = get_cache()
+    timeout = CACHE_TIMEOUT if timeout is None else timeout
+    key = response_cache_key(request, tags, scope)
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.time():
+        return Response(entry[1], status=status.HTTP_200_OK)
+
+    lock_key = key + ':lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return _build_and_store(cache, key, build, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return Response(entry[1], status=status.HTTP_200_OK)
+
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return Response(entry[1], status=status.HTTP_200_OK)
+    return build()
+
+
+def _build_and_store(cache, key, build, timeout):
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, (time.time() + timeout, response.data), timeout + STALE_GRACE)
+    return response
+
+
+def cache_response(*tags, scope='public', timeout=None):
+    """
+    Decorator for read handlers on the music views.
+
+    ``tags`` may reference URL kwargs, e.g. ``'artist:{pk}'``. Use
+    ``scope='user'`` when the payload depends on who is asking.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            resolved = [tag.format(**kwargs) for tag in tags]
+            return cached_response(
+                request,
+                resolved,
+                lambda: method(view, request, *args, **kwargs),
+                scope=scope,
+                timeout=timeout,
+            )
+        return wrapper
+    return decorator
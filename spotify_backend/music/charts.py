@@ -0,0 +1,117 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import Song, SongPlayBucket
+from .watermarks import HistoryCursor
+
+WATERMARK_NAME = 'charts'
+# Bucket theo giờ chỉ phục vụ bảng xếp hạng 24 giờ gần nhất
+HOURLY_RETENTION_DAYS = 7
+PERIODS = ('day', 'week', 'trending')
+CHART_SIZE = 50
+MAX_CHART_SIZE = 200
+
+
+def _hour_start(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_plays(chunk_size=20000):
+    """
+    Add ListeningHistory rows past the job watermark to the hourly and daily
+    buckets. Each chunk is merged and the watermark advanced in one
+    transaction, so the job never rescans history and can be interrupted at
+    any point; rows committed late, below the watermark, are picked up
+    through ``music.watermarks``. Returns the number of history rows folded in.
+    """
+    cursor = HistoryCursor(WATERMARK_NAME)
+    processed = 0
+    for rows in cursor.batches(('song_id', 'song__genre_id', 'listened_at'), chunk_size):
+        counts = Counter()
+        for _, song_id, genre_id, listened_at in rows:
+            hour = _hour_start(listened_at)
+            counts[(SongPlayBucket.HOUR, hour, song_id, genre_id)] += 1
+            counts[(SongPlayBucket.DAY, _day_start(hour.date()), song_id, genre_id)] += 1
+        with transaction.atomic():
+            _merge_counts(counts)
+            cursor.advance(rows)
+        processed += len(rows)
+
+    if processed:
+        invalidate('chart')
+    return processed
+
+
+def _merge_counts(counts):
+    buckets = {(granularity, start, song_id) for granularity, start, song_id, _ in counts}
+    existing = {
+        (bucket.granularity, bucket.bucket_start, bucket.song_id): bucket
+        for bucket in SongPlayBucket.objects.select_for_update().filter(
+            granularity__in={key[0] for key in buckets},
+            bucket_start__in={key[1] for key in buckets},
+            song_id__in={key[2] for key in buckets},
+        )
+    }
+    to_update, to_create = {}, []
+    for (granularity, start, song_id, genre_id), plays in counts.items():
+        key = (granularity, start, song_id)
+        bucket = existing.get(key)
+        if bucket is None:
+            bucket = SongPlayBucket(granularity=granularity, bucket_start=start, song_id=song_id, genre_id=genre_id, plays=0)
+            existing[key] = bucket
+            to_create.append(bucket)
+        elif key not in to_update:
+            to_update[key] = bucket
+        bucket.plays += plays
+    SongPlayBucket.objects.bulk_create(to_create, batch_size=1000)
+    SongPlayBucket.objects.bulk_update(list(to_update.values()), ['plays'], batch_size=1000)
+
+
+def purge_hourly_buckets(days=HOURLY_RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = SongPlayBucket.objects.filter(granularity=SongPlayBucket.HOUR, bucket_start__lt=cutoff).delete()
+    return deleted
+
+
+def chart_window(period, day=None):
+    """
+    ``(granularity, start, end)`` of the buckets a chart reads:
+    ``day`` is one daily bucket, ``week`` the seven daily buckets of the ISO
+    week containing ``day``, ``trending`` the last 24 hourly buckets.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period phải là một trong: {', '.join(PERIODS)}")
+    if period == 'trending':
+        end = _hour_start(timezone.now()) + timedelta(hours=1)
+        return SongPlayBucket.HOUR, end - timedelta(hours=24), end
+    day = day or timezone.localdate()
+    if period == 'week':
+        day = day - timedelta(days=day.weekday())
+        return SongPlayBucket.DAY, _day_start(day), _day_start(day + timedelta(days=7))
+    return SongPlayBucket.DAY, _day_start(day), _day_start(day + timedelta(days=1))
+
+
+def top_songs(period='week', genre_id=None, day=None, limit=CHART_SIZE):
+    """
+    Top ``limit`` songs of a chart as ``[(song, plays), ...]``. Reads only the
+    buckets inside the window (an index range on granularity, genre and
+    bucket_start), then loads the chart's songs with one query.
+    """
+    granularity, start, end = chart_window(period, day)
+    buckets = SongPlayBucket.objects.filter(granularity=granularity, bucket_start__gte=start, bucket_start__lt=end)
+    if genre_id is not None:
+        buckets = buckets.filter(genre_id=genre_id)
+    ranking = list(
+        buckets.values('song_id').annotate(total=Sum('plays')).order_by('-total', 'song_id').values_list('song_id', 'total')[:limit]
+    )
+    songs = Song.objects.in_bulk([song_id for song_id, _ in ranking])
+    return [(songs[song_id], total) for song_id, total in ranking if song_id in songs]
@@ -0,0 +1,100 @@
+import functools
+import hashlib
+from calendar import timegm
+
+from django.db.models.functions import Now
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .favorites import favorite_song_ids
+
+
+def touch(queryset, **changes):
+    """
+    ``queryset.update(**changes)`` that also moves ``updated_at``. Every
+    write that bypasses ``save()`` (F() counters, bulk updates, rows that
+    embed the changed object) must go through here so validators change
+    with the content.
+    """
+    return queryset.update(updated_at=Now(), **changes)
+
+
+def resource_version(queryset, pk):
+    """
+    ``(updated_at, revision)`` of one row of ``queryset`` from the primary key
+    index, None when it does not exist or is not visible through ``queryset``.
+    """
+    fields = ['updated_at']
+    if any(field.name == 'revision' for field in queryset.model._meta.concrete_fields):
+        fields.append('revision')
+    try:
+        row = queryset.filter(pk=pk).prefetch_related(None).order_by().values_list(*fields).first()
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+    return row[0], row[1] if len(row) > 1 else 0
+
+
+def resource_etag(request, model, pk, version, scope='public', favorites=False):
+    """
+    Strong ETag of one representation: the row version plus everything else
+    the body depends on (query params, the caller for ``scope='user'``,
+    the caller's favorites when songs are flagged).
+    """
+    parts = [
+        model._meta.label_lower,
+        str(pk),
+        version[0].isoformat(),
+        str(version[1]),
+        repr(sorted(request.query_params.lists())),
+    ]
+    if scope == 'user' or favorites:
+        parts.append(str(request.user.pk) if request.user.is_authenticated else 'anon')
+    if favorites:
+        parts.append(str(hash(favorite_song_ids(request.user))))
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_response(model, scope='public', favorites=False, queryset='get_queryset'):
+    """
+    Decorator for detail read handlers (URL kwarg ``pk``): answers
+    ``If-None-Match`` / ``If-Modified-Since`` with 304 from one indexed
+    version lookup, before the response cache, serialization and favorite
+    flags, so it goes outermost. The lookup goes through the view method
+    named by ``queryset``, which must return the ``model`` rows the caller
+    may see, so a 304 never reveals a row the handler would answer with 404.
+    200 responses get ``ETag`` and, unless the body depends on the caller's
+    favorites, ``Last-Modified``.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            rows = getattr(view, queryset)()
+            version = resource_version(rows, kwargs['pk'])
+            if version is None:
+                # Handler trả về 404 như bình thường
+                return method(view, request, *args, **kwargs)
+            etag = resource_etag(request, model, kwargs['pk'], version, scope, favorites)
+            # Like/unlike không đổi updated_at nên không dùng được Last-Modified
+            last_modified = None if favorites else timegm(version[0].utctimetuple())
+
+            not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                _set_validators(not_modified, etag, last_modified)
+                return not_modified
+
+            # music.cache đưa ETag vào cache key để body luôn khớp với version đã trả
+            request.resource_etag = etag
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
@@ -0,0 +1,108 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .cache import invalidate
+from .conditional import touch
+from .models import Album, Artist, Song
+
+
+def adjust_artist(artist_id, songs=0, albums=0, plays=0):
+    """ Apply counter deltas to one artist with a single atomic F() UPDATE """
+    changes = {}
+    if songs:
+        changes['song_count'] = F('song_count') + songs
+    if albums:
+        changes['album_count'] = F('album_count') + albums
+    if plays:
+        changes['total_plays'] = F('total_plays') + plays
+    if artist_id and changes:
+        touch(Artist.objects.filter(pk=artist_id), **changes)
+
+
+def adjust_album(album_id, songs):
+    if album_id and songs:
+        touch(Album.objects.filter(pk=album_id), total_song=F('total_song') + songs)
+
+
+def _previous(instance, name):
+    loaded = getattr(instance, '_loaded_values', {})
+    if name in loaded:
+        return loaded[name]
+    return None
+
+
+def _snapshot(instance, names):
+    instance._loaded_values = {name: getattr(instance, name) for name in names}
+
+
+def song_saved(song, created):
+    plays = song.total_plays or 0
+    if created:
+        adjust_artist(song.artist_id, songs=1, plays=plays)
+        adjust_album(song.album_id, 1)
+    else:
+        if not hasattr(song, '_loaded_values'):
+            # Instance không được load từ DB: lấy giá trị cũ bằng 1 query
+            song._loaded_values = Song.objects.filter(pk=song.pk).values('artist_id', 'album_id', 'total_plays').first() or {}
+        old_artist = _previous(song, 'artist_id')
+        old_album = _previous(song, 'album_id')
+        old_plays = _previous(song, 'total_plays')
+        if old_plays is None:
+            old_plays = plays
+        if old_artist is not None and old_artist != song.artist_id:
+            adjust_artist(old_artist, songs=-1, plays=-old_plays)
+            adjust_artist(song.artist_id, songs=1, plays=plays)
+            invalidate('artist:%s' % old_artist)
+        elif plays != old_plays:
+            adjust_artist(song.artist_id, plays=plays - old_plays)
+        if 'album_id' in song._loaded_values and old_album != song.album_id:
+            adjust_album(old_album, -1)
+            adjust_album(song.album_id, 1)
+            invalidate('album:%s' % old_album if old_album else None)
+    _snapshot(song, ('artist_id', 'album_id', 'total_plays'))
+
+
+def song_deleted(song):
+    plays = _previous(song, 'total_plays')
+    adjust_artist(song.artist_id, songs=-1, plays=-(song.total_plays if plays is None else plays))
+    adjust_album(song.album_id, -1)
+
+
+def album_saved(album, created):
+    if created:
+        adjust_artist(album.artist_id, albums=1)
+    else:
+        old_artist = _previous(album, 'artist_id')
+        if old_artist is not None and old_artist != album.artist_id:
+            adjust_artist(old_artist, albums=-1)
+            adjust_artist(album.artist_id, albums=1)
+            invalidate('artist:%s' % old_artist)
+    _snapshot(album, ('artist_id',))
+
+
+def album_deleted(album):
+    adjust_artist(album.artist_id, albums=-1)
+
+
+def recount_catalog(artist_ids=None, album_ids=None):
+    """
+    Recompute every counter from the source tables, one set-based UPDATE per
+    table. Used to repair drift (e.g. after raw SQL or bulk imports); with
+    ``artist_ids`` / ``album_ids`` only those rows are recounted.
+    """
+    def grouped(queryset, field, aggregate):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(v=aggregate).values('v')
+        ), 0)
+
+    albums = Album.objects.all() if album_ids is None else Album.objects.filter(pk__in=album_ids)
+    artists = Artist.objects.all() if artist_ids is None else Artist.objects.filter(pk__in=artist_ids)
+    albums = touch(albums, total_song=grouped(Song.objects, 'album', Count('pk')))
+    artists = touch(
+        artists,
+        song_count=grouped(Song.objects, 'artist', Count('pk')),
+        album_count=grouped(Album.objects, 'artist', Count('pk')),
+        total_plays=grouped(Song.objects, 'artist', Sum('total_plays')),
+    )
+    invalidate('artist', 'album')
+    return albums, artists
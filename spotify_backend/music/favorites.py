@@ -0,0 +1,92 @@
+import functools
+
+from django.db import IntegrityError, transaction
+
+from .cache import KEY_PREFIX, get_cache, invalidate, tag_versions
+from .models import FavoriteSong
+
+# Tập ID yêu thích của mỗi user được cache đến khi user like/unlike
+FAVORITE_IDS_TIMEOUT = 24 * 60 * 60
+
+
+def _tag(user_id):
+    return 'fav:%s' % user_id
+
+
+def favorite_song_ids(user):
+    """
+    Set of song ids liked by ``user``: two cache reads, or one query on a
+    miss. The key carries the version of the user's ``fav`` tag, read before
+    the query, so a set computed before a like/unlike is stored under a
+    version nobody reads any more instead of overwriting the invalidation.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    cache = get_cache()
+    version, = tag_versions([_tag(user.pk)])
+    key = '%s:fav:%s:%s' % (KEY_PREFIX, user.pk, version)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(FavoriteSong.objects.filter(user=user).values_list('song_id', flat=True))
+        cache.set(key, ids, FAVORITE_IDS_TIMEOUT)
+    return ids
+
+
+def _forget(user_id):
+    invalidate(_tag(user_id))
+
+
+def like(user, song_id):
+    """ Add a favorite; returns False when it was already there """
+    try:
+        with transaction.atomic():
+            _, created = FavoriteSong.objects.get_or_create(user=user, song_id=song_id)
+    except IntegrityError:
+        # 2 request like cùng lúc: bản ghi đã được request kia tạo
+        created = False
+    if created:
+        _forget(user.pk)
+    return created
+
+
+def unlike(user, song_id):
+    """ Remove a favorite; returns False when there was nothing to remove """
+    deleted, _ = FavoriteSong.objects.filter(user=user, song_id=song_id).delete()
+    if deleted:
+        _forget(user.pk)
+    return bool(deleted)
+
+
+def flag_favorites(data, user, song_key=None):
+    """
+    Copy of serialized ``data`` (one song or a list) with ``is_favorite`` set
+    on every song. With ``song_key`` the song is nested under that key, as in
+    chart entries or playlist tracks.
+    """
+    ids = favorite_song_ids(user)
+
+    def flag(item):
+        if song_key is None:
+            return {**item, 'is_favorite': item['id'] in ids}
+        return {**item, song_key: {**item[song_key], 'is_favorite': item[song_key]['id'] in ids}}
+
+    if isinstance(data, list):
+        return [flag(item) for item in data]
+    return flag(data)
+
+
+def with_favorite_flags(song_key=None):
+    """
+    Decorator for song read handlers. Goes outside ``cache_response`` so the
+    shared cached payload stays user-independent and the caller's flags are
+    added afterwards from a single set lookup.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response.data, dict) and 'data' in response.data:
+                response.data = {**response.data, 'data': flag_favorites(response.data['data'], request.user, song_key)}
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,434 @@
+"""
+Synthetic, reproducible datasets for load testing (``seed_data --generate``).
+
+Every table is produced in chunks from numpy generators seeded per table,
+so the same seed and sizes give the same data (ids are offset by what is
+already in the database). Popularity follows a Zipf law: a few songs get
+most playlist slots, plays and favorites, like production. Ids are
+reserved from the sequences up front so rows can reference each other
+without reading anything back, and rows go in with PostgreSQL ``COPY``
+(``bulk_create`` on other backends).
+"""
+import io
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from accounts.models import CustomUser
+from chat.models import ChatMessage, Conversation
+from payment.models import Subscription, SubscriptionPlan
+
+from .cache import invalidate
+from .counters import recount_catalog
+from .history import ensure_partitions, is_partitioned
+from .models import Album, Artist, FavoriteSong, Genre, ListeningHistory, Playlist, PlaylistTrack, Song
+from .playlists import POSITION_GAP
+from .search import update_search_vectors
+
+# Số dòng mỗi lần COPY / bulk_create
+GENERATOR_CHUNK_SIZE = getattr(settings, 'MUSIC_GENERATOR_CHUNK_SIZE', 50000)
+# Mật khẩu chung của mọi user sinh ra (chỉ hash 1 lần)
+GENERATED_PASSWORD = 'loadtest123'
+# Số mũ Zipf: độ phổ biến của bài hát và số bài hát của mỗi artist
+SONG_ZIPF = 1.07
+ARTIST_ZIPF = 0.8
+GENRES = ('Pop', 'R&B', 'Hip-Hop', 'Rock', 'Electronic', 'Indie', 'Jazz', 'Ballad', 'EDM', 'Lo-fi', 'Acoustic', 'K-Pop')
+WORDS = (
+    'anh', 'em', 'mưa', 'nắng', 'đêm', 'ngày', 'yêu', 'nhớ', 'xa', 'về', 'mãi', 'trời', 'biển', 'tim',
+    'love', 'night', 'summer', 'dream', 'fire', 'heart', 'city', 'lights', 'home', 'blue', 'gold', 'ghost', 'echo',
+)
+PLAN_TYPES = (('FREE', 0, 1), ('INDIVIDUAL', 59000, 1), ('FAMILY', 89000, 6))
+
+
+def default_sizes(songs):
+    """ Row counts proportional to the number of songs; every one can be overridden """
+    users = max(songs // 10, 2)
+    return {
+        'songs': songs,
+        'artists': max(songs // 25, 1),
+        'albums': max(songs // 8, 1),
+        'users': users,
+        'playlists': users,
+        'history': users * 40,
+        'favorites': users * 15,
+        'messages': users * 5,
+        'subscribers': users // 4,
+    }
+
+
+class Zipf:
+    """ Samples indexes ``0..n-1`` with P ∝ 1 / rank**s; ranks are shuffled onto the indexes """
+
+    def __init__(self, n, s, rng):
+        weights = 1.0 / np.arange(1, n + 1) ** s
+        self.cdf = np.cumsum(weights)
+        self.cdf /= self.cdf[-1]
+        self.index = rng.permutation(n)
+        self.probability = np.empty(n)
+        self.probability[self.index] = weights / weights.sum()
+
+    def sample(self, rng, size):
+        return self.index[np.searchsorted(self.cdf, rng.random(size), side='right')]
+
+
+def reserve_ids(model, count):
+    """ First of ``count`` consecutive ids taken from the model's sequence """
+    table = model._meta.db_table
+    if connection.vendor != 'postgresql':
+        last = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        return last + 1
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", [table])
+        start = cursor.fetchone()[0]
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, start + count - 1])
+    return start
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return '%d seconds' % value.total_seconds()
+    return str(value)
+
+
+def insert_rows(model, columns, rows):
+    """ Insert ``rows`` (tuples in ``columns`` order, attnames) with one COPY, or ``bulk_create`` off PostgreSQL """
+    if connection.vendor != 'postgresql':
+        model.objects.bulk_create([model(**dict(zip(columns, row))) for row in rows], batch_size=1000)
+        return
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(_copy_value, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            'COPY %s (%s) FROM STDIN' % (quote(model._meta.db_table), ', '.join(map(quote, columns))),
+            buffer,
+        )
+
+
+class DatasetGenerator:
+    """
+    Builds a dataset of the given ``sizes`` (see ``default_sizes``).
+    ``progress(label, rows, seconds)`` is called after every table.
+    """
+
+    def __init__(self, sizes, seed=42, chunk_size=GENERATOR_CHUNK_SIZE, progress=None):
+        self.sizes = sizes
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+
+    def rng(self, name):
+        # Mỗi bảng có generator riêng: đổi kích thước bảng này không làm đổi dữ liệu bảng khác
+        return np.random.default_rng([self.seed, zlib.crc32(name.encode('utf-8'))])
+
+    def run(self):
+        steps = [
+            ('genres', self.genres), ('artists', self.artists), ('albums', self.albums), ('songs', self.songs),
+            ('users', self.users), ('subscriptions', self.subscriptions), ('playlists', self.playlists),
+            ('history', self.history), ('favorites', self.favorites), ('messages', self.messages),
+            ('catalog', self.finish_catalog),
+        ]
+        for label, step in steps:
+            started = time.perf_counter()
+            with transaction.atomic():
+                rows = step()
+            if self.progress is not None:
+                self.progress(label, rows, time.perf_counter() - started)
+        invalidate('song', 'artist', 'album', 'genre', 'playlist', 'chart', 'similar')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _chunks(self, total):
+        for start in range(0, total, self.chunk_size):
+            yield start, min(self.chunk_size, total - start)
+
+    def _words(self, rng, count, low=1, high=4):
+        return [' '.join(rng.choice(WORDS, rng.integers(low, high))).capitalize() for _ in range(count)]
+
+    def _moments(self, rng, count, days, part=(0, 1)):
+        """
+        ``count`` ascending UTC datetimes over the last ``days`` days; ``part``
+        ``(start, size)`` of a total restricts them to that slice of the
+        window, so chunks written one after another stay in time order.
+        """
+        first, size = part
+        total = days * 86400
+        low, high = total * first // size, total * (first + 1) // size
+        offsets = np.sort(rng.integers(low, max(high, low + 1), count))
+        return [self.now - timedelta(seconds=total - int(offset)) for offset in offsets]
+
+    # Catalog
+
+    def genres(self):
+        existing = dict(Genre.objects.filter(name__in=GENRES).values_list('name', 'id'))
+        Genre.objects.bulk_create([Genre(name=name) for name in GENRES if name not in existing])
+        self.genre_ids = np.array(list(Genre.objects.filter(name__in=GENRES).values_list('id', flat=True)))
+        return len(GENRES) - len(existing)
+
+    def artists(self):
+        rng = self.rng('artists')
+        count = self.sizes['artists']
+        self.artist_start = reserve_ids(Artist, count)
+        for start, size in self._chunks(count):
+            names = self._words(rng, size, 1, 3)
+            verified = rng.random(size) < 0.2
+            insert_rows(
+                Artist, ('id', 'name', 'bio', 'verified', 'monthly_listeners', 'song_count', 'album_count', 'total_plays', 'updated_at'),
+                [
+                    (self.artist_start + start + i, '%s %d' % (names[i], start + i), '', bool(verified[i]), 0, 0, 0, 0, self.now)
+                    for i in range(size)
+                ],
+            )
+        return count
+
+    def albums(self):
+        rng = self.rng('albums')
+        count = self.sizes['albums']
+        artists = Zipf(self.sizes['artists'], ARTIST_ZIPF, rng)
+        self.album_start = reserve_ids(Album, count)
+        self.album_artist = artists.sample(rng, count) + self.artist_start
+        for start, size in self._chunks(count):
+            titles = self._words(rng, size)
+            genres = rng.choice(self.genre_ids, size)
+            days = rng.integers(0, 20 * 365, size)
+            insert_rows(
+                Album, ('id', 'title', 'artist_id', 'genre_id', 'total_song', 'release_date', 'updated_at'),
+                [
+                    (
+                        self.album_start + start + i, titles[i], int(self.album_artist[start + i]), int(genres[i]), 0,
+                        self.now.date() - timedelta(days=int(days[i])), self.now,
+                    )
+                    for i in range(size)
+                ],
+            )
+        return count
+
+    def songs(self):
+        rng = self.rng('songs')
+        count = self.sizes['songs']
+        self.popularity = Zipf(count, SONG_ZIPF, rng)
+        self.song_start = reserve_ids(Song, count)
+        self.durations = rng.integers(90, 420, count)
+        # Lượt nghe tổng tỉ lệ với độ phổ biến, cùng phân phối với lịch sử nghe sinh ra bên dưới
+        plays = np.rint(self.popularity.probability * self.sizes['history'] * 200).astype(np.int64)
+        for start, size in self._chunks(count):
+            titles = self._words(rng, size)
+            albums = rng.integers(0, self.sizes['albums'], size)
+            single = rng.random(size) < 0.1
+            genres = rng.choice(self.genre_ids, size)
+            days = rng.integers(0, 20 * 365, size)
+            rows = []
+            for i in range(size):
+                pk = self.song_start + start + i
+                album = int(albums[i])
+                rows.append((
+                    pk, titles[i], int(self.album_artist[album]), None if single[i] else self.album_start + album,
+                    int(genres[i]), 'synthetic/song_%d' % pk, int(self.durations[start + i]), titles[i].lower(),
+                    int(plays[start + i]), self.now.date() - timedelta(days=int(days[i])), self.now,
+                ))
+            insert_rows(
+                Song, (
+                    'id', 'title', 'artist_id', 'album_id', 'genre_id', 'audio_file', 'duration', 'lyrics',
+                    'total_plays', 'release_date', 'updated_at',
+                ),
+                rows,
+            )
+        return count
+
+    def finish_catalog(self):
+        """ Counters and search vectors in set-based UPDATEs, since nothing above sent signals """
+        recount_catalog()
+        end = self.song_start + self.sizes['songs']
+        for start, _ in self._chunks(self.sizes['songs']):
+            first = self.song_start + start
+            update_search_vectors(Song.objects.filter(pk__gte=first, pk__lt=min(first + self.chunk_size, end)))
+        return self.sizes['songs']
+
+    # Users
+
+    def users(self):
+        rng = self.rng('users')
+        count = self.sizes['users']
+        password = make_password(GENERATED_PASSWORD)
+        self.user_start = reserve_ids(CustomUser, count)
+        self.premium = np.zeros(count, dtype=bool)
+        self.premium[rng.choice(count, min(self.sizes['subscribers'], count), replace=False)] = True
+        columns = (
+            'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff',
+            'is_active', 'date_joined', 'gender', 'date_of_birth', 'is_premium',
+        )
+        for start, size in self._chunks(count):
+            genders = rng.choice(['M', 'F', 'O'], size, p=[0.48, 0.48, 0.04])
+            ages = rng.integers(13 * 365, 60 * 365, size)
+            joined = self._moments(rng, size, 3 * 365)
+            rows = []
+            for i in range(size):
+                pk = self.user_start + start + i
+                rows.append((
+                    pk, password, False, 'loadtest_%d' % pk, '', '', 'loadtest_%d@example.com' % pk, False, True,
+                    joined[i], str(genders[i]), self.now.date() - timedelta(days=int(ages[i])), bool(self.premium[start + i]),
+                ))
+            insert_rows(CustomUser, columns, rows)
+        return count
+
+    def subscriptions(self):
+        rng = self.rng('subscriptions')
+        plans = {}
+        for plan_type, price, max_users in PLAN_TYPES:
+            plan = SubscriptionPlan.objects.filter(plan_type=plan_type).first() or SubscriptionPlan.objects.create(
+                name=plan_type.title(), description=plan_type.title(), price=price, plan_type=plan_type, max_users=max_users,
+            )
+            plans[plan_type] = plan.pk
+        premium = np.flatnonzero(self.premium) + self.user_start
+        start_days = rng.integers(0, 330, len(premium))
+        family = rng.random(len(premium)) < 0.3
+        rows = [
+            (
+                int(user), plans['FAMILY'] if family[i] else plans['INDIVIDUAL'],
+                self.now - timedelta(days=int(start_days[i])), self.now + timedelta(days=365 - int(start_days[i])),
+                'ACTIVE', True,
+            )
+            for i, user in enumerate(premium)
+        ]
+        for start, size in self._chunks(len(rows)):
+            insert_rows(Subscription, ('user_id', 'plan_id', 'start_date', 'end_date', 'status', 'auto_renew'), rows[start:start + size])
+        return len(rows)
+
+    # Activity
+
+    def _users(self, rng, size):
+        return rng.integers(0, self.sizes['users'], size) + self.user_start
+
+    def _songs(self, rng, size):
+        return self.popularity.sample(rng, size) + self.song_start
+
+    def playlists(self):
+        rng = self.rng('playlists')
+        count = self.sizes['playlists']
+        playlist_start = reserve_ids(Playlist, count)
+        owners = self._users(rng, count)
+        # Độ dài playlist lệch phải: đa số ngắn, một ít rất dài
+        lengths = np.clip(rng.lognormal(3.0, 0.9, count).astype(int), 1, min(1000, self.sizes['songs']))
+        names = self._words(rng, count)
+        created = self._moments(rng, count, 365)
+        for start, size in self._chunks(count):
+            insert_rows(
+                Playlist, ('id', 'name', 'user_id', 'is_public', 'created_at', 'updated_at', 'revision'),
+                [
+                    (playlist_start + start + i, names[start + i], int(owners[start + i]), bool(i % 3 == 0),
+                     created[start + i], self.now, 0)
+                    for i in range(size)
+                ],
+            )
+        tracks = []
+        total = 0
+        for index in range(count):
+            draw = self._songs(rng, int(lengths[index] * 1.3) + 1)
+            # Bỏ bài trùng nhưng giữ thứ tự rút
+            _, first = np.unique(draw, return_index=True)
+            songs = draw[np.sort(first)][:lengths[index]]
+            tracks.extend(
+                (playlist_start + index, int(song), (position + 1) * POSITION_GAP, created[index])
+                for position, song in enumerate(songs)
+            )
+            if len(tracks) >= self.chunk_size:
+                insert_rows(PlaylistTrack, ('playlist_id', 'song_id', 'position', 'added_at'), tracks)
+                total += len(tracks)
+                tracks = []
+        if tracks:
+            insert_rows(PlaylistTrack, ('playlist_id', 'song_id', 'position', 'added_at'), tracks)
+            total += len(tracks)
+        return count + total
+
+    def history(self, days=28):
+        rng = self.rng('history')
+        count = self.sizes['history']
+        if is_partitioned():
+            ensure_partitions(now=self.now - timedelta(days=days))
+        chunks = -(-count // self.chunk_size)
+        for index, (start, size) in enumerate(self._chunks(count)):
+            songs = self._songs(rng, size)
+            users = self._users(rng, size)
+            listened = self._moments(rng, size, days, (index, chunks))
+            fraction = rng.uniform(0.1, 1.0, size)
+            insert_rows(
+                ListeningHistory, ('user_id', 'song_id', 'listened_at', 'duration_listened'),
+                [
+                    (int(users[i]), int(songs[i]), listened[i],
+                     timedelta(seconds=int(self.durations[songs[i] - self.song_start] * fraction[i])))
+                    for i in range(size)
+                ],
+            )
+        return count
+
+    def favorites(self):
+        rng = self.rng('favorites')
+        count = self.sizes['favorites']
+        users = np.sort(self._users(rng, count))
+        songs = self._songs(rng, count)
+        # Mỗi (user, song) chỉ một lần
+        pairs = np.unique(np.stack([users, songs], axis=1), axis=0)
+        added = self._moments(rng, len(pairs), 365)
+        for start, size in self._chunks(len(pairs)):
+            insert_rows(
+                FavoriteSong, ('user_id', 'song_id', 'added_at'),
+                [(int(user), int(song), added[start + i]) for i, (user, song) in enumerate(pairs[start:start + size])],
+            )
+        return len(pairs)
+
+    def messages(self, partners=4, days=30):
+        """ Messages between each user and a few fixed partners, plus both sides' inbox rows """
+        rng = self.rng('messages')
+        count = self.sizes['messages']
+        users = self.sizes['users']
+        message_start = reserve_ids(ChatMessage, count)
+        friends = rng.integers(0, users, (users, partners))
+        inbox = {}
+        chunks = -(-count // self.chunk_size)
+        for index, (start, size) in enumerate(self._chunks(count)):
+            senders = rng.integers(0, users, size)
+            receivers = friends[senders, rng.integers(0, partners, size)]
+            sent = self._moments(rng, size, days, (index, chunks))
+            words = self._words(rng, size, 1, 8)
+            rows = []
+            for i in range(size):
+                sender, receiver = int(senders[i]) + self.user_start, int(receivers[i]) + self.user_start
+                if sender == receiver:
+                    receiver = self.user_start + (receiver - self.user_start + 1) % users
+                pk = message_start + start + i
+                # Tin trong 2 ngày gần nhất còn chưa đọc
+                is_read = sent[i] < self.now - timedelta(days=2)
+                rows.append((pk, sender, receiver, words[i], sent[i], is_read))
+                for owner, partner in ((sender, receiver), (receiver, sender)):
+                    inbox[(owner, partner)] = [pk, sent[i], inbox.get((owner, partner), [0, 0, 0])[2]]
+                if not is_read:
+                    inbox[(receiver, sender)][2] += 1
+            insert_rows(ChatMessage, ('id', 'sender_id', 'receiver_id', 'message', 'timestap', 'is_read'), rows)
+        conversations = [
+            (owner, partner, last_message, last_message_at, unread)
+            for (owner, partner), (last_message, last_message_at, unread) in inbox.items()
+        ]
+        for start, size in self._chunks(len(conversations)):
+            insert_rows(
+                Conversation, ('owner_id', 'partner_id', 'last_message_id', 'last_message_at', 'unread_count'),
+                conversations[start:start + size],
+            )
+        return count + len(conversations)
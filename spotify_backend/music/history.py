@@ -0,0 +1,192 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+
+from .charts import WATERMARK_NAME as CHARTS_WATERMARK
+from .listeners import WATERMARK_NAME as LISTENERS_WATERMARK
+from .models import DailyListeningAggregate, JobWatermark, ListeningHistory
+
+TABLE = ListeningHistory._meta.db_table
+DEFAULT_PARTITION = TABLE + '_default'
+MONTHS_AHEAD = 3
+# Giữ từng lượt nghe trong N tháng, cũ hơn thì gộp thành tổng theo ngày
+RETENTION_MONTHS = 6
+# Các job đọc ListeningHistory theo watermark
+HISTORY_JOBS = (CHARTS_WATERMARK, LISTENERS_WATERMARK)
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return '%s_p%s' % (TABLE, month.strftime('%Y%m'))
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def monthly_partitions():
+    """ ``{month_start: table_name}`` of the attached monthly partitions """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = TABLE + '_p'
+    partitions = {}
+    for name in names:
+        if name.startswith(prefix):
+            stamp = name[len(prefix):]
+            partitions[datetime(int(stamp[:4]), int(stamp[4:]), 1, tzinfo=dt_timezone.utc)] = name
+    return partitions
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD, now=None):
+    """
+    Create the partitions for the current month and ``months_ahead`` more.
+    Rows that already landed in the default partition for one of those
+    months are moved into the new partition before it is attached, since
+    PostgreSQL refuses to attach a range the default partition overlaps.
+    Returns the names of the partitions created.
+    """
+    existing = monthly_partitions()
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        start, end = month.isoformat(), add_months(month, 1).isoformat()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE listened_at >= %s AND listened_at < %s RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved',
+                [start, end],
+            )
+            cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", [start, end])
+        created.append(name)
+    return created
+
+
+def compaction_limit():
+    """
+    Highest history id below which every incremental job has consumed all
+    rows. Rows past it must stay, otherwise charts or monthly listeners would
+    miss them; a job that never ran counts as position 0, and a hole the job
+    still waits on (see ``music.watermarks``) caps its position.
+    """
+    consumed = {
+        name: min([position] + [low - 1 for low, _, _ in gaps])
+        for name, position, gaps in JobWatermark.objects.filter(name__in=HISTORY_JOBS).values_list('name', 'position', 'gaps')
+    }
+    return min(consumed.get(name, 0) for name in HISTORY_JOBS)
+
+
+def _merge_aggregates(rows):
+    keys = {(row['user_id'], row['day'], row['song_id']) for row in rows}
+    existing = {
+        (agg.user_id, agg.day, agg.song_id): agg
+        for agg in DailyListeningAggregate.objects.select_for_update().filter(
+            user_id__in={key[0] for key in keys},
+            day__in={key[1] for key in keys},
+            song_id__in={key[2] for key in keys},
+        )
+    }
+    to_update, to_create = [], []
+    for row in rows:
+        agg = existing.get((row['user_id'], row['day'], row['song_id']))
+        if agg is None:
+            to_create.append(DailyListeningAggregate(
+                user_id=row['user_id'], song_id=row['song_id'], day=row['day'],
+                plays=row['plays'], duration_listened=row['duration'],
+            ))
+        else:
+            agg.plays += row['plays']
+            agg.duration_listened += row['duration']
+            to_update.append(agg)
+    DailyListeningAggregate.objects.bulk_create(to_create, batch_size=1000)
+    DailyListeningAggregate.objects.bulk_update(to_update, ['plays', 'duration_listened'], batch_size=1000)
+
+
+def _compact_range(start, end, batch_size):
+    """ Fold the rows of [start, end) into daily aggregates; returns the number of plays """
+    rows = (
+        ListeningHistory.objects.filter(listened_at__gte=start, listened_at__lt=end)
+        .annotate(day=TruncDate('listened_at', tzinfo=dt_timezone.utc))
+        .values('user_id', 'song_id', 'day')
+        .annotate(plays=Count('id'), duration=Sum('duration_listened'))
+        .order_by()
+    )
+    plays = 0
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        plays += row['plays']
+        if len(batch) >= batch_size:
+            _merge_aggregates(batch)
+            batch = []
+    if batch:
+        _merge_aggregates(batch)
+    return plays
+
+
+def compact_history(retention_months=RETENTION_MONTHS, now=None, batch_size=5000):
+    """
+    Compact every month older than ``retention_months`` into
+    ``DailyListeningAggregate`` and drop its rows: a whole partition is
+    dropped with one DROP TABLE on PostgreSQL, otherwise rows are deleted.
+    A month is skipped while it holds rows no incremental job has read yet.
+    Returns ``(compacted, skipped)`` lists of month starts.
+    """
+    cutoff = add_months(month_start(now or datetime.now(dt_timezone.utc)), -retention_months)
+    limit = compaction_limit()
+    partitioned = is_partitioned()
+    partitions = monthly_partitions() if partitioned else {}
+
+    oldest = ListeningHistory.objects.filter(listened_at__lt=cutoff).aggregate(first=Min('listened_at'))['first']
+    months = set(month for month in partitions if month < cutoff)
+    if oldest is not None:
+        month = month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = add_months(month, 1)
+
+    compacted, skipped = [], []
+    for month in sorted(months):
+        end = add_months(month, 1)
+        in_month = ListeningHistory.objects.filter(listened_at__gte=month, listened_at__lt=end)
+        last_id = in_month.aggregate(last=Max('id'))['last']
+        if last_id is None and month not in partitions:
+            continue
+        if last_id is not None and last_id > limit:
+            skipped.append(month)
+            continue
+        with transaction.atomic():
+            if last_id is not None:
+                _compact_range(month, end, batch_size)
+            if month in partitions:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {partitions[month]}')
+            else:
+                # Bảng thường, hoặc các hàng nằm trong default partition
+                in_month.delete()
+        compacted.append(month)
+    return compacted, skipped
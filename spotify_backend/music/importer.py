@@ -0,0 +1,268 @@
+import csv
+import json
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidate
+from .counters import recount_catalog
+from .models import Album, Artist, Genre, ImportCheckpoint, Song
+from .search import update_search_vectors
+
+# Số dòng mỗi transaction; checkpoint được ghi cùng transaction nên chạy lại sẽ tiếp tục từ lô chưa commit
+IMPORT_BATCH_SIZE = getattr(settings, 'MUSIC_IMPORT_BATCH_SIZE', 5000)
+FORMATS = ('csv', 'jsonl')
+
+# Cột của file nhập; chỉ title, artist và duration là bắt buộc
+COLUMNS = (
+    'title', 'artist', 'album', 'genre', 'duration', 'release_date', 'album_release_date',
+    'lyrics', 'total_plays', 'audio_file', 'video_file', 'song_image', 'cover_image',
+)
+
+
+# Độ dài tối đa của các cột tên, lấy từ model
+MAX_LENGTHS = {
+    'title': Song._meta.get_field('title').max_length,
+    'artist': Artist._meta.get_field('name').max_length,
+    'album': Album._meta.get_field('title').max_length,
+    'genre': Genre._meta.get_field('name').max_length,
+}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def read_records(path, fmt):
+    """ Stream ``(line, record)`` pairs from a CSV (with header) or JSONL file """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                record = exc
+            yield number, record
+
+
+def _text(record, name):
+    value = record.get(name)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _date(record, name):
+    value = _text(record, name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ImportRowError(f'{name} không phải ngày YYYY-MM-DD: {value!r}')
+
+
+def _duration(value):
+    """ Seconds from ``245``, ``4:05`` or ``1:04:05`` """
+    try:
+        seconds = 0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        raise ImportRowError(f'duration không hợp lệ: {value!r}')
+    if seconds < 0:
+        raise ImportRowError(f'duration không hợp lệ: {value!r}')
+    return seconds
+
+
+def parse_record(record):
+    """ Validate one input record into plain values; raises ``ImportRowError`` """
+    if isinstance(record, Exception):
+        raise ImportRowError(f'JSON không hợp lệ: {record}')
+    if not isinstance(record, dict):
+        raise ImportRowError('Mỗi dòng phải là một object')
+    row = {name: _text(record, name) for name in ('title', 'artist', 'album', 'genre', 'lyrics')}
+    if not row['title'] or not row['artist']:
+        raise ImportRowError('Thiếu title hoặc artist')
+    for name, limit in MAX_LENGTHS.items():
+        if len(row[name]) > limit:
+            raise ImportRowError(f'{name} dài quá {limit} ký tự')
+    if _text(record, 'duration') == '':
+        raise ImportRowError('Thiếu duration')
+    row['duration'] = _duration(record['duration'])
+    row['release_date'] = _date(record, 'release_date')
+    row['album_release_date'] = _date(record, 'album_release_date') or row['release_date']
+    plays = _text(record, 'total_plays') or '0'
+    if not plays.isdigit():
+        raise ImportRowError(f'total_plays không hợp lệ: {plays!r}')
+    row['total_plays'] = int(plays)
+    # audio_file là cột NOT NULL
+    row['audio_file'] = _text(record, 'audio_file')
+    for name in ('video_file', 'song_image', 'cover_image'):
+        row[name] = _text(record, name) or None
+    return row
+
+
+class CatalogImporter:
+    """
+    Streams catalog records into Genre/Artist/Album/Song with batched
+    ``bulk_create``. Names are resolved through in-memory maps loaded once
+    (genre and artist by name, album by ``(artist id, title)``), so a batch
+    costs a fixed handful of queries whatever its size:
+
+    - one ``bulk_create`` per model for the names not seen yet,
+    - one lookup of the batch's songs that already exist (re-runs and
+      duplicate rows are skipped on ``(artist, album, title)``),
+    - one ``bulk_create`` of the songs, one search vector UPDATE,
+    - one counter recount of the touched artists and albums (bulk_create
+      sends no signals, see ``music.counters``),
+    - the checkpoint (``ImportCheckpoint``) in the same transaction, so an
+      interrupted import resumes after the last committed batch; it is
+      deleted once the whole input has been imported.
+    """
+
+    def __init__(self, checkpoint, batch_size=IMPORT_BATCH_SIZE):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.genres = dict(Genre.objects.values_list('name', 'id'))
+        self.artists = dict(Artist.objects.values_list('name', 'id').iterator(chunk_size=10000))
+        self.albums = {
+            (artist_id, title): pk
+            for pk, artist_id, title in Album.objects.values_list('id', 'artist_id', 'title').iterator(chunk_size=10000)
+        }
+
+    def position(self):
+        return ImportCheckpoint.objects.filter(name=self.checkpoint).values_list('position', flat=True).first() or 0
+
+    def reset(self):
+        ImportCheckpoint.objects.filter(name=self.checkpoint).delete()
+
+    def run(self, records, progress=None, errors=None):
+        """
+        Import ``(line, record)`` pairs, skipping the ones before the
+        checkpoint, which is deleted once the input is exhausted. Returns
+        totals; ``progress(stats)`` is called after every committed batch and
+        ``errors(line, message)`` for every rejected row.
+        """
+        stats = {'read': 0, 'skipped': 0, 'created': 0, 'duplicates': 0, 'rejected': 0}
+        start = self.position()
+        batch = []
+        consumed = pending = 0
+        for line, record in records:
+            consumed += 1
+            if consumed <= start:
+                stats['skipped'] += 1
+                continue
+            stats['read'] += 1
+            pending += 1
+            try:
+                batch.append((line, parse_record(record)))
+            except ImportRowError as exc:
+                self._reject(stats, errors, line, str(exc))
+            if pending >= self.batch_size:
+                self._commit(batch, consumed, stats, progress, errors)
+                batch = []
+                pending = 0
+        if pending:
+            self._commit(batch, consumed, stats, progress, errors)
+        # Đã nhập hết file, lần chạy sau bắt đầu lại từ đầu
+        self.reset()
+        return stats
+
+    @staticmethod
+    def _reject(stats, errors, line, message):
+        stats['rejected'] += 1
+        if errors is not None:
+            errors(line, message)
+
+    def _commit(self, batch, position, stats, progress, errors):
+        # Album mới cần ngày phát hành (từ một dòng bất kỳ của album trong lô); album đã có thì không
+        dated = {(row['artist'], row['album']) for _, row in batch if row['album'] and row['album_release_date']}
+        rows = []
+        for line, row in batch:
+            key = (row['artist'], row['album'])
+            if row['album'] and key not in dated and (self.artists.get(row['artist']), row['album']) not in self.albums:
+                self._reject(stats, errors, line, 'Album mới cần album_release_date hoặc release_date')
+            else:
+                rows.append(row)
+        with transaction.atomic():
+            created, duplicates = self._write(rows)
+            ImportCheckpoint.objects.update_or_create(name=self.checkpoint, defaults={'position': position})
+        stats['created'] += created
+        stats['duplicates'] += duplicates
+        if progress is not None:
+            progress(stats)
+
+    def _write(self, rows):
+        if not rows:
+            return 0, 0
+        self._create_missing(
+            Genre, self.genres, {row['genre'] for row in rows if row['genre']},
+            lambda name: Genre(name=name),
+        )
+        self._create_missing(
+            Artist, self.artists, {row['artist'] for row in rows},
+            lambda name: Artist(name=name),
+        )
+        albums = {}
+        for row in rows:
+            if row['album'] and row['album_release_date']:
+                albums.setdefault((self.artists[row['artist']], row['album']), row)
+        self._create_missing(
+            Album, self.albums, set(albums),
+            lambda key: Album(
+                artist_id=key[0], title=key[1], genre_id=self.genres.get(albums[key]['genre']),
+                release_date=albums[key]['album_release_date'], cover_image=albums[key]['cover_image'],
+            ),
+        )
+
+        artist_ids = {self.artists[row['artist']] for row in rows}
+        seen = set(
+            Song.objects.filter(artist_id__in=artist_ids, title__in={row['title'] for row in rows})
+            .values_list('artist_id', 'album_id', 'title')
+        )
+        songs = []
+        for row in rows:
+            artist_id = self.artists[row['artist']]
+            album_id = self.albums.get((artist_id, row['album'])) if row['album'] else None
+            key = (artist_id, album_id, row['title'])
+            if key in seen:
+                continue
+            seen.add(key)
+            songs.append(Song(
+                title=row['title'], artist_id=artist_id, album_id=album_id,
+                genre_id=self.genres.get(row['genre']), duration=row['duration'], lyrics=row['lyrics'],
+                total_plays=row['total_plays'], release_date=row['release_date'], audio_file=row['audio_file'],
+                video_file=row['video_file'], song_image=row['song_image'],
+            ))
+        if not songs:
+            return 0, len(rows)
+
+        Song.objects.bulk_create(songs, batch_size=1000)
+        update_search_vectors(Song.objects.filter(pk__in=[song.pk for song in songs]))
+        touched_artists = {song.artist_id for song in songs}
+        touched_albums = {song.album_id for song in songs if song.album_id}
+        recount_catalog(artist_ids=touched_artists, album_ids=touched_albums)
+        invalidate(
+            'song', 'genre',
+            *['artist:%s' % pk for pk in touched_artists],
+            *['album:%s' % pk for pk in touched_albums],
+        )
+        return len(songs), len(rows) - len(songs)
+
+    @staticmethod
+    def _create_missing(model, known, names, build):
+        """ ``bulk_create`` the entries of ``names`` missing from ``known`` and add their new ids to it """
+        missing = [name for name in names if name not in known]
+        if not missing:
+            return
+        objects = model.objects.bulk_create([build(name) for name in missing], batch_size=1000)
+        for name, obj in zip(missing, objects):
+            known[name] = obj.pk
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate
+from .conditional import touch
+from .hll import HyperLogLog
+from .models import Album, Artist, ArtistListenerSketch
+from .watermarks import HistoryCursor
+
+WATERMARK_NAME = 'monthly_listeners'
+WINDOW_DAYS = 28
+# Giữ thêm vài ngày sau cửa sổ để có thể chạy lại job cho ngày hôm trước
+RETENTION_DAYS = WINDOW_DAYS + 7
+
+
+def ingest_plays(chunk_size=20000):
+    """
+    Fold ListeningHistory rows past the job watermark into per-artist, per-day
+    sketches. Work and memory are bounded by ``chunk_size``; the watermark is
+    advanced in the same transaction as the sketches, so an interrupted run
+    resumes where it stopped. Rows committed late, below the watermark, are
+    picked up through ``music.watermarks``. Returns the ids of the artists
+    that were touched.
+    """
+    cursor = HistoryCursor(WATERMARK_NAME)
+    touched = set()
+    for rows in cursor.batches(('song__artist_id', 'user_id', 'listened_at'), chunk_size):
+        sketches = {}
+        for _, artist_id, user_id, listened_at in rows:
+            key = (artist_id, listened_at.date())
+            if key not in sketches:
+                sketches[key] = HyperLogLog()
+            sketches[key].add(user_id)
+        with transaction.atomic():
+            _merge_sketches(sketches)
+            cursor.advance(rows)
+        touched.update(artist_id for artist_id, _ in sketches)
+    return touched
+
+
+def _merge_sketches(sketches):
+    artist_ids = {artist_id for artist_id, _ in sketches}
+    days = {day for _, day in sketches}
+    existing = {
+        (sketch.artist_id, sketch.day): sketch
+        for sketch in ArtistListenerSketch.objects.select_for_update().filter(artist_id__in=artist_ids, day__in=days)
+    }
+    to_update, to_create = [], []
+    for (artist_id, day), sketch in sketches.items():
+        row = existing.get((artist_id, day))
+        if row is None:
+            to_create.append(ArtistListenerSketch(artist_id=artist_id, day=day, registers=sketch.to_bytes()))
+        else:
+            row.registers = sketch.merge(row.registers).to_bytes()
+            to_update.append(row)
+    ArtistListenerSketch.objects.bulk_create(to_create, batch_size=500)
+    ArtistListenerSketch.objects.bulk_update(to_update, ['registers'], batch_size=500)
+
+
+def refresh_monthly_listeners(window_days=WINDOW_DAYS, today=None, batch_size=500):
+    """
+    Recompute ``Artist.monthly_listeners`` by merging each artist's daily
+    sketches over the last ``window_days`` days. Only artists with a sketch in
+    the window, or a non-zero count left from an earlier run, are touched, so
+    the cost follows recent activity rather than the size of the history
+    table; the latter drop to 0 even when the job skipped some days.
+    """
+    today = today or timezone.now().date()
+    start = today - timedelta(days=window_days - 1)
+    active = ArtistListenerSketch.objects.filter(day__gte=start, day__lte=today).values('artist_id')
+    artist_ids = sorted(
+        set(active.values_list('artist_id', flat=True).distinct())
+        | set(Artist.objects.filter(monthly_listeners__gt=0).exclude(pk__in=active).values_list('pk', flat=True))
+    )
+    updated = 0
+    for i in range(0, len(artist_ids), batch_size):
+        chunk = artist_ids[i:i + batch_size]
+        merged = {artist_id: HyperLogLog() for artist_id in chunk}
+        rows = (
+            ArtistListenerSketch.objects.filter(artist_id__in=chunk, day__gte=start, day__lte=today)
+            .values_list('artist_id', 'registers')
+            .iterator(chunk_size=batch_size)
+        )
+        for artist_id, registers in rows:
+            merged[artist_id].merge(registers)
+        now = timezone.now()
+        artists = [
+            Artist(pk=artist_id, monthly_listeners=sketch.count(), updated_at=now) for artist_id, sketch in merged.items()
+        ]
+        Artist.objects.bulk_update(artists, ['monthly_listeners', 'updated_at'])
+        # Album nhúng monthly_listeners của artist
+        touch(Album.objects.filter(artist_id__in=chunk))
+        # bulk_update không gửi signal nên phải tự vô hiệu hoá cache
+        invalidate('artist', 'album', *['artist:%s' % artist_id for artist_id in chunk])
+        updated += len(artists)
+
+    ArtistListenerSketch.objects.filter(day__lt=today - timedelta(days=RETENTION_DAYS)).delete()
+    return updated
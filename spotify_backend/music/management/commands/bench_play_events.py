@@ -0,0 +1,59 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from music.models import Song
+from music.playback import PlayEventBuffer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sustained play-event ingestion through the batched buffer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', default=100000, type=int, help='Total number of events to ingest')
+        parser.add_argument('--request-size', default=50, type=int, help='Events per simulated client request')
+        parser.add_argument('--flush-size', default=500, type=int, help='Buffer size that triggers a flush')
+        parser.add_argument('--seed', default=42, type=int, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        song_ids = list(Song.objects.values_list('id', flat=True)[:10000])
+        user_ids = list(CustomUser.objects.values_list('id', flat=True)[:10000])
+        if not song_ids or not user_ids:
+            raise CommandError('Cần có ít nhất 1 bài hát và 1 người dùng (chạy seed_data trước).')
+
+        rng = random.Random(options['seed'])
+        buffer = PlayEventBuffer(flush_size=options['flush_size'], background=False)
+        total = options['events']
+        request_size = options['request_size']
+        now = timezone.now()
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            sent = 0
+            while sent < total:
+                size = min(request_size, total - sent)
+                buffer.add([
+                    {
+                        'user_id': rng.choice(user_ids),
+                        'song_id': rng.choice(song_ids),
+                        'duration_listened': timedelta(seconds=rng.randint(5, 300)),
+                        'listened_at': now,
+                    }
+                    for _ in range(size)
+                ])
+                sent += size
+            buffer.flush()
+            elapsed = time.perf_counter() - started
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} events in {elapsed:.2f}s: {total / elapsed:,.0f} events/s '
+            f'(flush size {options["flush_size"]}, {request_size} events per request)'
+        ))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from music.models import Artist, Playlist, PlaylistTrack, Song
+from music.playlists import add_songs, missing_song_ids, move_track, remove_songs
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk add/remove, reorder and paging on a large playlist (runs in a rolled back transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--songs', default=10000, type=int, help='Number of songs in the playlist')
+
+    def handle(self, *args, **options):
+        total = options['songs']
+        user = CustomUser.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('Cần có ít nhất 1 người dùng (chạy seed_data trước).')
+
+        with transaction.atomic():
+            song_ids = self._song_ids(total)
+            playlist = Playlist.objects.create(name='bench_playlist_bulk', user=user)
+
+            self._step('validate', lambda: missing_song_ids(song_ids))
+            self._step('add', lambda: add_songs(playlist, song_ids))
+            self._step('re-add (all duplicates)', lambda: add_songs(playlist, song_ids))
+            middle = song_ids[len(song_ids) // 2]
+            self._step('move to start', lambda: [move_track(playlist, middle)])
+            self._step('move after last', lambda: [move_track(playlist, middle, after=song_ids[-1])])
+            self._step('read deep page', lambda: self._page(playlist, song_ids[-100]))
+            self._step('remove', lambda: remove_songs(playlist, song_ids))
+
+            transaction.set_rollback(True)
+
+    def _song_ids(self, total):
+        song_ids = list(Song.objects.order_by('id').values_list('id', flat=True)[:total])
+        missing = total - len(song_ids)
+        if missing > 0:
+            # Tạo tạm bài hát cho đủ số lượng; sẽ bị rollback cùng transaction
+            artist = Artist.objects.create(name='bench_playlist_bulk')
+            Song.objects.bulk_create(
+                [Song(title=f'bench song {i}', artist=artist, audio_file='bench', duration=180) for i in range(missing)],
+                batch_size=1000,
+            )
+            song_ids = list(Song.objects.order_by('id').values_list('id', flat=True)[:total])
+        return song_ids
+
+    def _page(self, playlist, song_id):
+        # Giống KeysetPagination: range scan từ vị trí của cursor
+        position = PlaylistTrack.objects.get(playlist=playlist, song_id=song_id).position
+        return list(
+            PlaylistTrack.objects.filter(playlist=playlist, position__gt=position)
+            .select_related('song').order_by('position', 'id')[:50]
+        )
+
+    def _step(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+        size = result if isinstance(result, int) else len(result)
+        self.stdout.write(f'{label:<24} {size:>7} rows  {elapsed * 1000:9.1f} ms  {len(queries):>3} queries')
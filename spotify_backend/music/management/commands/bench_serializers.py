@@ -0,0 +1,89 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import CustomUser
+from music.models import Album, Artist, Playlist, PlaylistTrack, Song
+from music.representations import (
+    AlbumRepresentation, ArtistRepresentation, PlaylistRepresentation, SongRepresentation, clear_media_url_cache,
+)
+from music.serializers import AlbumSerializer, ArtistSerializer, PlaylistSerializer, SongSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare ModelSerializer and the values() fast path on list payloads (runs in a rolled back transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default=10000, type=int, help='Songs to serialize; parents get 10 songs each')
+        parser.add_argument('--repeat', default=3, type=int, help='Warm runs per path, the best one is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        renderer = JSONRenderer()
+        with transaction.atomic():
+            ids = self._fixtures(rows)
+            cases = [
+                ('song', Song.objects.filter(pk__in=ids['song']).order_by('id'),
+                 SongSerializer, SongRepresentation()),
+                ('artist', ArtistSerializer.setup_eager_loading(Artist.objects.filter(pk__in=ids['artist']).order_by('id')),
+                 ArtistSerializer, ArtistRepresentation()),
+                ('album', AlbumSerializer.setup_eager_loading(Album.objects.filter(pk__in=ids['album']).order_by('id')),
+                 AlbumSerializer, AlbumRepresentation()),
+                ('playlist', PlaylistSerializer.setup_eager_loading(Playlist.objects.filter(pk__in=ids['playlist']).order_by('id')),
+                 PlaylistSerializer, PlaylistRepresentation()),
+            ]
+            for label, queryset, serializer_class, representation in cases:
+                fast = lambda qs: representation.data(representation.values(qs))  # noqa: E731
+                # Lần đầu của fast path là "lạnh": chưa có URL media nào trong cache
+                clear_media_url_cache()
+                fast_body, cold, _ = self._timed(lambda: renderer.render(fast(queryset.all())), 1)
+                _, _, warm = self._timed(lambda: renderer.render(fast(queryset.all())), options['repeat'])
+                slow_body, _, slow = self._timed(lambda: renderer.render(serializer_class(queryset.all(), many=True).data), options['repeat'])
+                if slow_body != fast_body:
+                    raise CommandError(f'{label}: JSON của fast path khác serializer')
+                self.stdout.write(
+                    f'{label:<9} {len(ids[label]):>6} rows  serializer {slow * 1000:8.1f} ms  '
+                    f'fast path cold {cold * 1000:8.1f} ms (x{slow / cold:4.1f})  warm {warm * 1000:8.1f} ms (x{slow / warm:5.1f})  '
+                    f'{len(fast_body):>9} bytes identical'
+                )
+            transaction.set_rollback(True)
+
+    def _fixtures(self, rows):
+        user = CustomUser.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('Cần có ít nhất 1 người dùng (chạy seed_data trước).')
+        parents = max(rows // 10, 1)
+        artists = Artist.objects.bulk_create([Artist(name=f'bench artist {i}', bio='bio') for i in range(parents)])
+        albums = Album.objects.bulk_create([
+            Album(title=f'bench album {i}', artist=artists[i], release_date=date(2020, 1, 1)) for i in range(parents)
+        ])
+        songs = Song.objects.bulk_create([
+            Song(
+                title=f'bench song {i}', artist=artists[i % parents], album=albums[i % parents],
+                audio_file=f'bench_song_{i}', duration=180, lyrics='la la', release_date=date(2020, 1, 1),
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+        playlists = Playlist.objects.bulk_create([Playlist(name=f'bench playlist {i}', user=user) for i in range(parents)])
+        PlaylistTrack.objects.bulk_create([
+            PlaylistTrack(playlist=playlists[i % parents], song=song, position=(i // parents + 1) << 16)
+            for i, song in enumerate(songs)
+        ], batch_size=1000)
+        return {
+            'song': [song.pk for song in songs],
+            'artist': [artist.pk for artist in artists],
+            'album': [album.pk for album in albums],
+            'playlist': [playlist.pk for playlist in playlists],
+        }
+
+    def _timed(self, func, repeat):
+        """ ``(body, first run, best run)`` in seconds """
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            body = func()
+            timings.append(time.perf_counter() - started)
+        return body, timings[0], min(timings)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from music.recommendations import BLOCK_SIZE, HISTORY_DAYS, MAX_BASKET, METRICS, TOP_K, build_similar_songs
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the similar-songs table from playlist and listening-history co-occurrence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', default=TOP_K, type=int, help='Neighbours stored per song')
+        parser.add_argument('--block-size', default=BLOCK_SIZE, type=int, help='Songs scored per sparse product (bounds memory)')
+        parser.add_argument('--metric', default='cosine', choices=METRICS, help='Similarity measure')
+        parser.add_argument('--min-support', default=1, type=int, help='Minimum number of shared baskets')
+        parser.add_argument('--history-days', default=HISTORY_DAYS, type=int, help='Listening history window, 0 to use playlists only')
+        parser.add_argument('--max-basket', default=MAX_BASKET, type=int, help='Ignore playlists/histories with more songs than this')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total, rows):
+            self.stdout.write(f'{done}/{total} bài hát, {rows} dòng ({time.perf_counter() - started:.1f}s)')
+
+        stats = build_similar_songs(
+            top_k=options['top_k'],
+            block_size=options['block_size'],
+            metric=options['metric'],
+            min_support=options['min_support'],
+            history_days=options['history_days'],
+            max_basket=options['max_basket'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tính hàng xóm cho {stats['songs']} bài hát từ {stats['baskets']} basket: "
+            f"{stats['rows']} dòng trong {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music.importer import COLUMNS, FORMATS, IMPORT_BATCH_SIZE, CatalogImporter, read_records
+
+# Số dòng lỗi in ra tối đa, phần còn lại chỉ được đếm
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a song catalog from a CSV or JSONL file in batched, checkpointed transactions. '
+        'Columns: %s (title, artist and duration are required).' % ', '.join(COLUMNS)
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', default=IMPORT_BATCH_SIZE, type=int, help='Rows per transaction')
+        parser.add_argument('--checkpoint', help='Checkpoint name (default: derived from the file path)')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Không tìm thấy file {path}')
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError('Không đoán được định dạng, dùng --format csv hoặc --format jsonl')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size phải lớn hơn 0')
+        checkpoint = options['checkpoint'] or 'import_catalog:%s' % hashlib.sha1(
+            os.path.abspath(path).encode('utf-8')
+        ).hexdigest()[:16]
+
+        importer = CatalogImporter(checkpoint, batch_size=options['batch_size'])
+        if options['restart']:
+            importer.reset()
+        elif importer.position():
+            self.stdout.write(f'Tiếp tục từ checkpoint {checkpoint}: bỏ qua {importer.position()} dòng đã nhập')
+
+        started = time.perf_counter()
+        reported = 0
+
+        def progress(stats):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{stats['read']} dòng, {stats['created']} bài hát mới, {stats['duplicates']} trùng, "
+                f"{stats['rejected']} lỗi ({stats['read'] / elapsed:,.0f} dòng/s)"
+            )
+
+        def errors(line, message):
+            nonlocal reported
+            reported += 1
+            if reported <= MAX_REPORTED_ERRORS:
+                self.stderr.write(f'Dòng {line}: {message}')
+
+        stats = importer.run(read_records(path, fmt), progress=progress, errors=errors)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã nhập {stats['created']} bài hát từ {stats['read']} dòng trong {elapsed:.1f}s "
+            f"({stats['read'] / max(elapsed, 1e-9):,.0f} dòng/s); {stats['duplicates']} trùng, "
+            f"{stats['rejected']} lỗi, {stats['skipped']} dòng bỏ qua theo checkpoint"
+        ))
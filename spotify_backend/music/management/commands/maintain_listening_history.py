@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from music.history import MONTHS_AHEAD, RETENTION_MONTHS, compact_history, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly history partitions and compact months past the retention window into daily aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', default=MONTHS_AHEAD, type=int, help='Future monthly partitions to keep ready')
+        parser.add_argument('--retention-months', default=RETENTION_MONTHS, type=int, help='Months of per-play history to keep')
+
+    def handle(self, *args, **options):
+        if is_partitioned():
+            created = ensure_partitions(months_ahead=options['months_ahead'])
+            self.stdout.write(f"Đã tạo {len(created)} partition mới: {', '.join(created) or '-'}")
+        else:
+            self.stdout.write('Bảng lịch sử không được chia partition, chỉ gộp dữ liệu cũ')
+
+        compacted, skipped = compact_history(retention_months=options['retention_months'])
+        for month in skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Bỏ qua tháng {month:%Y-%m}: còn lượt nghe chưa được rollup_charts/refresh_monthly_listeners xử lý'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã gộp {len(compacted)} tháng: {', '.join(f'{month:%Y-%m}' for month in compacted) or '-'}"
+        ))
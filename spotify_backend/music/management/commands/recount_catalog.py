@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from music.counters import recount_catalog
+
+
+class Command(BaseCommand):
+    help = 'Recompute album and artist counters from the catalog in one set-based pass'
+
+    def handle(self, *args, **kwargs):
+        albums, artists = recount_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Đã tính lại bộ đếm cho {albums} album và {artists} nghệ sĩ.'))
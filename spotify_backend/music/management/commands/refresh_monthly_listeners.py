@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from music.listeners import WINDOW_DAYS, ingest_plays, refresh_monthly_listeners
+
+
+class Command(BaseCommand):
+    help = 'Fold new listening history into HyperLogLog sketches and refresh Artist.monthly_listeners'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', default=20000, type=int, help='History rows read per batch')
+        parser.add_argument('--window', default=WINDOW_DAYS, type=int, help='Rolling window in days')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        touched = ingest_plays(chunk_size=options['chunk_size'])
+        updated = refresh_monthly_listeners(window_days=options['window'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã cập nhật sketch cho {len(touched)} nghệ sĩ, monthly_listeners cho {updated} nghệ sĩ '
+            f'trong {time.perf_counter() - started:.2f}s'
+        ))
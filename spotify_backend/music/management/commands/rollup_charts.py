@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from music.charts import HOURLY_RETENTION_DAYS, purge_hourly_buckets, rollup_plays
+
+
+class Command(BaseCommand):
+    help = 'Fold new listening history into hourly and daily chart buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', default=20000, type=int, help='History rows read per batch')
+        parser.add_argument('--hourly-retention', default=HOURLY_RETENTION_DAYS, type=int, help='Days of hourly buckets to keep')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        processed = rollup_plays(chunk_size=options['chunk_size'])
+        purged = purge_hourly_buckets(days=options['hourly_retention'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã cộng {processed} lượt nghe vào bảng xếp hạng, xoá {purged} bucket theo giờ cũ '
+            f'trong {time.perf_counter() - started:.2f}s'
+        ))
@@ -1,12 +1,22 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django_seed import Seed
 from accounts.models import CustomUser
 from music.models import Artist, Genre, Album, Song, Playlist
+from music.generator import GENERATOR_CHUNK_SIZE, DatasetGenerator, default_sizes
+from music.playlists import set_songs
 
 class Command(BaseCommand):
-    help = 'Seed database with manually curated music data'
+    help = (
+        'Seed database with manually curated music data, or with --generate a synthetic '
+        'load-testing dataset of --number songs (other sizes scale with it)'
+    )
 
     def handle(self, *args, **kwargs):
+        if kwargs['generate']:
+            return self.generate(kwargs)
+
         # 1. Tạo thể loại
         genres = [
             {'name': 'Pop', 'description': 'Nhạc Pop'},
@@ -100,7 +110,6 @@ class Command(BaseCommand):
                 'title': 'm-tp M-TP',
                 'artist': artist_objs['Sơn Tùng M-TP'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 3,
                 'release_date': '2021-05-20',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02794744c57c9f35db88249842'
             },
@@ -108,7 +117,6 @@ class Command(BaseCommand):
                 'title': 'Ai Cũng Phải Bắt Đầu Từ Đâu Đó',
                 'artist': artist_objs['HIEUTHUHAI'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 3,
                 'release_date': '2020-02-21',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02c006b0181a3846c1c63e178f'
             },
@@ -116,7 +124,6 @@ class Command(BaseCommand):
                 'title': 'Từng Ngày Như Mãi Mãi',
                 'artist': artist_objs['buitruonglinh'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 3,
                 'release_date': '2021-05-20',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02fe0cbef064f18008462d29ef'
             },
@@ -124,7 +131,6 @@ class Command(BaseCommand):
                 'title': 'BẬT NÓ LÊN',
                 'artist': artist_objs['SOOBIN'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2020-02-21',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e028bdbdf691a5b791a5afb515b'
             },
@@ -132,7 +138,6 @@ class Command(BaseCommand):
                 'title': 'Da LAB Instrumental',
                 'artist': artist_objs['Da LAB'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2021-05-20',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e0243fab536a52200d784c3cb8a'
             },
@@ -140,7 +145,6 @@ class Command(BaseCommand):
                 'title': 'Bảo Tàng Của Nuối Tiếc',
                 'artist': artist_objs['Vũ.'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2020-02-21',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02be066d7fd668d8a0672b1245'
             },
@@ -148,7 +152,6 @@ class Command(BaseCommand):
                 'title': 'ái (live at GENfest 23)',
                 'artist': artist_objs['tlinh'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2021-05-20',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02a17404597ce43b116d0456bf'
             },
@@ -156,7 +159,6 @@ class Command(BaseCommand):
                 'title': 'Trạm Không Gian Số 0 (Unplugged)',
                 'artist': artist_objs['Vũ Cát Tường'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2020-02-21',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02949bb9a16826218b205488ae'
             },
@@ -164,7 +166,6 @@ class Command(BaseCommand):
                 'title': 'Sài Gòn thanh xuân',
                 'artist': artist_objs['Kai Đinh'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2021-05-20',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e0278873f6bd214ac4a99df1b90'
             },
@@ -172,7 +173,6 @@ class Command(BaseCommand):
                 'title': 'Dữ Liệu Quý',
                 'artist': artist_objs['Dương Domic'],
                 'genre': Genre.objects.filter(name='Pop').first(),
-                'total_song': 0,
                 'release_date': '2020-02-21',
                 'cover_image': 'https://i.scdn.co/image/ab67616d00001e02aa8b2071efbaa7ec3f41b60b'
             },
@@ -342,8 +342,32 @@ class Command(BaseCommand):
         ]
         for playlist in playlists:
             pl = Playlist.objects.create(name=playlist['name'], user=playlist['user'], is_public=playlist['is_public'])
-            pl.songs.set(playlist['songs'])
+            set_songs(pl, list(playlist['songs'].values_list('id', flat=True)))
 
         self.stdout.write(self.style.SUCCESS('Đã tạo dữ liệu mẫu thành công!'))
+    def generate(self, options):
+        if options['number'] < 1:
+            raise CommandError('--number phải lớn hơn 0')
+        sizes = default_sizes(options['number'])
+        for name in sizes:
+            if options.get(name) is not None:
+                sizes[name] = options[name]
+        sizes['subscribers'] = min(sizes['subscribers'], sizes['users'])
+        self.stdout.write('Sinh dữ liệu (seed %d): %s' % (
+            options['seed'], ', '.join('%s=%d' % item for item in sizes.items()),
+        ))
+        started = time.perf_counter()
+
+        def progress(label, rows, seconds):
+            self.stdout.write(f'{label}: {rows} dòng trong {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} dòng/s)')
+
+        DatasetGenerator(sizes, seed=options['seed'], chunk_size=options['chunk_size'], progress=progress).run()
+        self.stdout.write(self.style.SUCCESS(f'Đã sinh dữ liệu trong {time.perf_counter() - started:.1f}s'))
+
     def add_arguments(self, parser):
-        parser.add_argument('--number', default=10, type=int, help='Number of records to create for each model')
+        parser.add_argument('--number', default=10, type=int, help='Number of records to create for each model (songs with --generate)')
+        parser.add_argument('--generate', action='store_true', help='Generate a synthetic dataset instead of the curated one')
+        parser.add_argument('--seed', default=42, type=int, help='Random seed; the same seed and sizes give the same data')
+        parser.add_argument('--chunk-size', default=GENERATOR_CHUNK_SIZE, type=int, help='Rows per COPY')
+        for name in ('artists', 'albums', 'users', 'playlists', 'history', 'favorites', 'messages', 'subscribers'):
+            parser.add_argument('--' + name, type=int, help='Number of %s (default: scaled from --number)' % name)
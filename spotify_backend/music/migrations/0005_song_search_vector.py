@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:29
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        has_trigram = cursor.fetchone() is not None
+    if has_trigram:
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS song_title_trgm_idx "
+            "ON music_song USING gin (title gin_trgm_ops)"
+        )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS song_search_vector_idx "
+        "ON music_song USING gin (search_vector)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS song_title_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS song_search_vector_idx")
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Song = apps.get_model('music', 'Song')
+    Artist = apps.get_model('music', 'Artist')
+    Album = apps.get_model('music', 'Album')
+    artist_name = Subquery(Artist.objects.filter(pk=OuterRef('artist_id')).values('name')[:1])
+    album_title = Subquery(Album.objects.filter(pk=OuterRef('album_id')).values('title')[:1])
+    Song.objects.using(schema_editor.connection.alias).update(search_vector=(
+        SearchVector('title', weight='A', config='simple') +
+        SearchVector(artist_name, weight='B', config='simple') +
+        SearchVector(album_title, weight='B', config='simple') +
+        SearchVector('lyrics', weight='D', config='simple')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
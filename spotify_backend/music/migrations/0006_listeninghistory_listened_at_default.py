@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0005_song_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listeninghistory',
+            name='listened_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Album = apps.get_model('music', 'Album')
+    Artist = apps.get_model('music', 'Artist')
+    Song = apps.get_model('music', 'Song')
+
+    def grouped(model, field, aggregate):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(v=aggregate).values('v')
+        ), 0)
+
+    Album.objects.update(total_song=grouped(Song, 'album', Count('pk')))
+    Artist.objects.update(
+        song_count=grouped(Song, 'artist', Count('pk')),
+        album_count=grouped(Album, 'artist', Count('pk')),
+        total_plays=grouped(Song, 'artist', Sum('total_plays')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0007_listener_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='album_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='song_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='total_plays',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Phải khớp với music.playlists.POSITION_GAP
+POSITION_GAP = 1 << 16
+
+
+def copy_to_tracks(apps, schema_editor):
+    Playlist = apps.get_model('music', 'Playlist')
+    PlaylistTrack = apps.get_model('music', 'PlaylistTrack')
+    PlaylistSong = Playlist.songs.through
+
+    # Bảng cũ không lưu thứ tự: giữ theo thứ tự thêm vào (id của dòng trung gian)
+    tracks = []
+    last_playlist, index = None, 0
+    rows = PlaylistSong.objects.order_by('playlist_id', 'id').values_list('playlist_id', 'song_id')
+    for playlist_id, song_id in rows.iterator(chunk_size=2000):
+        if playlist_id != last_playlist:
+            last_playlist, index = playlist_id, 0
+        index += 1
+        tracks.append(PlaylistTrack(playlist_id=playlist_id, song_id=song_id, position=index * POSITION_GAP))
+        if len(tracks) >= 2000:
+            PlaylistTrack.objects.bulk_create(tracks)
+            tracks = []
+    PlaylistTrack.objects.bulk_create(tracks)
+
+
+def copy_from_tracks(apps, schema_editor):
+    Playlist = apps.get_model('music', 'Playlist')
+    PlaylistTrack = apps.get_model('music', 'PlaylistTrack')
+    PlaylistSong = Playlist.songs.through
+
+    rows = PlaylistTrack.objects.order_by('playlist_id', 'position', 'id').values_list('playlist_id', 'song_id')
+    PlaylistSong.objects.bulk_create(
+        [PlaylistSong(playlist_id=playlist_id, song_id=song_id) for playlist_id, song_id in rows.iterator(chunk_size=2000)],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0008_artist_counters'),
+    ]
+
+    # Django không cho thêm through= vào ManyToManyField có sẵn, nên tạo bảng
+    # mới, chép dữ liệu rồi thay field
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.BigIntegerField()),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracks', to='music.playlist')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_tracks', to='music.song')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['playlist', 'position', 'id'], name='playlist_track_position_idx')],
+                'unique_together': {('playlist', 'song')},
+            },
+        ),
+        migrations.RunPython(copy_to_tracks, copy_from_tracks),
+        migrations.RemoveField(
+            model_name='playlist',
+            name='songs',
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='songs',
+            field=models.ManyToManyField(related_name='playlists', through='music.PlaylistTrack', to='music.song'),
+        ),
+    ]
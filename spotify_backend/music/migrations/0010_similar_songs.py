@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0009_playlist_track'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarSong',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='music.song')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_songs', to='music.song')),
+            ],
+            options={
+                'unique_together': {('song', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0010_similar_songs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongPlayBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('genre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='music.genre')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='play_buckets', to='music.song')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'genre', 'bucket_start'], name='play_bucket_genre_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'song')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0011_song_play_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoritesong',
+            index=models.Index(fields=['user', 'added_at', 'id'], name='favorite_user_added_idx'),
+        ),
+    ]
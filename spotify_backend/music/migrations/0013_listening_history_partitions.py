@@ -0,0 +1,127 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:44
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE = 'music_listeninghistory'
+# Tạo sẵn partition cho vài tháng tới; sau đó do lệnh maintain_listening_history lo
+MONTHS_AHEAD = 3
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _rebuild(schema_editor, partitioned):
+    """
+    Rebuild the history table as a monthly range-partitioned table (or back
+    to a plain one), keeping rows, ids, indexes and foreign keys.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    old, new = TABLE + '_old', TABLE + '_new'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [TABLE, TABLE],
+        )
+        index_defs = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        if partitioned:
+            cursor.execute(f'CREATE TABLE {new} (LIKE {old}) PARTITION BY RANGE (listened_at)')
+            cursor.execute(f"SELECT min(listened_at AT TIME ZONE 'UTC')::date, (now() AT TIME ZONE 'UTC')::date FROM {old}")
+            first, today = cursor.fetchone()
+            month = (first or today).replace(day=1)
+            last = today.replace(day=1)
+            for _ in range(MONTHS_AHEAD):
+                last = _next_month(last)
+            while month <= last:
+                cursor.execute(
+                    f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {new} "
+                    f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_next_month(month).isoformat()} 00:00:00+00')"
+                )
+                month = _next_month(month)
+            # Bắt các event có listened_at nằm ngoài mọi partition
+            cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {new} DEFAULT')
+        else:
+            cursor.execute(f'CREATE TABLE {new} (LIKE {old})')
+        cursor.execute(f'INSERT INTO {new} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+        cursor.execute(f'ALTER TABLE {new} RENAME TO {TABLE}')
+
+        if partitioned:
+            # Khoá chính của bảng partition phải chứa cột partition
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, listened_at)')
+            cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+            cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+        else:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)')
+            cursor.execute(f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)"
+        )
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+
+def partition_history(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition_history(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0012_favorite_song_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyListeningAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('duration_listened', models.DurationField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='listeninghistory',
+            index=models.Index(fields=['user', 'listened_at', 'id'], name='history_user_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailylisteningaggregate',
+            name='song',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='music.song'),
+        ),
+        migrations.AddField(
+            model_name='dailylisteningaggregate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_listening', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='dailylisteningaggregate',
+            index=models.Index(fields=['user', 'day', 'id'], name='daily_listening_user_day_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailylisteningaggregate',
+            unique_together={('user', 'day', 'song')},
+        ),
+        migrations.RunPython(partition_history, unpartition_history),
+    ]
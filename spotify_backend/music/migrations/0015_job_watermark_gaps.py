@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0014_resource_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobwatermark',
+            name='gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+def move_checkpoints(apps, schema_editor):
+    """ Import checkpoints used to live in JobWatermark under the import_catalog: prefix """
+    JobWatermark = apps.get_model('music', 'JobWatermark')
+    ImportCheckpoint = apps.get_model('music', 'ImportCheckpoint')
+    checkpoints = JobWatermark.objects.filter(name__startswith='import_catalog:')
+    ImportCheckpoint.objects.bulk_create([
+        ImportCheckpoint(name=name, position=position) for name, position in checkpoints.values_list('name', 'position')
+    ])
+    checkpoints.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0015_job_watermark_gaps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_checkpoints, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 
 from accounts.models import CustomUser
 from cloudinary.models import CloudinaryField
@@ -11,6 +15,17 @@ class Artist(models.Model):
     profile_picture = models.URLField(blank=True, null=True)
     verified = models.BooleanField(default=False)
     monthly_listeners = models.IntegerField(default=0)
+    # Bộ đếm được cập nhật tăng dần bởi music.counters
+    song_count = models.IntegerField(default=0)
+    album_count = models.IntegerField(default=0)
+    total_plays = models.BigIntegerField(default=0)
+    # Đổi mỗi khi nội dung trả về thay đổi, kể cả qua update() (xem music.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='artist_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -19,6 +34,12 @@ class Genre(models.Model):
     """ Music Genre Model """
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='genre_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -31,13 +52,28 @@ class Album(models.Model):
     total_song = models.IntegerField(default=0)
     release_date = models.DateField()
     cover_image = models.URLField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title', 'id'], name='album_title_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lưu giá trị lúc load để music.counters biết album được chuyển từ artist nào
+        instance._loaded_values = {name: getattr(instance, name) for name in ('artist_id',) if name in field_names}
+        return instance
+
     def update_total_song(self):
-        self.total_song = self.songs.count()
-        self.save()
+        """ Recount songs of this album in a single UPDATE (repairs counter drift) """
+        song_count = Song.objects.filter(album=OuterRef('pk')).order_by().values('album').annotate(c=Count('pk')).values('c')
+        Album.objects.filter(pk=self.pk).update(total_song=Coalesce(Subquery(song_count), 0), updated_at=Now())
+        self.refresh_from_db(fields=['total_song', 'updated_at'])
     
 class Song(models.Model):
     """ Song Model """
@@ -52,21 +88,64 @@ class Song(models.Model):
     lyrics = models.TextField(blank=True)
     total_plays = models.PositiveIntegerField(default=0)
     release_date = models.DateField(null=True, blank=True)
+    # Được cập nhật bởi music.signals, chỉ có giá trị trên PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Phục vụ keyset pagination theo (title, id), kể cả khi lọc theo artist/album/genre
+        indexes = [
+            models.Index(fields=['title', 'id'], name='song_title_id_idx'),
+            models.Index(fields=['artist', 'title', 'id'], name='song_artist_title_id_idx'),
+            models.Index(fields=['album', 'title', 'id'], name='song_album_title_id_idx'),
+            models.Index(fields=['genre', 'title', 'id'], name='song_genre_title_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lưu giá trị lúc load để music.counters biết bài hát được chuyển từ artist/album nào
+        instance._loaded_values = {
+            name: getattr(instance, name)
+            for name in ('artist_id', 'album_id', 'total_plays') if name in field_names
+        }
+        return instance
+
 class Playlist(models.Model):
     """ User Playlist Model """
     name = models.CharField(max_length=200)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='playlists')
-    songs = models.ManyToManyField(Song,related_name='playlists')
+    # Thứ tự bài hát nằm ở PlaylistTrack.position (xem music/playlists.py)
+    songs = models.ManyToManyField(Song, through='PlaylistTrack', related_name='playlists')
     is_public = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Tăng mỗi lần thêm/xoá/di chuyển bài hát
+    revision = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
     
+class PlaylistTrack(models.Model):
+    """ Ordered membership of a song in a playlist """
+    playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE, related_name='tracks')
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='playlist_tracks')
+    # Khoá sắp xếp có khoảng trống: chèn/di chuyển chỉ cần ghi 1 dòng
+    position = models.BigIntegerField()
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('playlist', 'song')
+        indexes = [
+            models.Index(fields=['playlist', 'position', 'id'], name='playlist_track_position_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.playlist_id}:{self.song_id} @ {self.position}"
+
 class FavoriteSong(models.Model):
     """ User Favorite Song Model """
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='favorite_songs')
@@ -75,10 +154,97 @@ class FavoriteSong(models.Model):
 
     class Meta:
         unique_together = ('user','song')
+        # Danh sách yêu thích phân trang keyset theo (added_at, id)
+        indexes = [
+            models.Index(fields=['user', 'added_at', 'id'], name='favorite_user_added_idx'),
+        ]
     
 class ListeningHistory(models.Model):
     """ User Listening History """
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='listening_history')
     song = models.ForeignKey(Song,on_delete=models.CASCADE)
-    listened_at = models.DateTimeField(auto_now_add=True)
+    # Không dùng auto_now_add để giữ thời điểm nhận event khi ghi theo lô
+    listened_at = models.DateTimeField(default=timezone.now)
+    duration_listened = models.DurationField()
+
+    class Meta:
+        # Trên PostgreSQL bảng được chia partition theo tháng của listened_at (xem music/history.py)
+        indexes = [
+            models.Index(fields=['user', 'listened_at', 'id'], name='history_user_time_idx'),
+        ]
+
+class DailyListeningAggregate(models.Model):
+    """ Plays of a song by a user on one day, compacted from expired ListeningHistory rows """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_listening')
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    plays = models.PositiveIntegerField(default=0)
     duration_listened = models.DurationField()
+
+    class Meta:
+        unique_together = ('user', 'day', 'song')
+        indexes = [
+            models.Index(fields=['user', 'day', 'id'], name='daily_listening_user_day_idx'),
+        ]
+
+class JobWatermark(models.Model):
+    """ Last ListeningHistory id processed by an incremental job """
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    # Các khoảng id [low, high, thời điểm thấy] dưới position chưa có hàng, xem music.watermarks
+    gaps = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class ImportCheckpoint(models.Model):
+    """ Number of input records an unfinished ``import_catalog`` run has committed """
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class ArtistListenerSketch(models.Model):
+    """ HyperLogLog sketch of distinct listeners of an artist on one day """
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='listener_sketches')
+    day = models.DateField()
+    registers = models.BinaryField()
+
+    class Meta:
+        unique_together = ('artist', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='listener_sketch_day_idx'),
+        ]
+
+class SimilarSong(models.Model):
+    """ Precomputed top-K neighbours of a song (see music/recommendations.py) """
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='similar_songs')
+    similar = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        # Ràng buộc unique cũng là index phục vụ truy vấn (song_id = ? ORDER BY rank)
+        unique_together = ('song', 'rank')
+
+class SongPlayBucket(models.Model):
+    """ Pre-aggregated play count of a song in one hour or one day (see music/charts.py) """
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='play_buckets')
+    # Thể loại tại thời điểm nghe, để bảng xếp hạng theo thể loại không cần join Song
+    genre = models.ForeignKey(Genre, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    plays = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('granularity', 'bucket_start', 'song')
+        indexes = [
+            models.Index(fields=['granularity', 'genre', 'bucket_start'], name='play_bucket_genre_idx'),
+        ]
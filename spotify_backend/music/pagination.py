@@ -0,0 +1,148 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """ DjangoJSONEncoder cuts datetimes to milliseconds; a cursor needs the exact key """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on a stable ``(sort_key, id)`` ordering.
+
+    The view picks the sort key through ``keyset_ordering`` (e.g. ``'title'``
+    or ``'-listened_at'``); ``id`` always breaks ties in the same direction.
+    Each page is a single indexed range query, so deep pages cost the same as
+    the first one, unlike OFFSET paging.
+    """
+    page_size = getattr(settings, 'MUSIC_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'MUSIC_MAX_PAGE_SIZE', 200)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    default_ordering = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = getattr(view, 'keyset_ordering', self.default_ordering)
+        self.descending = ordering.startswith('-')
+        self.sort_key = ordering.lstrip('-')
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['d'] == 'p'
+
+        # Đi lùi (prev) thì đảo chiều sắp xếp rồi lật lại kết quả
+        backwards = self.descending != reverse
+        prefix = '-' if backwards else ''
+        order_by = [prefix + self.sort_key]
+        if self.sort_key != 'id':
+            order_by.append(prefix + 'id')
+        queryset = queryset.order_by(*order_by)
+
+        if cursor is not None:
+            queryset = queryset.filter(self._after(cursor['k'], cursor['i'], backwards))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_prev = cursor is not None if not reverse else has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "status": "success",
+                "data": data,
+                "next": self.get_next_link(),
+                "prev": self.get_previous_link(),
+            },
+            status=status.HTTP_200_OK
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'status': {'type': 'string', 'example': 'success'},
+                'data': schema,
+                'next': {'type': 'string', 'nullable': True},
+                'prev': {'type': 'string', 'nullable': True},
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], 'n')
+
+    def get_previous_link(self):
+        if not self.has_prev or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], 'p')
+
+    def encode_cursor(self, row, direction):
+        payload = {
+            'k': self._value(row, self.sort_key),
+            'i': self._value(row, 'id'),
+            'd': direction,
+        }
+        raw = json.dumps(payload, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii'))
+            cursor = json.loads(raw)
+            if cursor['d'] not in ('n', 'p') or not isinstance(cursor['i'], int):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            # 400 theo envelope chung của API thay vì {"detail": ...}
+            raise ParseError({"status": "error", "message": self.invalid_cursor_message})
+        return cursor
+
+    def _after(self, key, pk, backwards):
+        op = 'lt' if backwards else 'gt'
+        if self.sort_key == 'id':
+            return Q(**{'id__' + op: pk})
+        return (
+            Q(**{self.sort_key + '__' + op: key}) |
+            Q(**{self.sort_key: key, 'id__' + op: pk})
+        )
+
+    @staticmethod
+    def _value(row, field):
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
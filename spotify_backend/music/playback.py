@@ -0,0 +1,172 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from accounts.models import CustomUser
+
+from .conditional import touch
+from .models import Album, Artist, ListeningHistory, Song
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = getattr(settings, 'PLAY_EVENT_FLUSH_SIZE', 500)
+FLUSH_INTERVAL = getattr(settings, 'PLAY_EVENT_FLUSH_INTERVAL', 2.0)
+# Khi ghi lỗi liên tục (DB sập), giữ tối đa bấy nhiêu event và chờ lâu nhất bấy nhiêu giây giữa 2 lần thử
+MAX_PENDING = getattr(settings, 'PLAY_EVENT_MAX_PENDING', 100000)
+MAX_RETRY_DELAY = getattr(settings, 'PLAY_EVENT_MAX_RETRY_DELAY', 60.0)
+
+
+class PlayEventBuffer:
+    """
+    In-process buffer for playback events.
+
+    Events are flushed when ``flush_size`` of them are pending or the oldest
+    one has waited ``flush_interval`` seconds, whichever comes first. A flush
+    writes all history rows with one ``bulk_create`` and bumps
+    ``Song.total_plays`` and ``Artist.total_plays`` with one ``F()`` UPDATE
+    per distinct increment, so a batch costs a handful of statements instead
+    of two per play. A failed write is logged and its events are put back
+    and retried with exponential backoff; nothing is raised to the request
+    that triggered the flush. Events still in memory when the process is
+    killed, or beyond ``max_pending`` during a long outage, are lost.
+    """
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, background=True, max_pending=MAX_PENDING):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self.max_pending = max_pending
+        self._events = []
+        self._oldest = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def add(self, events):
+        """ Queue ``events``: dicts with user_id, song_id, duration_listened and listened_at """
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            # Đang chờ thử lại thì để thread nền ghi, request không phải gánh lỗi
+            due = len(self._events) >= self.flush_size and time.monotonic() >= self._retry_at
+        if self.background:
+            self._ensure_thread()
+        if due:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+    def flush(self):
+        """ Write every pending event; returns how many were written (0 when the write failed) """
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                self._oldest = None
+            if not events:
+                return 0
+            try:
+                written = write_play_events(events)
+            except Exception:
+                logger.exception('Ghi %d play event thất bại, sẽ thử lại', len(events))
+                self._requeue(events)
+                return 0
+            with self._lock:
+                self._failures = 0
+                self._retry_at = 0.0
+            return sum(written.values())
+
+    def _requeue(self, events):
+        with self._lock:
+            self._events[:0] = events
+            dropped = len(self._events) - self.max_pending
+            if dropped > 0:
+                del self._events[:dropped]
+                logger.error('Bỏ %d play event cũ nhất vì buffer đầy', dropped)
+            self._oldest = time.monotonic()
+            self._failures += 1
+            self._retry_at = self._oldest + min(self.flush_interval * 2 ** self._failures, MAX_RETRY_DELAY)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='play-event-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval / 2)
+            now = time.monotonic()
+            with self._lock:
+                due = self._oldest is not None and now - self._oldest >= self.flush_interval and now >= self._retry_at
+            if due:
+                try:
+                    self.flush()
+                except Exception:
+                    # Không để thread ghi chết vì một lỗi bất ngờ
+                    logger.exception('Play event flusher lỗi')
+                finally:
+                    close_old_connections()
+
+
+def write_play_events(events):
+    """
+    Persist a batch of play events with one INSERT and grouped total_plays
+    UPDATEs. Events whose song or user was deleted after validation are
+    dropped rather than failing the whole batch. Returns plays per song.
+    """
+    with transaction.atomic():
+        songs = {
+            song_id: (artist_id, album_id)
+            for song_id, artist_id, album_id in Song.objects.filter(pk__in={event['song_id'] for event in events})
+            .values_list('id', 'artist_id', 'album_id')
+        }
+        users = set(CustomUser.objects.filter(pk__in={event['user_id'] for event in events}).values_list('pk', flat=True))
+        valid = [event for event in events if event['song_id'] in songs and event['user_id'] in users]
+        if len(valid) < len(events):
+            logger.warning('Bỏ %d play event của bài hát hoặc user đã bị xoá', len(events) - len(valid))
+        plays = Counter(event['song_id'] for event in valid)
+        ListeningHistory.objects.bulk_create(
+            [ListeningHistory(**event) for event in valid],
+            batch_size=1000,
+        )
+        _increment_total_plays(Song, plays)
+
+        artist_plays = Counter()
+        album_ids = set()
+        for song_id, count in plays.items():
+            artist_id, album_id = songs[song_id]
+            artist_plays[artist_id] += count
+            album_ids.add(album_id)
+        _increment_total_plays(Artist, artist_plays)
+        # Album nhúng total_plays của bài hát
+        album_ids.discard(None)
+        if album_ids:
+            touch(Album.objects.filter(pk__in=album_ids))
+    return plays
+
+
+def _increment_total_plays(model, counts):
+    # Gom các dòng có cùng số lượt nghe để mỗi nhóm chỉ cần 1 câu UPDATE
+    by_increment = defaultdict(list)
+    for pk, count in counts.items():
+        by_increment[count].append(pk)
+    for increment, pks in by_increment.items():
+        touch(model.objects.filter(pk__in=pks), total_plays=F('total_plays') + increment)
+
+
+play_event_buffer = PlayEventBuffer()
+atexit.register(play_event_buffer.flush)
@@ -0,0 +1,203 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .cache import invalidate
+from .conditional import touch
+from .models import Playlist, PlaylistTrack, Song
+
+# Số bài nhạc tối đa trong 1 request thêm/xóa hàng loạt
+BULK_MAX = getattr(settings, 'PLAYLIST_BULK_MAX', 10000)
+# Khoảng cách giữa 2 vị trí liên tiếp khi đánh số lại; chèn vào giữa lấy trung điểm
+POSITION_GAP = 1 << 16
+
+
+def parse_song_ids(value):
+    """ Normalise a request payload into a de-duplicated list of song ids, keeping order """
+    if not isinstance(value, list):
+        raise ValueError("Danh sách bài nhạc phải là một mảng")
+    song_ids = []
+    seen = set()
+    for item in value:
+        if isinstance(item, bool) or not isinstance(item, (int, str)):
+            raise ValueError(f"ID bài nhạc không hợp lệ: {item}")
+        try:
+            song_id = int(item)
+        except ValueError:
+            raise ValueError(f"ID bài nhạc không hợp lệ: {item}")
+        if song_id not in seen:
+            seen.add(song_id)
+            song_ids.append(song_id)
+    return song_ids
+
+
+def missing_song_ids(song_ids):
+    """ Ids in ``song_ids`` that do not exist, checked with a single id__in query """
+    if not song_ids:
+        return []
+    existing = set(Song.objects.filter(id__in=song_ids).values_list('id', flat=True))
+    return [song_id for song_id in song_ids if song_id not in existing]
+
+
+def ordered_songs(playlist):
+    """ Songs of ``playlist`` in track order """
+    return Song.objects.filter(playlist_tracks__playlist=playlist).order_by(
+        'playlist_tracks__position', 'playlist_tracks__id'
+    )
+
+
+def _lock(playlist):
+    # Khoá playlist để các thao tác chèn/di chuyển đồng thời không lấy trùng vị trí
+    Playlist.objects.select_for_update().filter(pk=playlist.pk).values_list('pk', flat=True).first()
+
+
+def bump_revision(playlist_ids):
+    """ Count a membership change of each playlist (``revision`` + 1) and move its ``updated_at`` """
+    touch(Playlist.objects.filter(pk__in=playlist_ids), revision=F('revision') + 1)
+
+
+def _membership_changed(playlist):
+    # Ghi thẳng vào bảng PlaylistTrack nên không có m2m_changed
+    bump_revision([playlist.pk])
+    invalidate('playlist', 'playlist:%s' % playlist.pk)
+
+
+def _tracks(playlist):
+    return PlaylistTrack.objects.filter(playlist_id=playlist.pk)
+
+
+def _positions_after(playlist, after_song_id, count, exclude=()):
+    """
+    ``count`` increasing positions that fit right after the track of
+    ``after_song_id`` (or at the start of the playlist when it is None).
+    Reads at most two rows through the (playlist, position) index; returns
+    None when the gap is too small and the playlist must be rebalanced.
+    """
+    tracks = _tracks(playlist).exclude(song_id__in=exclude).order_by('position', 'id')
+    if after_song_id is None:
+        low = None
+        following = tracks.values_list('position', flat=True).first()
+    else:
+        low = tracks.filter(song_id=after_song_id).values_list('position', flat=True).first()
+        if low is None:
+            raise PlaylistTrack.DoesNotExist(f"Bài nhạc {after_song_id} không có trong playlist")
+        following = tracks.filter(position__gt=low).values_list('position', flat=True).first()
+
+    if following is None:
+        start = POSITION_GAP if low is None else low + POSITION_GAP
+        return [start + i * POSITION_GAP for i in range(count)]
+    if low is None:
+        # Chèn lên đầu: vị trí có thể âm, BigIntegerField vẫn sắp xếp đúng
+        low = following - (count + 1) * POSITION_GAP
+    step = (following - low) // (count + 1)
+    if step < 1:
+        return None
+    return [low + (i + 1) * step for i in range(count)]
+
+
+def rebalance(playlist):
+    """
+    Renumber every track of ``playlist`` ``POSITION_GAP`` apart, keeping the
+    current order. This is the only O(n) write and only runs when two
+    neighbours have no room left between them.
+    """
+    tracks = list(_tracks(playlist).order_by('position', 'id').only('id', 'position'))
+    for index, track in enumerate(tracks, start=1):
+        track.position = index * POSITION_GAP
+    PlaylistTrack.objects.bulk_update(tracks, ['position'], batch_size=1000)
+    return len(tracks)
+
+
+def _insert_positions(playlist, after_song_id, count, exclude=()):
+    positions = _positions_after(playlist, after_song_id, count, exclude)
+    if positions is None:
+        rebalance(playlist)
+        positions = _positions_after(playlist, after_song_id, count, exclude)
+    return positions
+
+
+def add_songs(playlist, song_ids, after=None):
+    """
+    Add songs to a playlist: one query for current membership, one bulk INSERT
+    for the rest. New tracks are appended, or placed right after the track of
+    song ``after``. Returns the ids that were actually added.
+    """
+    if not song_ids:
+        return []
+    with transaction.atomic():
+        _lock(playlist)
+        existing = set(_tracks(playlist).filter(song_id__in=song_ids).values_list('song_id', flat=True))
+        new_ids = [song_id for song_id in song_ids if song_id not in existing]
+        if not new_ids:
+            return []
+        if after is None:
+            last = _tracks(playlist).order_by('-position', '-id').values_list('position', flat=True).first()
+            start = (last or 0) + POSITION_GAP
+            positions = [start + i * POSITION_GAP for i in range(len(new_ids))]
+        else:
+            positions = _insert_positions(playlist, after, len(new_ids))
+        PlaylistTrack.objects.bulk_create(
+            [
+                PlaylistTrack(playlist_id=playlist.pk, song_id=song_id, position=position)
+                for song_id, position in zip(new_ids, positions)
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    _membership_changed(playlist)
+    return new_ids
+
+
+def remove_songs(playlist, song_ids):
+    """ Remove songs from a playlist with one DELETE; returns how many rows were removed """
+    if not song_ids:
+        return 0
+    # Không cần đánh số lại: chỗ trống chỉ làm khe chèn rộng thêm
+    removed, _ = _tracks(playlist).filter(song_id__in=song_ids).delete()
+    if removed:
+        _membership_changed(playlist)
+    return removed
+
+
+def move_track(playlist, song_id, after=None):
+    """
+    Move the track of ``song_id`` right after the track of song ``after``, or
+    to the start when ``after`` is None. Only the moved row is written unless
+    the target gap is exhausted. Raises ``PlaylistTrack.DoesNotExist`` when
+    either song is not in the playlist.
+    """
+    if after == song_id:
+        raise ValueError("Không thể di chuyển bài nhạc ra sau chính nó")
+    with transaction.atomic():
+        _lock(playlist)
+        track = _tracks(playlist).filter(song_id=song_id).first()
+        if track is None:
+            raise PlaylistTrack.DoesNotExist(f"Bài nhạc {song_id} không có trong playlist")
+        positions = _insert_positions(playlist, after, 1, exclude=[song_id])
+        track.position = positions[0]
+        track.save(update_fields=['position'])
+    _membership_changed(playlist)
+    return track
+
+
+def set_songs(playlist, song_ids):
+    """
+    Replace the contents of ``playlist`` with ``song_ids`` in that order.
+    Used for full updates (create/PUT), so it rewrites every position.
+    """
+    with transaction.atomic():
+        _lock(playlist)
+        _tracks(playlist).exclude(song_id__in=song_ids).delete()
+        existing = {track.song_id: track for track in _tracks(playlist).only('id', 'song_id', 'position')}
+        to_update, to_create = [], []
+        for index, song_id in enumerate(song_ids, start=1):
+            position = index * POSITION_GAP
+            track = existing.get(song_id)
+            if track is None:
+                to_create.append(PlaylistTrack(playlist_id=playlist.pk, song_id=song_id, position=position))
+            elif track.position != position:
+                track.position = position
+                to_update.append(track)
+        PlaylistTrack.objects.bulk_update(to_update, ['position'], batch_size=1000)
+        PlaylistTrack.objects.bulk_create(to_create, batch_size=1000)
+    _membership_changed(playlist)
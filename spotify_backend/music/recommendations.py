@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .cache import invalidate
+from .models import ListeningHistory, PlaylistTrack, SimilarSong
+
+TOP_K = 20
+BLOCK_SIZE = 2000
+HISTORY_DAYS = 90
+# Playlist/lịch sử quá dài gần như chứa mọi thứ: bỏ qua để tránh nhiễu và bùng nổ số cặp
+MAX_BASKET = 2000
+METRICS = ('cosine', 'jaccard')
+
+
+def _load_pairs(queryset, chunk_size):
+    """ Stream ``(basket_id, song_id)`` rows into two int64 arrays, ``chunk_size`` rows at a time """
+    baskets, songs = [], []
+    buffer = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            chunk = np.array(buffer, dtype=np.int64)
+            baskets.append(chunk[:, 0])
+            songs.append(chunk[:, 1])
+            buffer = []
+    if buffer:
+        chunk = np.array(buffer, dtype=np.int64)
+        baskets.append(chunk[:, 0])
+        songs.append(chunk[:, 1])
+    if not baskets:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(baskets), np.concatenate(songs)
+
+
+def basket_matrix(history_days=HISTORY_DAYS, max_basket=MAX_BASKET, chunk_size=100000):
+    """
+    Build the binary basket x song matrix. Every playlist is a basket, and so
+    is the set of songs each user played in the last ``history_days`` days.
+    Returns ``(matrix, song_ids)`` where column ``j`` is song ``song_ids[j]``.
+    Memory is roughly 40 bytes per membership.
+    """
+    playlist_ids, playlist_songs = _load_pairs(
+        PlaylistTrack.objects.order_by().values_list('playlist_id', 'song_id'), chunk_size
+    )
+    pairs = [(playlist_ids, playlist_songs)]
+    if history_days:
+        since = timezone.now() - timedelta(days=history_days)
+        pairs.append(_load_pairs(
+            ListeningHistory.objects.filter(listened_at__gte=since)
+            .order_by().values_list('user_id', 'song_id').distinct(),
+            chunk_size,
+        ))
+
+    rows, cols, offset = [], [], 0
+    for basket_ids, _ in pairs:
+        # Đánh số lại basket liên tục, mỗi nguồn một dải riêng
+        _, inverse = np.unique(basket_ids, return_inverse=True)
+        rows.append(inverse + offset)
+        offset += int(inverse.max()) + 1 if len(inverse) else 0
+    song_ids, cols = np.unique(np.concatenate([songs for _, songs in pairs]), return_inverse=True)
+    rows = np.concatenate(rows)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(offset, len(song_ids)),
+    )
+    matrix.data[:] = 1  # csr_matrix cộng dồn các cặp trùng
+    sizes = np.diff(matrix.indptr)
+    matrix = matrix[(sizes >= 2) & (sizes <= max_basket)]
+    return matrix, song_ids
+
+
+def similar_blocks(matrix, top_k=TOP_K, block_size=BLOCK_SIZE, metric='cosine', min_support=1):
+    """
+    Yield ``(row_start, neighbours)`` per block of ``block_size`` songs, where
+    ``neighbours[i]`` is a list of ``(column, score)`` for song column
+    ``row_start + i``, best first.
+
+    Co-occurrence counts come from ``matrix.T[block] @ matrix``, so only one
+    block x songs sparse product is in memory at a time.
+    """
+    if metric not in METRICS:
+        raise ValueError('metric must be one of %s' % ', '.join(METRICS))
+    transposed = matrix.T.tocsr()
+    counts = np.asarray(matrix.sum(axis=0)).ravel()
+    n_songs = matrix.shape[1]
+
+    for start in range(0, n_songs, block_size):
+        end = min(start + block_size, n_songs)
+        block = (transposed[start:end] @ matrix).tocsr()
+        block.sum_duplicates()
+        row_index = np.repeat(np.arange(end - start), np.diff(block.indptr))
+        # Bỏ đường chéo (bài hát với chính nó) và các cặp xuất hiện quá ít
+        keep = (row_index + start != block.indices) & (block.data >= min_support)
+        co = block.data
+        left = counts[row_index + start]
+        right = counts[block.indices]
+        if metric == 'cosine':
+            scores = co / np.sqrt(left * right)
+        else:
+            scores = co / (left + right - co)
+        scores[~keep] = 0
+        block.data = scores.astype(np.float32)
+        block.eliminate_zeros()
+
+        neighbours = []
+        for i in range(end - start):
+            lo, hi = block.indptr[i], block.indptr[i + 1]
+            data = block.data[lo:hi]
+            indices = block.indices[lo:hi]
+            if len(data) > top_k:
+                best = np.argpartition(-data, top_k)[:top_k]
+                data, indices = data[best], indices[best]
+            order = np.lexsort((indices, -data))
+            neighbours.append([(int(indices[j]), float(data[j])) for j in order])
+        yield start, neighbours
+
+
+def build_similar_songs(top_k=TOP_K, block_size=BLOCK_SIZE, metric='cosine', min_support=1,
+                        history_days=HISTORY_DAYS, max_basket=MAX_BASKET, batch_size=5000, progress=None):
+    """
+    Rebuild the ``SimilarSong`` table. Rows are replaced block by block in
+    short transactions, so the endpoint keeps serving the previous neighbours
+    of songs that have not been reached yet.
+    """
+    matrix, song_ids = basket_matrix(history_days=history_days, max_basket=max_basket)
+    written = 0
+    for start, neighbours in similar_blocks(matrix, top_k, block_size, metric, min_support):
+        block_ids = song_ids[start:start + len(neighbours)].tolist()
+        rows = [
+            SimilarSong(song_id=song_id, similar_id=int(song_ids[column]), rank=rank, score=score)
+            for song_id, items in zip(block_ids, neighbours)
+            for rank, (column, score) in enumerate(items, start=1)
+        ]
+        with transaction.atomic():
+            SimilarSong.objects.filter(song_id__in=block_ids).delete()
+            SimilarSong.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+        if progress:
+            progress(start + len(neighbours), len(song_ids), written)
+
+    # Bài hát không còn nằm trong basket nào: xoá hàng xóm cũ
+    stale = SimilarSong.objects.order_by().values_list('song_id', flat=True).distinct()
+    stale_ids = np.setdiff1d(np.fromiter(stale.iterator(), dtype=np.int64), song_ids)
+    for i in range(0, len(stale_ids), batch_size):
+        SimilarSong.objects.filter(song_id__in=stale_ids[i:i + batch_size].tolist()).delete()
+
+    invalidate('similar')
+    return {'songs': len(song_ids), 'baskets': matrix.shape[0], 'rows': written}
@@ -0,0 +1,287 @@
+"""
+Read-only fast path for the music read endpoints.
+
+Views read ``values()`` rows and build the response dicts here instead of
+going through ``ModelSerializer`` field machinery. Each representation
+returns exactly what the matching serializer returns (same keys, same
+order, same value types), so the rendered JSON is byte-identical;
+``bench_serializers`` checks that. Any field added to a serializer must be
+added here as well.
+
+``?fields=`` and ``?expand=`` are compiled into the column list, so a
+field that is not requested is never read from the database and nested
+songs are only queried when ``songs`` is part of the response.
+"""
+import functools
+from collections import defaultdict
+from operator import itemgetter
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from drf_yasg import openapi
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+
+from .models import Song
+
+# Dùng lại to_representation của DRF để ngày giờ được định dạng y hệt serializer
+_date = serializers.DateField().to_representation
+_datetime = serializers.DateTimeField().to_representation
+# Số URL Cloudinary nhớ trong mỗi process; dựng 1 URL tốn ~0.25 ms, gần hết thời gian của 1 bài hát
+MEDIA_URL_CACHE_SIZE = getattr(settings, 'MUSIC_MEDIA_URL_CACHE_SIZE', 65536)
+# Getter trả về giá trị này khi khóa không có trong output (serializer bỏ qua khóa)
+OMIT = object()
+
+fields_parameter = openapi.Parameter(
+    'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma separated fields to return (id is always included), e.g. id,title or songs.title for nested songs",
+)
+expand_parameter = openapi.Parameter(
+    'expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma separated relations to return as objects instead of ids: artist, album, genre",
+)
+
+
+@functools.lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def _resource_url(resource_type, upload_type, version, public_id, file_format):
+    return CloudinaryResource(
+        public_id=public_id, format=file_format, version=version, type=upload_type, resource_type=resource_type,
+    ).url
+
+
+def media_url(resource):
+    """ ``resource.url`` memoized on the parts stored in the column, which are all the URL depends on """
+    if not resource:
+        return None
+    return _resource_url(resource.resource_type, resource.type, resource.version, resource.public_id, resource.format)
+
+
+clear_media_url_cache = _resource_url.cache_clear
+
+
+def _split(raw):
+    return [name.strip() for name in (raw or '').split(',') if name.strip()]
+
+
+class Fieldset:
+    """
+    Parsed ``?fields=a,b,songs.title`` and ``?expand=artist``. ``fields`` is
+    None when every field is wanted; a dotted name selects fields of a
+    nested list and implies its parent.
+    """
+
+    def __init__(self, fields=None, expand=(), nested=None):
+        self.fields = fields
+        self.expand = frozenset(expand)
+        self.nested = nested or {}
+
+    @classmethod
+    def from_request(cls, request):
+        fields = None
+        nested = {}
+        names = _split(request.query_params.get('fields'))
+        if names:
+            fields = set()
+            for name in names:
+                parent, _, child = name.partition('.')
+                fields.add(parent)
+                if child:
+                    nested.setdefault(parent, set()).add(child)
+        return cls(fields, _split(request.query_params.get('expand')), nested)
+
+    def child(self, name):
+        return Fieldset(self.nested.get(name))
+
+
+def _field(name, getter=None):
+    return name, (name,), getter or itemgetter(name)
+
+
+def _related(prefix, *names):
+    """ Expansion of a nullable FK into ``{name: ...}``, read through a join """
+    columns = tuple('%s__%s' % (prefix, name) for name in names)
+
+    def build(row):
+        if row[columns[0]] is None:
+            return None
+        return {name: row[column] for name, column in zip(names, columns)}
+    return columns, build
+
+
+class Representation:
+    """
+    A serializer compiled for one ``Fieldset``. ``spec`` lists ``(key,
+    columns, getter)`` in serializer order and ``expansions`` maps a key to
+    the ``(columns, getter)`` used instead when it is expanded. ``id`` is
+    always part of the output.
+    """
+    spec = ()
+    expansions = {}
+
+    def __init__(self, fieldset=None):
+        fieldset = fieldset or Fieldset()
+        keys = [key for key, _, _ in self.spec]
+        unknown = sorted((fieldset.fields or set()) - set(keys)) + sorted(fieldset.expand - set(self.expansions))
+        if unknown:
+            raise ParseError('Unknown fields: %s' % ', '.join(unknown))
+
+        self.fieldset = fieldset
+        self.keys = [key for key in keys if fieldset.fields is None or key == 'id' or key in fieldset.fields]
+        columns = []
+        self._getters = []
+        for key, key_columns, getter in self.spec:
+            if key not in self.keys:
+                continue
+            if key in fieldset.expand:
+                key_columns, getter = self.expansions[key]
+            columns.extend(column for column in key_columns if column not in columns)
+            self._getters.append((key, getter))
+        self.columns = tuple(columns)
+
+    def values(self, queryset, *extra):
+        """ Rows of ``queryset`` with the requested columns; ``extra`` adds columns such as a keyset sort key """
+        # prefetch_related không dùng được với values(); quan hệ được nạp theo lô trong prepare()
+        extra = [column for column in extra if column not in self.columns]
+        return queryset.prefetch_related(None).values(*self.columns, *extra)
+
+    def prepare(self, rows):
+        """ Load what one page of rows needs besides its own columns """
+
+    def build(self, row):
+        item = {}
+        for key, getter in self._getters:
+            value = getter(row)
+            if value is not OMIT:
+                item[key] = value
+        return item
+
+    def data(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        return [self.build(row) for row in rows]
+
+
+class SongRepresentation(Representation):
+    """ ``SongSerializer``; ``artist``, ``album`` and ``genre`` expand to ``{id, name|title}`` """
+    spec = (
+        _field('id'),
+        _field('title'),
+        _field('artist'),
+        _field('album'),
+        _field('genre'),
+        _field('song_image', lambda row: row['song_image'] or None),
+        _field('duration'),
+        _field('lyrics'),
+        _field('total_plays'),
+        _field('release_date', lambda row: _date(row['release_date'])),
+        _field('audio_file', lambda row: media_url(row['audio_file'])),
+        _field('video_file', lambda row: media_url(row['video_file'])),
+    )
+    expansions = {
+        'artist': _related('artist', 'id', 'name'),
+        'album': _related('album', 'id', 'title'),
+        'genre': _related('genre', 'id', 'name'),
+    }
+
+
+class _WithSongs(Representation):
+    """ Embeds the songs of each row in ``songs`` when requested, one query per page """
+    song_group = None
+    song_order = ('id',)
+
+    def prepare(self, rows):
+        if 'songs' not in self.keys:
+            return
+        songs = SongRepresentation(self.fieldset.child('songs'))
+        queryset = Song.objects.filter(**{self.song_group + '__in': [row['id'] for row in rows]})
+        grouped = defaultdict(list)
+        for song in songs.values(queryset.order_by(*self.song_order), self.song_group):
+            grouped[song[self.song_group]].append(songs.build(song))
+        for row in rows:
+            row['songs'] = grouped.get(row['id'], [])
+
+
+class ArtistRepresentation(_WithSongs):
+    """ ``ArtistSerializer`` """
+    song_group = 'artist'
+    spec = (
+        _field('id'),
+        _field('name'),
+        _field('bio'),
+        _field('verified'),
+        _field('monthly_listeners'),
+        _field('song_count'),
+        _field('album_count'),
+        _field('total_plays'),
+        ('songs', (), itemgetter('songs')),
+        ('profile_picture_url', ('profile_picture',), lambda row: row['profile_picture'] or None),
+        # ArtistSerializer.to_representation chỉ thêm khóa này khi có giá trị
+        _field('profile_picture', lambda row: row['profile_picture'] if isinstance(row['profile_picture'], str) else OMIT),
+    )
+
+
+class AlbumRepresentation(_WithSongs):
+    """ ``AlbumSerializer`` """
+    song_group = 'album'
+    spec = (
+        _field('id'),
+        _field('title'),
+        ('artist', ('artist__id', 'artist__name', 'artist__bio', 'artist__verified', 'artist__monthly_listeners'),
+         lambda row: {
+             'id': row['artist__id'],
+             'name': row['artist__name'],
+             'bio': row['artist__bio'],
+             'verified': row['artist__verified'],
+             'monthly_listeners': row['artist__monthly_listeners'],
+         }),
+        _field('genre'),
+        _field('total_song'),
+        _field('release_date', lambda row: _date(row['release_date'])),
+        _field('cover_image'),
+        ('songs', (), itemgetter('songs')),
+        ('cover_image_url', ('cover_image',), lambda row: row['cover_image'] or None),
+    )
+
+
+class PlaylistRepresentation(_WithSongs):
+    """ ``PlaylistSerializer``; songs come in track order """
+    song_group = 'playlist_tracks__playlist'
+    song_order = ('playlist_tracks__position', 'playlist_tracks__id')
+    spec = (
+        _field('id'),
+        _field('name'),
+        ('user', (
+            'user__id', 'user__username', 'user__email', 'user__is_staff', 'user__is_superuser',
+            'user__is_premium', 'user__profile_picture', 'user__gender', 'user__date_of_birth',
+        ), lambda row: {
+            'id': row['user__id'],
+            'username': row['user__username'],
+            'email': row['user__email'],
+            'is_staff': row['user__is_staff'],
+            'is_superuser': row['user__is_superuser'],
+            'is_premium': row['user__is_premium'],
+            'profile_picture': row['user__profile_picture'],
+            'gender': row['user__gender'],
+            'date_of_birth': _date(row['user__date_of_birth']),
+        }),
+        _field('is_public'),
+        _field('created_at', lambda row: _datetime(row['created_at'])),
+        ('songs', (), itemgetter('songs')),
+    )
+
+
+def page_response(view, representation, queryset, *extra):
+    """ One keyset page of ``queryset`` built by ``representation``; the sort key column is always read """
+    sort_key = getattr(view, 'keyset_ordering', 'id').lstrip('-')
+    page = view.paginate_queryset(representation.values(queryset, sort_key, *extra))
+    return view.get_paginated_response(representation.data(page))
+
+
+def detail_data(representation, queryset, pk):
+    """ Representation of the row ``pk`` of ``queryset``, None when it does not exist """
+    try:
+        rows = list(representation.values(queryset.filter(pk=pk)))
+    except (TypeError, ValueError):
+        # pk không hợp lệ, như get_object_or_404
+        return None
+    return representation.data(rows)[0] if rows else None
@@ -0,0 +1,113 @@
+import re
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+
+from .models import Album, Artist
+
+# Config 'simple' không stem từ, phù hợp với tên bài hát tiếng Việt lẫn tiếng Anh
+SEARCH_CONFIG = 'simple'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def song_search_vector():
+    """
+    Weighted tsvector for a song: title (A), artist name and album title (B),
+    lyrics (D). Artist and album are pulled through correlated subqueries so the
+    expression can be used directly in ``QuerySet.update()``.
+    """
+    artist_name = Subquery(Artist.objects.filter(pk=OuterRef('artist_id')).values('name')[:1])
+    album_title = Subquery(Album.objects.filter(pk=OuterRef('album_id')).values('title')[:1])
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(artist_name, weight='B', config=SEARCH_CONFIG) +
+        SearchVector(album_title, weight='B', config=SEARCH_CONFIG) +
+        SearchVector('lyrics', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """ Refresh ``Song.search_vector`` for every song in ``queryset`` (PostgreSQL only) """
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+    return queryset.update(search_vector=song_search_vector())
+
+
+def has_trigram(using='default'):
+    """ True when the pg_trgm extension is installed on the given database """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    cached = getattr(connection, '_music_has_trigram', None)
+    if cached is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            cached = cursor.fetchone() is not None
+        connection._music_has_trigram = cached
+    return cached
+
+
+def prefix_tsquery(text):
+    """
+    Turn free text into a prefix tsquery (``foo:* & bar:*``) so partial words
+    typed in a search box still hit the GIN index. Returns None if the text has
+    no searchable token.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    return ' & '.join('%s:*' % token for token in tokens)
+
+
+def search_songs(queryset, text):
+    """
+    Relevance-ranked song search over title, artist name, album title and lyrics.
+
+    Adds a ``score`` annotation (higher is better) so callers can page on
+    ``('-score', '-id')``. On PostgreSQL it matches ``search_vector`` with a
+    prefix tsquery, plus trigram similarity on the title when pg_trgm is
+    available; other backends fall back to ``icontains`` with a fixed weight
+    per matched column.
+    """
+    text = (text or '').strip()
+    if connections[queryset.db].vendor != 'postgresql':
+        return _fallback_search(queryset, text)
+
+    raw = prefix_tsquery(text)
+    if raw is None:
+        return _no_results(queryset)
+    query = SearchQuery(raw, config=SEARCH_CONFIG, search_type='raw')
+    condition = Q(search_vector=query)
+    score = SearchRank(F('search_vector'), query)
+    if has_trigram(queryset.db):
+        condition |= Q(title__trigram_similar=text)
+        score = score + TrigramSimilarity('title', text)
+    # Ép về double precision để giá trị trong cursor so sánh lại chính xác
+    return queryset.filter(condition).annotate(score=Cast(score, FloatField()))
+
+
+def _no_results(queryset):
+    return queryset.annotate(score=Value(0.0, output_field=FloatField())).none()
+
+
+def _fallback_search(queryset, text):
+    if not text:
+        return _no_results(queryset)
+    weights = [
+        ('title__icontains', 4),
+        ('artist__name__icontains', 2),
+        ('album__title__icontains', 2),
+        ('lyrics__icontains', 1),
+    ]
+    condition = Q()
+    for lookup, _ in weights:
+        condition |= Q(**{lookup: text})
+    score = sum(
+        (Case(When(**{lookup: text}, then=Value(weight)), default=Value(0), output_field=IntegerField())
+         for lookup, weight in weights),
+        Value(0),
+    )
+    return queryset.filter(condition).annotate(score=Cast(score, FloatField()))
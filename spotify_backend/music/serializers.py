@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Song, Artist, Genre, Album, Playlist
+from django.conf import settings
+from django.db.models import Prefetch
+from .models import Song, Artist, Genre, Album, Playlist, PlaylistTrack, SimilarSong, FavoriteSong, ListeningHistory, DailyListeningAggregate
+from .playlists import add_songs, missing_song_ids, ordered_songs, parse_song_ids, set_songs
 from accounts.models import CustomUser
 from django.core.validators import FileExtensionValidator
 from accounts.serializers import UserProfileSerializer
@@ -20,8 +23,11 @@ class ArtistSerializer(serializers.ModelSerializer) :
 
     class Meta:
         model = Artist
-        fields = ['id', 'name', 'bio', 'profile_picture', 'verified', 'monthly_listeners', 'songs', 'profile_picture_url']
-        read_only_fields = ['id']
+        fields = [
+            'id', 'name', 'bio', 'profile_picture', 'verified', 'monthly_listeners',
+            'song_count', 'album_count', 'total_plays', 'songs', 'profile_picture_url'
+        ]
+        read_only_fields = ['id', 'song_count', 'album_count', 'total_plays']
 
     def create(self, validated_data):
         profile_picture = validated_data.pop('profile_picture', None)
@@ -51,8 +57,16 @@ class ArtistSerializer(serializers.ModelSerializer) :
             representation['profile_picture'] = instance.profile_picture  # Trả về trực tiếp URL nếu là URLField
         return representation
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """ Prefetch nested songs so a list of artists costs a constant number of queries """
+        return queryset.prefetch_related(
+            Prefetch('songs', queryset=Song.objects.order_by('id'))
+        )
+
     def get_songs(self, obj):
-        songs = Song.objects.filter(artist=obj)
+        # Dùng cache của prefetch_related nếu view đã gắn, nếu không sẽ tự query
+        songs = obj.songs.all()
         # Tránh đệ quy bằng cách truyền context và giới hạn serialize
         song_serializer = SongSerializer(songs, many=True, context={'request': self.context.get('request')})
         return song_serializer.data
@@ -109,8 +123,16 @@ class AlbumSerializer(serializers.ModelSerializer):
             representation['cover_image'] = instance.cover_image  # Trả về trực tiếp URL nếu là URLField
         return representation
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """ Join the artist and prefetch nested songs for album lists and details """
+        return queryset.select_related('artist').prefetch_related(
+            Prefetch('songs', queryset=Song.objects.order_by('id'))
+        )
+
     def get_songs(self, obj):
-        songs = Song.objects.filter(album=obj)
+        # Dùng cache của prefetch_related nếu view đã gắn, nếu không sẽ tự query
+        songs = obj.songs.all()
         # Tránh đệ quy bằng cách truyền context và giới hạn serialize
         song_serializer = SongSerializer(songs, many=True, context={'request': self.context.get('request')})
         return song_serializer.data
@@ -222,9 +244,10 @@ class SongSerializer(serializers.ModelSerializer):
 
 class PlaylistSerializer(serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
-    songs = serializers.PrimaryKeyRelatedField(
-        queryset=Song.objects.all(),
-        many=True,
+    # Nhận danh sách ID thô rồi kiểm tra 1 lần, thay vì 1 query cho mỗi bài hát
+    songs = serializers.ListField(
+        child=serializers.IntegerField(),
+        write_only=True,
         required=True
     )
 
@@ -236,19 +259,14 @@ class PlaylistSerializer(serializers.ModelSerializer):
     def validate_songs(self, value):
         if not value:
             raise serializers.ValidationError("A playlist must contain at least one song.")
-        
-        # Chuyển đổi value thành danh sách ID
-        song_ids = []
-        for item in value:
-            if isinstance(item, int):
-                song_ids.append(item)
-            elif hasattr(item, 'id'):  # Nếu là object Song
-                song_ids.append(item.id)
-            else:
-                raise serializers.ValidationError(f"Invalid song value: {item}. Must be an ID or Song object with an ID.")
-
-        # Kiểm tra ID hợp lệ
-        invalid_ids = [song_id for song_id in song_ids if not Song.objects.filter(id=song_id).exists()]
+
+        try:
+            song_ids = parse_song_ids(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+        # Kiểm tra ID hợp lệ bằng 1 query
+        invalid_ids = missing_song_ids(song_ids)
         if invalid_ids:
             raise serializers.ValidationError(f"The following song IDs do not exist: {invalid_ids}")
         return song_ids  # Trả về danh sách ID đã xử lý
@@ -257,14 +275,96 @@ class PlaylistSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         songs_data = validated_data.pop('songs')
         playlist = Playlist.objects.create(user=user, **{k: v for k, v in validated_data.items() if k != 'user'})
-        playlist.songs.set(songs_data)
+        add_songs(playlist, songs_data)
         return playlist
 
+    def update(self, instance, validated_data):
+        songs_data = validated_data.pop('songs', None)
+        instance = super().update(instance, validated_data)
+        if songs_data is not None:
+            # Thứ tự trong request trở thành thứ tự của playlist
+            set_songs(instance, songs_data)
+        return instance
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """ Join the owner and prefetch the ordered tracks so a list of playlists costs a constant number of queries """
+        return queryset.select_related('user').prefetch_related(
+            Prefetch('tracks', queryset=PlaylistTrack.objects.select_related('song').order_by('position', 'id'), to_attr='ordered_tracks')
+        )
+
     def to_representation(self, instance):
        representation = super().to_representation(instance)
-       print(f"Songs queryset: {instance.songs.all()}")  # Debug
-       representation['songs'] = SongSerializer(instance.songs.all(), many=True).data
+       tracks = getattr(instance, 'ordered_tracks', None)
+       songs = ordered_songs(instance) if tracks is None else [track.song for track in tracks]
+       representation['songs'] = SongSerializer(songs, many=True).data
        return representation
 
 
+class PlaylistTrackSerializer(serializers.ModelSerializer):
+    song = SongSerializer(read_only=True)
+
+    class Meta:
+        model = PlaylistTrack
+        fields = ['id', 'position', 'added_at', 'song']
+        read_only_fields = fields
+
+
+class FavoriteSongSerializer(serializers.ModelSerializer):
+    song = SongSerializer(read_only=True)
+
+    class Meta:
+        model = FavoriteSong
+        fields = ['id', 'added_at', 'song']
+        read_only_fields = fields
+
+
+class SimilarSongSerializer(serializers.ModelSerializer):
+    song = SongSerializer(source='similar', read_only=True)
+
+    class Meta:
+        model = SimilarSong
+        fields = ['rank', 'score', 'song']
+        read_only_fields = fields
+
+
+class ListeningHistorySerializer(serializers.ModelSerializer):
+    song = SongSerializer(read_only=True)
+
+    class Meta:
+        model = ListeningHistory
+        fields = ['id', 'listened_at', 'duration_listened', 'song']
+        read_only_fields = fields
+
+
+class DailyListeningSerializer(serializers.ModelSerializer):
+    song = SongSerializer(read_only=True)
+
+    class Meta:
+        model = DailyListeningAggregate
+        fields = ['id', 'day', 'plays', 'duration_listened', 'song']
+        read_only_fields = fields
+
+
+class PlayEventSerializer(serializers.Serializer):
+    song = serializers.IntegerField(min_value=1)
+    duration_listened = serializers.IntegerField(min_value=0, help_text="Seconds listened")
+    listened_at = serializers.DateTimeField(required=False)
+
+
+class PlayEventBatchSerializer(serializers.Serializer):
+    events = PlayEventSerializer(many=True, allow_empty=False)
+
+    def validate_events(self, value):
+        max_batch = getattr(settings, 'PLAY_EVENT_MAX_BATCH', 500)
+        if len(value) > max_batch:
+            raise serializers.ValidationError(f"A batch can contain at most {max_batch} events.")
+
+        # Kiểm tra toàn bộ ID bài hát bằng 1 query
+        song_ids = {event['song'] for event in value}
+        existing = set(Song.objects.filter(id__in=song_ids).values_list('id', flat=True))
+        invalid_ids = sorted(song_ids - existing)
+        if invalid_ids:
+            raise serializers.ValidationError(f"The following song IDs do not exist: {invalid_ids}")
+        return value
 
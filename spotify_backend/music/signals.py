@@ -0,0 +1,160 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters
+from .cache import invalidate
+from .conditional import touch
+from .models import Album, Artist, Genre, Playlist, Song
+from .playlists import bump_revision
+from .search import update_search_vectors
+
+
+@receiver(post_save, sender=Song)
+def refresh_song_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_search_vectors(Song.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Artist)
+def refresh_artist_songs_search_vector(sender, instance, created=False, raw=False, **kwargs):
+    # Artist mới chưa có bài hát nào nên không cần cập nhật
+    if raw or created:
+        return
+    update_search_vectors(Song.objects.filter(artist=instance))
+
+
+@receiver(post_save, sender=Album)
+def refresh_album_songs_search_vector(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    update_search_vectors(Song.objects.filter(album=instance))
+
+
+# Bộ đếm của album/artist được cập nhật tăng dần bằng F() (xem music.counters)
+
+@receiver(post_save, sender=Song)
+def update_song_counters(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    counters.song_saved(instance, created)
+
+
+@receiver(post_delete, sender=Song)
+def update_song_counters_on_delete(sender, instance, **kwargs):
+    counters.song_deleted(instance)
+
+
+@receiver(post_save, sender=Album)
+def update_album_counters(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    counters.album_saved(instance, created)
+
+
+@receiver(post_delete, sender=Album)
+def update_album_counters_on_delete(sender, instance, **kwargs):
+    counters.album_deleted(instance)
+
+
+# Vô hiệu hoá cache của các endpoint đọc (xem music.cache).
+# Danh sách dùng tag theo model, trang chi tiết dùng tag theo từng object.
+
+def _song_playlist_ids(song):
+    return list(Playlist.songs.through.objects.filter(song_id=song.pk).values_list('playlist_id', flat=True))
+
+
+@receiver(pre_delete, sender=Song)
+def remember_song_playlists(sender, instance, **kwargs):
+    # Quan hệ playlist bị xoá trước post_delete nên phải lấy id từ trước
+    instance._playlist_ids = _song_playlist_ids(instance)
+
+
+@receiver([post_save, post_delete], sender=Song)
+def invalidate_song_cache(sender, instance, signal=None, **kwargs):
+    playlist_ids = getattr(instance, '_playlist_ids', None)
+    if playlist_ids is None:
+        playlist_ids = _song_playlist_ids(instance)
+    _touch_song_parents(instance, playlist_ids, deleted=signal is post_delete)
+    invalidate(
+        'song', 'song:%s' % instance.pk,
+        # Artist, album và playlist đều nhúng danh sách bài hát
+        'artist', 'artist:%s' % instance.artist_id,
+        'album', 'album:%s' % instance.album_id if instance.album_id else None,
+        'playlist', *['playlist:%s' % pk for pk in playlist_ids],
+    )
+
+
+# updated_at của các object nhúng object vừa đổi (xem music.conditional).
+
+def _touch_song_parents(song, playlist_ids, deleted):
+    touch(Artist.objects.filter(pk=song.artist_id))
+    if song.album_id:
+        touch(Album.objects.filter(pk=song.album_id))
+    if not playlist_ids:
+        return
+    if deleted:
+        # Track của bài hát bị xoá theo cascade
+        bump_revision(playlist_ids)
+    else:
+        touch(Playlist.objects.filter(pk__in=playlist_ids))
+
+
+@receiver(post_save, sender=Artist)
+def touch_artist_dependents(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    # Album nhúng artist, ?expand=artist của bài hát có tên artist
+    touch(Album.objects.filter(artist=instance))
+    touch(Song.objects.filter(artist=instance))
+
+
+@receiver(post_save, sender=Album)
+def touch_album_songs(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    touch(Song.objects.filter(album=instance))
+
+
+@receiver(post_save, sender=Genre)
+def touch_genre_songs(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    touch(Song.objects.filter(genre=instance))
+
+
+@receiver([post_save, post_delete], sender=Artist)
+def invalidate_artist_cache(sender, instance, **kwargs):
+    # Album nhúng thông tin artist
+    invalidate('artist', 'artist:%s' % instance.pk, 'album')
+
+
+@receiver([post_save, post_delete], sender=Album)
+def invalidate_album_cache(sender, instance, **kwargs):
+    invalidate('album', 'album:%s' % instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def invalidate_genre_cache(sender, instance, **kwargs):
+    invalidate('genre', 'genre:%s' % instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Playlist)
+def invalidate_playlist_cache(sender, instance, **kwargs):
+    invalidate('playlist', 'playlist:%s' % instance.pk)
+
+
+@receiver(m2m_changed, sender=Playlist.songs.through)
+def invalidate_playlist_songs_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            bump_revision([instance.pk])
+            invalidate('playlist', 'playlist:%s' % instance.pk)
+        return
+    # song.playlists.add(...): instance là Song, pk_set là id playlist
+    if action == 'pre_clear':
+        instance._playlist_ids = _song_playlist_ids(instance)
+    elif action.startswith('post_'):
+        playlist_ids = pk_set if pk_set is not None else getattr(instance, '_playlist_ids', [])
+        bump_revision(playlist_ids)
+        invalidate('playlist', *['playlist:%s' % pk for pk in playlist_ids])
@@ -0,0 +1,94 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+STREAM_CHUNK_SIZE = getattr(settings, 'MUSIC_STREAM_CHUNK_SIZE', 500)
+
+stream_parameter = openapi.Parameter(
+    'stream', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, enum=[1],
+    description="Admin only: stream every row as one JSON document instead of a page",
+)
+
+
+async def _produce(chunks):
+    # Mỗi chunk được tạo trong thread sync của request, nơi giữ connection và server-side cursor
+    produce = sync_to_async(next, thread_sensitive=True)
+    end = object()
+    while True:
+        chunk = await produce(chunks, end)
+        if chunk is end:
+            return
+        yield chunk
+
+
+def streaming_response(request, chunks, **kwargs):
+    """
+    ``StreamingHttpResponse`` over the sync iterator ``chunks``. Under ASGI
+    Django reads a sync iterator into a list before sending anything, so
+    there the chunks are produced one at a time through ``sync_to_async``
+    instead; under WSGI the iterator is passed as is.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = _produce(iter(chunks))
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+def stream_json(request, queryset, serializer_class, context, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    ``{"status": "success", "data": [...]}`` for every row of ``queryset``,
+    written ``chunk_size`` rows at a time. Rows come from ``iterator()`` (a
+    server-side cursor on PostgreSQL, prefetches done per chunk) and each
+    chunk is serialized and rendered before the next one is read, so memory
+    stays flat whatever the row count, under WSGI and ASGI alike.
+    """
+    renderer = JSONRenderer()
+
+    def render(chunk):
+        # Render bằng JSONRenderer như response thường rồi bỏ cặp [] bao ngoài
+        return renderer.render(serializer_class(chunk, many=True, context=context).data)[1:-1]
+
+    def body():
+        yield b'{"status":"success","data":['
+        separator = b''
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                yield separator + render(chunk)
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + render(chunk)
+        yield b']}'
+
+    return streaming_response(request, body(), content_type='application/json')
+
+
+def streamable(method):
+    """
+    Decorator for list handlers: ``?stream=1`` returns the whole list through
+    ``stream_json`` in id order, using the view's ``get_stream_queryset()``
+    when it has one. Goes outermost, so streamed dumps skip the response
+    cache and per-user favorite flags.
+    """
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        if request.query_params.get('stream') not in ('1', 'true'):
+            return method(view, request, *args, **kwargs)
+        if not request.user.is_staff:
+            return Response(
+                {"status": "error", "message": "Streaming is only available to admins"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        get_queryset = getattr(view, 'get_stream_queryset', view.get_queryset)
+        return stream_json(
+            request._request, get_queryset().order_by('id'), view.get_serializer_class(), view.get_serializer_context(),
+        )
+    return wrapper
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SongViewSet, ArtistListCreateView, ArtistRetrieveUpdateDestroyView, GenreDetailView, GenreListCreateView, AlbumListCreateView, AlbumDetailView, PlaylistListCreateView, PlaylistDetailView
+from .views import SongViewSet, ArtistListCreateView, ArtistRetrieveUpdateDestroyView, GenreDetailView, GenreListCreateView, AlbumListCreateView, AlbumDetailView, PlaylistListCreateView, PlaylistDetailView, PlaylistSongsView, PlaylistTracksView, PlaylistTrackMoveView, FavoriteListView, FavoriteDetailView, ListeningHistoryView, DailyListeningView, ChartView, PlayEventView
 
 routerSong = DefaultRouter()
 routerSong.register(r'songs', SongViewSet, basename='song')
@@ -14,4 +14,13 @@ urlpatterns = [
     path('albums/<int:pk>/', AlbumDetailView.as_view(), name='album-detail'),
     path('playlists/', PlaylistListCreateView.as_view(), name='playlist-list-create'),
     path('playlists/<int:pk>/', PlaylistDetailView.as_view(), name='playlist-detail'),
+    path('playlists/<int:pk>/songs/', PlaylistSongsView.as_view(), name='playlist-songs'),
+    path('playlists/<int:pk>/tracks/', PlaylistTracksView.as_view(), name='playlist-tracks'),
+    path('playlists/<int:pk>/tracks/<int:song_id>/', PlaylistTrackMoveView.as_view(), name='playlist-track-move'),
+    path('favorites/', FavoriteListView.as_view(), name='favorite-list'),
+    path('favorites/<int:song_id>/', FavoriteDetailView.as_view(), name='favorite-detail'),
+    path('history/', ListeningHistoryView.as_view(), name='listening-history'),
+    path('history/daily/', DailyListeningView.as_view(), name='listening-history-daily'),
+    path('charts/songs/', ChartView.as_view(), name='chart-songs'),
+    path('plays/', PlayEventView.as_view(), name='play-events'),
 ]
@@ -1,21 +1,37 @@
 from rest_framework import generics, permissions, status, viewsets
 
 from .permission import IsOwnerOrReadOnly
-from .models import Song, Artist, Genre, Album, Playlist
-from .serializers import SongSerializer, ArtistSerializer, GenreSerializer, AlbumSerializer, PlaylistSerializer
+from .cache import cache_response
+from .conditional import conditional_response
+from .pagination import KeysetPagination
+from .search import search_songs
+from .models import Song, Artist, Genre, Album, Playlist, PlaylistTrack, SimilarSong, FavoriteSong, ListeningHistory, DailyListeningAggregate
+from .serializers import SongSerializer, ArtistSerializer, GenreSerializer, AlbumSerializer, PlaylistSerializer, PlaylistTrackSerializer, SimilarSongSerializer, FavoriteSongSerializer, ListeningHistorySerializer, DailyListeningSerializer, PlayEventBatchSerializer
+from .charts import CHART_SIZE, MAX_CHART_SIZE, PERIODS as CHART_PERIODS, top_songs
+from .favorites import like, unlike, with_favorite_flags
+from .playback import play_event_buffer
+from .representations import AlbumRepresentation, ArtistRepresentation, Fieldset, PlaylistRepresentation, SongRepresentation, detail_data, expand_parameter, fields_parameter, page_response
+from .streaming import stream_parameter, streamable
+from .recommendations import TOP_K as SIMILAR_TOP_K
+from .playlists import BULK_MAX as PLAYLIST_BULK_MAX, add_songs, missing_song_ids, move_track, parse_song_ids, remove_songs
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_yasg import openapi
 from rest_framework.response import Response
 from django.db import models
 from rest_framework.decorators import action
 from drf_yasg.utils import swagger_auto_schema
+from django.utils import timezone
+from datetime import date, timedelta
 
 class SongViewSet(viewsets.ModelViewSet):
     queryset = Song.objects.all()
     serializer_class = SongSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = 'title'
 
     @swagger_auto_schema(
         operation_description="List all songs or create a new song (Authenticated users)",
+        manual_parameters=[stream_parameter, fields_parameter, expand_parameter],
         responses={
             200: openapi.Response(
                 description="List of songs",
@@ -37,7 +53,9 @@ class SongViewSet(viewsets.ModelViewSet):
                                 "total_plays": 0,
                                 "release_date": "2023-01-01"
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiU29uZyBUaXRsZSIsImkiOjEsImQiOiJuIn0=",
+                        "prev": None
                     }
                 }
             ),
@@ -66,9 +84,17 @@ class SongViewSet(viewsets.ModelViewSet):
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @streamable
+    @with_favorite_flags()
+    # ?expand= nhúng tên artist/album/genre nên cache theo cả các tag đó
+    @cache_response('song', 'artist', 'album', 'genre')
     def list(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        return self._song_page(self.get_queryset())
+
+    def _song_page(self, queryset, *extra):
+        # values() + music.representations: cùng JSON với SongSerializer, chỉ đọc các cột được ?fields= yêu cầu
+        representation = SongRepresentation(Fieldset.from_request(self.request))
+        return page_response(self, representation, queryset, *extra)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -79,6 +105,7 @@ class SongViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_description="Retrieve, update, or delete a song (Update/Delete: Admin only)",
+        manual_parameters=[fields_parameter, expand_parameter],
         responses={
             200: openapi.Response(
                 description="Song details",
@@ -102,18 +129,20 @@ class SongViewSet(viewsets.ModelViewSet):
                     }
                 }
             ),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
             404: openapi.Response(description="Song not found"),
             403: openapi.Response(description="Permission denied"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @conditional_response(Song, favorites=True)
+    @with_favorite_flags()
+    @cache_response('song:{pk}')
     def retrieve(self, request, *args, **kwargs):
-        try:
-            song = self.get_object()
-            serializer = self.get_serializer(song)
-            return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
-        except Song.DoesNotExist:
+        data = detail_data(SongRepresentation(Fieldset.from_request(request)), self.get_queryset(), kwargs['pk'])
+        if data is None:
             return Response({"status": "error", "message": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": "success", "data": data}, status=status.HTTP_200_OK)
 
     def update(self, request, *args, **kwargs):
         try:
@@ -136,7 +165,7 @@ class SongViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='by-title/(?P<title>[^/.]+)')
     @swagger_auto_schema(
-        operation_description="Filter songs by title (case-insensitive)",
+        operation_description="Search songs by title (relevance-ranked, same engine as /songs/search/)",
         manual_parameters=[
             openapi.Parameter('title', openapi.IN_PATH, description="Song title", type=openapi.TYPE_STRING)
         ],
@@ -161,23 +190,53 @@ class SongViewSet(viewsets.ModelViewSet):
                                 "total_plays": 0,
                                 "release_date": "2023-01-01"
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiU29uZyBUaXRsZSIsImkiOjEsImQiOiJuIn0=",
+                        "prev": None
                     }
                 }
             ),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @with_favorite_flags()
+    @cache_response('song', 'artist', 'album', 'genre')
     def by_title(self, request, title=None):
-        queryset = Song.objects.filter(title__icontains=title)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        # Dùng chung chỉ mục tìm kiếm thay vì quét toàn bảng bằng icontains
+        return self._search_response(title)
+
+    @action(detail=False, methods=['get'], url_path='search')
+    @swagger_auto_schema(
+        operation_description="Relevance-ranked search over song titles, artist names, album titles and lyrics",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search text", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor from a previous page", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of results per page", type=openapi.TYPE_INTEGER),
+            fields_parameter,
+            expand_parameter,
+        ],
+        responses={
+            200: openapi.Response(description="Songs ordered by relevance"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @with_favorite_flags()
+    @cache_response('song', 'artist', 'album', 'genre')
+    def search(self, request):
+        return self._search_response(request.query_params.get('q', ''))
+
+    def _search_response(self, text):
+        queryset = search_songs(self.get_queryset(), text)
+        self.keyset_ordering = '-score'
+        return self._song_page(queryset, 'score')
 
     @action(detail=False, methods=['get'], url_path='by-artist/(?P<artist_id>\d+)')
     @swagger_auto_schema(
         operation_description="Filter songs by artist ID",
         manual_parameters=[
-            openapi.Parameter('artist_id', openapi.IN_PATH, description="Artist ID", type=openapi.TYPE_INTEGER)
+            openapi.Parameter('artist_id', openapi.IN_PATH, description="Artist ID", type=openapi.TYPE_INTEGER),
+            fields_parameter,
+            expand_parameter,
         ],
         responses={
             200: openapi.Response(
@@ -200,23 +259,27 @@ class SongViewSet(viewsets.ModelViewSet):
                                 "total_plays": 0,
                                 "release_date": "2023-01-01"
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiU29uZyBUaXRsZSIsImkiOjEsImQiOiJuIn0=",
+                        "prev": None
                     }
                 }
             ),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @with_favorite_flags()
+    @cache_response('song', 'artist', 'album', 'genre')
     def by_artist(self, request, artist_id=None):
-        queryset = Song.objects.filter(artist_id=artist_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        return self._song_page(Song.objects.filter(artist_id=artist_id))
 
     @action(detail=False, methods=['get'], url_path='by-album/(?P<album_id>\d+)')
     @swagger_auto_schema(
         operation_description="Filter songs by album ID",
         manual_parameters=[
-            openapi.Parameter('album_id', openapi.IN_PATH, description="Album ID", type=openapi.TYPE_INTEGER)
+            openapi.Parameter('album_id', openapi.IN_PATH, description="Album ID", type=openapi.TYPE_INTEGER),
+            fields_parameter,
+            expand_parameter,
         ],
         responses={
             200: openapi.Response(
@@ -239,23 +302,27 @@ class SongViewSet(viewsets.ModelViewSet):
                                 "total_plays": 0,
                                 "release_date": "2023-01-01"
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiU29uZyBUaXRsZSIsImkiOjEsImQiOiJuIn0=",
+                        "prev": None
                     }
                 }
             ),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @with_favorite_flags()
+    @cache_response('song', 'artist', 'album', 'genre')
     def by_album(self, request, album_id=None):
-        queryset = Song.objects.filter(album_id=album_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        return self._song_page(Song.objects.filter(album_id=album_id))
 
     @action(detail=False, methods=['get'], url_path='by-genre/(?P<genre_id>\d+)')
     @swagger_auto_schema(
         operation_description="Filter songs by genre ID",
         manual_parameters=[
-            openapi.Parameter('genre_id', openapi.IN_PATH, description="Genre ID", type=openapi.TYPE_INTEGER)
+            openapi.Parameter('genre_id', openapi.IN_PATH, description="Genre ID", type=openapi.TYPE_INTEGER),
+            fields_parameter,
+            expand_parameter,
         ],
         responses={
             200: openapi.Response(
@@ -278,24 +345,85 @@ class SongViewSet(viewsets.ModelViewSet):
                                 "total_plays": 0,
                                 "release_date": "2023-01-01"
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiU29uZyBUaXRsZSIsImkiOjEsImQiOiJuIn0=",
+                        "prev": None
                     }
                 }
             ),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @with_favorite_flags()
+    @cache_response('song', 'artist', 'album', 'genre')
     def by_genre(self, request, genre_id=None):
-        queryset = Song.objects.filter(genre_id=genre_id)
-        serializer = self.get_serializer(queryset, many=True)
+        return self._song_page(Song.objects.filter(genre_id=genre_id))
+
+    @action(detail=True, methods=['get'], url_path='similar')
+    @swagger_auto_schema(
+        operation_description="Songs most often found together with this one in playlists and listening sessions (precomputed by build_similar_songs)",
+        manual_parameters=[
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Number of songs (default and max: 20)", type=openapi.TYPE_INTEGER)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Similar songs, best first",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {
+                                "rank": 1,
+                                "score": 0.82,
+                                "song": {
+                                    "id": 2,
+                                    "title": "Song Title",
+                                    "artist": 1,
+                                    "album": 1,
+                                    "genre": 1,
+                                    "song_image": "https://res.cloudinary.com/your_cloud_name/image/upload/artists/image.jpg",
+                                    "duration": "00:03:30",
+                                    "lyrics": "Song lyrics",
+                                    "total_plays": 0,
+                                    "release_date": "2023-01-01"
+                                }
+                            }
+                        ]
+                    }
+                }
+            ),
+            404: openapi.Response(description="Song not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @with_favorite_flags('song')
+    @cache_response('similar', 'song')
+    def similar(self, request, pk=None):
+        try:
+            limit = min(max(int(request.query_params.get('limit', SIMILAR_TOP_K)), 1), SIMILAR_TOP_K)
+        except ValueError:
+            limit = SIMILAR_TOP_K
+        # 1 lần tra index (song_id, rank) của bảng đã tính sẵn
+        neighbours = list(
+            SimilarSong.objects.filter(song_id=pk).select_related('similar').order_by('rank')[:limit]
+        )
+        if not neighbours and not Song.objects.filter(pk=pk).exists():
+            return Response({"status": "error", "message": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = SimilarSongSerializer(neighbours, many=True, context=self.get_serializer_context())
         return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
 
 class ArtistListCreateView(generics.ListAPIView):
     queryset = Artist.objects.all()
     serializer_class = ArtistSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = 'name'
+
+    def get_queryset(self):
+        return ArtistSerializer.setup_eager_loading(super().get_queryset())
 
     @swagger_auto_schema(
         operation_description="List all artists or create a new artist (Authenticated users)",
+        manual_parameters=[stream_parameter, fields_parameter],
         responses={
             200: openapi.Response(
                 description="List of artists",
@@ -311,7 +439,9 @@ class ArtistListCreateView(generics.ListAPIView):
                                 "verified": False,
                                 "monthly_listeners": 0
                             }
-                        ]
+                        ],
+                        "next": "eyJrIjoiQXJ0aXN0IE5hbWUiLCJpIjoxLCJkIjoibiJ9",
+                        "prev": None
                     }
                 }
             ),
@@ -334,12 +464,11 @@ class ArtistListCreateView(generics.ListAPIView):
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @streamable
+    @cache_response('artist')
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many = True)
-        return Response(
-            {"status":"success", "data": serializer.data},
-            status= status.HTTP_200_OK
-        )
+        representation = ArtistRepresentation(Fieldset.from_request(request))
+        return page_response(self, representation, self.get_queryset())
     
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -358,8 +487,12 @@ class ArtistRetrieveUpdateDestroyView(generics.RetrieveDestroyAPIView):
     queryset = Artist.objects.all()
     serializer_class = ArtistSerializer
 
+    def get_queryset(self):
+        return ArtistSerializer.setup_eager_loading(super().get_queryset())
+
     @swagger_auto_schema(
         operation_description="Retrieve, update, or delete an artist (Admin only)",
+        manual_parameters=[fields_parameter],
         responses={
             200: openapi.Response(
                 description="Artist details",
@@ -377,24 +510,25 @@ class ArtistRetrieveUpdateDestroyView(generics.RetrieveDestroyAPIView):
                     }
                 }
             ),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
             404: openapi.Response(description="Artist not found"),
             403: openapi.Response(description="Permission denied"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @conditional_response(Artist)
+    @cache_response('artist:{pk}')
     def get(self, request, *args, **kwargs):
-        try:
-            artist = self.get_object()
-            serializer = self.get_serializer(artist)
-            return Response(
-                {"status": "success", "data": serializer.data},
-                status=status.HTTP_200_OK
-            )
-        except Artist.DoesNotExist:
+        data = detail_data(ArtistRepresentation(Fieldset.from_request(request)), self.get_queryset(), kwargs['pk'])
+        if data is None:
             return Response(
                 {"status": "error", "message": "Artist not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(
+            {"status": "success", "data": data},
+            status=status.HTTP_200_OK
+        )
 
     def put(self, request, *args, **kwargs):
         try:
@@ -433,6 +567,8 @@ class ArtistRetrieveUpdateDestroyView(generics.RetrieveDestroyAPIView):
 class GenreListCreateView(generics.ListAPIView):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = 'name'
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -443,9 +579,11 @@ class GenreListCreateView(generics.ListAPIView):
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @cache_response('genre')
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         operation_description="Create a new genre (Authenticated users)",
@@ -471,10 +609,13 @@ class GenreDetailView(generics.RetrieveUpdateDestroyAPIView):
         operation_description="Retrieve a genre by ID (Authenticated users)",
         responses={
             200: openapi.Response(description="Genre details"),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
             404: openapi.Response(description="Genre not found"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @conditional_response(Genre)
+    @cache_response('genre:{pk}')
     def get(self, request, *args, **kwargs):
         genre = self.get_object()
         serializer = self.get_serializer(genre)
@@ -532,18 +673,26 @@ class GenreDetailView(generics.RetrieveUpdateDestroyAPIView):
 class AlbumListCreateView(generics.ListCreateAPIView):
     queryset = Album.objects.all()
     serializer_class = AlbumSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = 'title'
+
+    def get_queryset(self):
+        return AlbumSerializer.setup_eager_loading(super().get_queryset())
 
     @swagger_auto_schema(
         operation_description="List all albums or create a new album (Authenticated users)",
+        manual_parameters=[stream_parameter, fields_parameter],
         responses={
             200: openapi.Response(description="List of albums"),
             201: openapi.Response(description="Album created"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @streamable
+    @cache_response('album')
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        representation = AlbumRepresentation(Fieldset.from_request(request))
+        return page_response(self, representation, self.get_queryset())
 
     @swagger_auto_schema(
         operation_description="Create a new album (Authenticated users)",
@@ -565,18 +714,26 @@ class AlbumDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Album.objects.all()
     serializer_class = AlbumSerializer
 
+    def get_queryset(self):
+        return AlbumSerializer.setup_eager_loading(super().get_queryset())
+
     @swagger_auto_schema(
         operation_description="Retrieve an album by ID (Authenticated users)",
+        manual_parameters=[fields_parameter],
         responses={
             200: openapi.Response(description="Album details"),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
             404: openapi.Response(description="Album not found"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @conditional_response(Album)
+    @cache_response('album:{pk}', 'artist')
     def get(self, request, *args, **kwargs):
-        album = self.get_object()
-        serializer = self.get_serializer(album)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        data = detail_data(AlbumRepresentation(Fieldset.from_request(request)), self.get_queryset(), kwargs['pk'])
+        if data is None:
+            return Response({"status": "error", "message": "Album not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": "success", "data": data}, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_description="Update an album by ID (Authenticated users)",
@@ -636,19 +793,27 @@ class PlaylistListCreateView(generics.ListCreateAPIView):
         # Chỉ hiển thị playlists công khai hoặc playlists của user hiện tại
         user = self.request.user
         # return Playlist.objects.filter(models.Q(is_public=True) | models.Q(user=user))
-        return Playlist.objects.filter(models.Q(user=user))
+        return PlaylistSerializer.setup_eager_loading(Playlist.objects.filter(models.Q(user=user)))
+
+    def get_stream_queryset(self):
+        # Admin dump cả bảng, không chỉ playlists của mình
+        return PlaylistSerializer.setup_eager_loading(Playlist.objects.all())
 
     @swagger_auto_schema(
         operation_description="List all public playlists or playlists created by the authenticated user, or create a new playlist",
+        manual_parameters=[stream_parameter, fields_parameter],
         responses={
             200: openapi.Response(description="List of playlists"),
             201: openapi.Response(description="Playlist created"),
             401: openapi.Response(description="Unauthorized")
         }
     )
+    @streamable
+    @cache_response('playlist', scope='user')
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response({"status": "success", "data": serializer.data}, status=status.HTTP_200_OK)
+        representation = PlaylistRepresentation(Fieldset.from_request(request))
+        data = representation.data(representation.values(self.get_queryset()))
+        return Response({"status": "success", "data": data}, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_description="Create a new playlist (Authenticated users)",
@@ -698,11 +863,14 @@ class PlaylistDetailView(generics.RetrieveUpdateDestroyAPIView):
         operation_description="Retrieve a playlist by ID (public playlists or playlists of authenticated user)",
         responses={
             200: openapi.Response(description="Playlist details"),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
             404: openapi.Response(description="Playlist not found"),
             401: openapi.Response(description="Unauthorized"),
             403: openapi.Response(description="Forbidden")
         }
     )
+    @conditional_response(Playlist, scope='user')
+    @cache_response('playlist:{pk}', scope='user')
     def get(self, request, *args, **kwargs):
         playlist = self.get_object()
         serializer = self.get_serializer(playlist)
@@ -740,32 +908,30 @@ class PlaylistDetailView(generics.RetrieveUpdateDestroyAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Kiểm tra songs_ids là mảng
-        if not isinstance(songs_ids, list):
+        # Kiểm tra songs_ids là mảng và chuẩn hoá ID
+        try:
+            songs_ids = parse_song_ids(songs_ids)
+        except ValueError as e:
             return Response(
-                {"status": "error", "message": "Danh sách bài nhạc phải là một mảng"},
+                {"status": "error", "message": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Kiểm tra các ID bài nhạc có hợp lệ không
-        invalid_ids = [song_id for song_id in songs_ids if not Song.objects.filter(id=song_id).exists()]
+        # Kiểm tra các ID bài nhạc có hợp lệ không (1 query)
+        invalid_ids = missing_song_ids(songs_ids)
         if invalid_ids:
             return Response(
                 {"status": "error", "message": f"Các ID bài nhạc sau không tồn tại: {invalid_ids}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Kiểm tra bài nhạc đã có trong playlist chưa
-        existing_songs = set(playlist.songs.values_list('id', flat=True))
-        new_songs = [song_id for song_id in songs_ids if song_id not in existing_songs]
+        # Thêm các bài nhạc chưa có trong playlist bằng 1 câu INSERT
+        new_songs = add_songs(playlist, songs_ids)
         if not new_songs:
             return Response(
                 {"status": "success", "message": "Tất cả bài nhạc đã có trong playlist"},
                 status=status.HTTP_200_OK
             )
-
-        # Thêm các bài nhạc mới
-        playlist.songs.add(*new_songs)
         serializer = self.get_serializer(playlist)
         return Response(
             {"status": "success", "data": serializer.data},
@@ -852,31 +1018,28 @@ class PlaylistDetailView(generics.RetrieveUpdateDestroyAPIView):
         songs_ids = request.data.get('songs', None)
         if songs_ids is not None:
             # Xóa bài nhạc khỏi playlist
-            if not isinstance(songs_ids, list):
+            try:
+                songs_ids = parse_song_ids(songs_ids)
+            except ValueError as e:
                 return Response(
-                    {"status": "error", "message": "Danh sách bài nhạc phải là một mảng"},
+                    {"status": "error", "message": str(e)},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Kiểm tra các ID bài nhạc có hợp lệ không
-            invalid_ids = [song_id for song_id in songs_ids if not Song.objects.filter(id=song_id).exists()]
+            # Kiểm tra các ID bài nhạc có hợp lệ không (1 query)
+            invalid_ids = missing_song_ids(songs_ids)
             if invalid_ids:
                 return Response(
                     {"status": "error", "message": f"Các ID bài nhạc sau không tồn tại: {invalid_ids}"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Kiểm tra bài nhạc có trong playlist không
-            existing_songs = set(playlist.songs.values_list('id', flat=True))
-            songs_to_remove = [song_id for song_id in songs_ids if song_id in existing_songs]
-            if not songs_to_remove:
+            # Xóa các bài nhạc có trong playlist bằng 1 câu DELETE
+            if not remove_songs(playlist, songs_ids):
                 return Response(
                     {"status": "success", "message": "Không có bài nhạc nào trong playlist để xóa"},
                     status=status.HTTP_200_OK
                 )
-
-            # Xóa các bài nhạc
-            playlist.songs.remove(*songs_to_remove)
             serializer = self.get_serializer(playlist)
             return Response(
                 {"status": "success", "data": serializer.data},
@@ -885,4 +1048,503 @@ class PlaylistDetailView(generics.RetrieveUpdateDestroyAPIView):
 
         # Nếu không có songs trong body, xóa toàn bộ playlist
         playlist.delete()
-        return Response({"status": "success", "message": "Playlist deleted"}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({"status": "success", "message": "Playlist deleted"}, status=status.HTTP_204_NO_CONTENT)
+
+class PlaylistSongsView(generics.GenericAPIView):
+    queryset = Playlist.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Playlist.objects.all()
+        return Playlist.objects.filter(user=user)
+
+    def _parse(self, request):
+        """ Validate the ``songs`` payload; returns (song_ids, error_response) """
+        try:
+            song_ids = parse_song_ids(request.data.get('songs', []))
+        except ValueError as e:
+            return None, Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not song_ids:
+            return None, Response(
+                {"status": "error", "message": "Danh sách bài nhạc không được để trống"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(song_ids) > PLAYLIST_BULK_MAX:
+            return None, Response(
+                {"status": "error", "message": f"Mỗi lần chỉ được gửi tối đa {PLAYLIST_BULK_MAX} bài nhạc"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return song_ids, None
+
+    @swagger_auto_schema(
+        operation_description="Bulk add songs to a playlist (owner or admin). IDs are validated with one query, duplicates are skipped and new rows are written with one bulk insert.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'songs': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Items(type=openapi.TYPE_INTEGER),
+                    description="List of song IDs to add to the playlist"
+                ),
+                'after': openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    description="Insert the new tracks right after this song (optional, default: append)"
+                )
+            },
+            required=['songs']
+        ),
+        responses={
+            200: openapi.Response(
+                description="Songs added",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": {"requested": 3, "added": 2, "skipped": 1}
+                    }
+                }
+            ),
+            400: openapi.Response(description="Bad request"),
+            404: openapi.Response(description="Playlist not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        playlist = self.get_object()
+        song_ids, error = self._parse(request)
+        if error:
+            return error
+
+        invalid_ids = missing_song_ids(song_ids)
+        if invalid_ids:
+            return Response(
+                {"status": "error", "message": f"Các ID bài nhạc sau không tồn tại: {invalid_ids}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        after = request.data.get('after')
+        if after is not None and (isinstance(after, bool) or not isinstance(after, int)):
+            return Response(
+                {"status": "error", "message": f"ID bài nhạc không hợp lệ: {after}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            added = add_songs(playlist, song_ids, after=after)
+        except PlaylistTrack.DoesNotExist as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"status": "success", "data": {"requested": len(song_ids), "added": len(added), "skipped": len(song_ids) - len(added)}},
+            status=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        operation_description="Bulk remove songs from a playlist (owner or admin) with a single delete. Unknown IDs are ignored.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'songs': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Items(type=openapi.TYPE_INTEGER),
+                    description="List of song IDs to remove from the playlist"
+                )
+            },
+            required=['songs']
+        ),
+        responses={
+            200: openapi.Response(
+                description="Songs removed",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": {"requested": 3, "removed": 3}
+                    }
+                }
+            ),
+            400: openapi.Response(description="Bad request"),
+            404: openapi.Response(description="Playlist not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def delete(self, request, *args, **kwargs):
+        playlist = self.get_object()
+        song_ids, error = self._parse(request)
+        if error:
+            return error
+
+        removed = remove_songs(playlist, song_ids)
+        return Response(
+            {"status": "success", "data": {"requested": len(song_ids), "removed": removed}},
+            status=status.HTTP_200_OK
+        )
+
+class PlaylistTracksView(generics.ListAPIView):
+    serializer_class = PlaylistTrackSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = 'position'
+
+    def get_playlists(self):
+        user = self.request.user
+        playlists = Playlist.objects.all()
+        if not user.is_staff:
+            playlists = playlists.filter(models.Q(is_public=True) | models.Q(user=user))
+        return playlists
+
+    def get_playlist(self):
+        return generics.get_object_or_404(self.get_playlists(), pk=self.kwargs['pk'])
+
+    def get_queryset(self):
+        # Mỗi trang là 1 range scan trên index (playlist, position, id)
+        return PlaylistTrack.objects.filter(playlist=self.get_playlist()).select_related('song')
+
+    @swagger_auto_schema(
+        operation_description="List the tracks of a playlist in order, one keyset page at a time",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Tracks per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of tracks",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {"id": 1, "position": 65536, "added_at": "2025-03-23T10:00:00Z", "song": {"id": 1, "title": "Shape of You"}}
+                        ],
+                        "next": "eyJrIjo2NTUzNiwiaSI6MSwiZCI6Im4ifQ==",
+                        "prev": None
+                    }
+                }
+            ),
+            304: openapi.Response(description="Not modified (If-None-Match / If-Modified-Since)"),
+            404: openapi.Response(description="Playlist not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @conditional_response(Playlist, scope='user', favorites=True, queryset='get_playlists')
+    @with_favorite_flags('song')
+    @cache_response('playlist:{pk}', scope='user')
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class PlaylistTrackMoveView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Playlist.objects.all()
+        return Playlist.objects.filter(user=user)
+
+    @swagger_auto_schema(
+        operation_description="Move a track right after another song of the playlist, or to the start when 'after' is null (owner or admin)",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'after': openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    x_nullable=True,
+                    description="Song ID to place the track after; null moves it to the start"
+                )
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Track moved",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": {"song": 5, "position": 98304}
+                    }
+                }
+            ),
+            400: openapi.Response(description="Bad request"),
+            404: openapi.Response(description="Playlist or track not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def patch(self, request, *args, **kwargs):
+        playlist = self.get_object()
+        after = request.data.get('after')
+        if after is not None and (isinstance(after, bool) or not isinstance(after, int)):
+            return Response(
+                {"status": "error", "message": f"ID bài nhạc không hợp lệ: {after}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            track = move_track(playlist, kwargs['song_id'], after=after)
+        except PlaylistTrack.DoesNotExist as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"status": "success", "data": {"song": track.song_id, "position": track.position}},
+            status=status.HTTP_200_OK
+        )
+
+class FavoriteListView(generics.ListAPIView):
+    serializer_class = FavoriteSongSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = '-added_at'
+
+    def get_queryset(self):
+        return FavoriteSong.objects.filter(user=self.request.user).select_related('song')
+
+    @swagger_auto_schema(
+        operation_description="List the authenticated user's favorite songs, most recently liked first",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Favorites per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of favorites",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {"id": 3, "added_at": "2025-03-23T10:00:00Z", "song": {"id": 1, "title": "Shape of You", "is_favorite": True}}
+                        ],
+                        "next": None,
+                        "prev": None
+                    }
+                }
+            ),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @with_favorite_flags('song')
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Like a song",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'song': openapi.Schema(type=openapi.TYPE_INTEGER, description="Song ID")
+            },
+            required=['song']
+        ),
+        responses={
+            201: openapi.Response(description="Song liked"),
+            200: openapi.Response(description="Song was already a favorite"),
+            400: openapi.Response(description="Bad request"),
+            404: openapi.Response(description="Song not found"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        song_id = request.data.get('song')
+        if isinstance(song_id, bool) or not isinstance(song_id, int):
+            return Response(
+                {"status": "error", "message": f"ID bài nhạc không hợp lệ: {song_id}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not Song.objects.filter(pk=song_id).exists():
+            return Response({"status": "error", "message": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if like(request.user, song_id):
+            return Response({"status": "success", "data": {"song": song_id, "is_favorite": True}}, status=status.HTTP_201_CREATED)
+        return Response({"status": "success", "data": {"song": song_id, "is_favorite": True}}, status=status.HTTP_200_OK)
+
+class FavoriteDetailView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Unlike a song",
+        responses={
+            204: openapi.Response(description="Song removed from favorites"),
+            404: openapi.Response(description="Song is not a favorite"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def delete(self, request, *args, **kwargs):
+        if not unlike(request.user, kwargs['song_id']):
+            return Response(
+                {"status": "error", "message": "Bài nhạc không có trong danh sách yêu thích"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({"status": "success", "message": "Favorite removed"}, status=status.HTTP_204_NO_CONTENT)
+
+class ListeningHistoryView(generics.ListAPIView):
+    serializer_class = ListeningHistorySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = '-listened_at'
+
+    def get_queryset(self):
+        # Range scan trên index (user, listened_at, id); chỉ đọc các partition gần nhất
+        return ListeningHistory.objects.filter(user=self.request.user).select_related('song')
+
+    @swagger_auto_schema(
+        operation_description="The authenticated user's recent plays, newest first. Plays older than the retention window are only available from /history/daily/.",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Plays per page"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Page of plays",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {"id": 120, "listened_at": "2025-03-23T10:00:00Z", "duration_listened": "00:03:12", "song": {"id": 1, "title": "Shape of You"}}
+                        ],
+                        "next": "eyJrIjoiMjAyNS0wMy0yM1QxMDowMDowMFoiLCJpIjoxMjAsImQiOiJuIn0=",
+                        "prev": None
+                    }
+                }
+            ),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @with_favorite_flags('song')
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class DailyListeningView(generics.ListAPIView):
+    serializer_class = DailyListeningSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = '-day'
+
+    def get_queryset(self):
+        return DailyListeningAggregate.objects.filter(user=self.request.user).select_related('song')
+
+    @swagger_auto_schema(
+        operation_description="The authenticated user's compacted history: plays per song per day for months past the retention window, newest first",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor from next/prev"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Rows per page"),
+        ],
+        responses={
+            200: openapi.Response(description="Page of daily aggregates"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    @with_favorite_flags('song')
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class ChartView(generics.GenericAPIView):
+    serializer_class = SongSerializer
+
+    @swagger_auto_schema(
+        operation_description="Top songs for a day, an ISO week or the last 24 hours, optionally within one genre. Served from pre-aggregated play buckets.",
+        manual_parameters=[
+            openapi.Parameter('period', openapi.IN_QUERY, description="day, week (default) or trending (last 24 hours)", type=openapi.TYPE_STRING),
+            openapi.Parameter('genre', openapi.IN_QUERY, description="Genre ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('date', openapi.IN_QUERY, description="Day inside the period, YYYY-MM-DD (default: today)", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Number of songs (default 50, max 200)", type=openapi.TYPE_INTEGER)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Chart",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": [
+                            {
+                                "rank": 1,
+                                "plays": 1520,
+                                "song": {
+                                    "id": 1,
+                                    "title": "Song Title",
+                                    "artist": 1,
+                                    "album": 1,
+                                    "genre": 1,
+                                    "song_image": "https://res.cloudinary.com/your_cloud_name/image/upload/artists/image.jpg",
+                                    "duration": "00:03:30",
+                                    "lyrics": "Song lyrics",
+                                    "total_plays": 0,
+                                    "release_date": "2023-01-01"
+                                }
+                            }
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(description="Bad request")
+        }
+    )
+    @with_favorite_flags('song')
+    @cache_response('chart', 'song')
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        period = params.get('period', 'week')
+        if period not in CHART_PERIODS:
+            return Response(
+                {"status": "error", "message": f"period phải là một trong: {', '.join(CHART_PERIODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            genre_id = int(params['genre']) if params.get('genre') else None
+            limit = min(max(int(params.get('limit', CHART_SIZE)), 1), MAX_CHART_SIZE)
+            day = date.fromisoformat(params['date']) if params.get('date') else None
+        except ValueError:
+            return Response(
+                {"status": "error", "message": "Tham số genre, limit hoặc date không hợp lệ"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        chart = top_songs(period, genre_id=genre_id, day=day, limit=limit)
+        songs = self.get_serializer([song for song, _ in chart], many=True).data
+        data = [
+            {"rank": rank, "plays": plays, "song": song}
+            for rank, ((_, plays), song) in enumerate(zip(chart, songs), start=1)
+        ]
+        return Response({"status": "success", "data": data}, status=status.HTTP_200_OK)
+
+class PlayEventView(generics.GenericAPIView):
+    serializer_class = PlayEventBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Record a batch of playback events for the authenticated user. Events are buffered and written in bulk.",
+        request_body=PlayEventBatchSerializer,
+        responses={
+            202: openapi.Response(
+                description="Events accepted",
+                examples={
+                    "application/json": {
+                        "status": "success",
+                        "data": {"accepted": 2}
+                    }
+                }
+            ),
+            400: openapi.Response(description="Bad request"),
+            401: openapi.Response(description="Unauthorized")
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"status": "error", "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        events = [
+            {
+                'user_id': request.user.id,
+                'song_id': event['song'],
+                'duration_listened': timedelta(seconds=event['duration_listened']),
+                # Không tin thời điểm ở tương lai do client gửi lên
+                'listened_at': min(event.get('listened_at') or now, now),
+            }
+            for event in serializer.validated_data['events']
+        ]
+        play_event_buffer.add(events)
+        return Response({"status": "success", "data": {"accepted": len(events)}}, status=status.HTTP_202_ACCEPTED)
+
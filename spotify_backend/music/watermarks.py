@@ -0,0 +1,96 @@
+"""
+Incremental readers of ListeningHistory.
+
+Jobs read history in id order past their ``JobWatermark``. Ids come from a
+sequence, but flush transactions commit out of id order: when a job reads
+id 105, row 100 may still be in flight and would never be read again. So
+every hole a job steps over is kept in ``JobWatermark.gaps`` with the time
+it was first seen and re-read on the following runs. A hole still empty
+after ``GAP_GRACE_SECONDS`` belongs to a rolled back transaction and is
+forgotten.
+"""
+import bisect
+import logging
+import time
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import JobWatermark, ListeningHistory
+
+logger = logging.getLogger(__name__)
+
+# Thời gian tối đa một transaction ghi lịch sử nghe có thể chạy (kể cả retry của PlayEventBuffer)
+GAP_GRACE_SECONDS = getattr(settings, 'MUSIC_HISTORY_GAP_GRACE_SECONDS', 600)
+# Số khoảng trống tối đa được theo dõi cho mỗi job
+MAX_GAPS = getattr(settings, 'MUSIC_HISTORY_MAX_GAPS', 1000)
+
+
+def _without(gaps, ids):
+    """ ``gaps`` (``[low, high, seen]``) minus the sorted ``ids`` """
+    remaining = []
+    for low, high, seen in gaps:
+        start = low
+        for pk in ids[bisect.bisect_left(ids, low):bisect.bisect_right(ids, high)]:
+            if pk > start:
+                remaining.append([start, pk - 1, seen])
+            start = pk + 1
+        if start <= high:
+            remaining.append([start, high, seen])
+    return remaining
+
+
+class HistoryCursor:
+    """
+    Position of one job in ListeningHistory. ``batches()`` yields the rows
+    that filled known gaps, then new rows in id order; the caller writes
+    what it derived from a batch and calls ``advance(rows)`` in the same
+    transaction, so an interrupted run resumes exactly where it stopped.
+    """
+
+    def __init__(self, name, grace=GAP_GRACE_SECONDS):
+        self.watermark, _ = JobWatermark.objects.get_or_create(name=name)
+        self.position = self.watermark.position
+        now = time.time()
+        self.gaps = [gap for gap in self.watermark.gaps if now - gap[2] < grace]
+
+    def batches(self, columns, chunk_size):
+        """ Lists of ``values_list('id', *columns)`` rows """
+        if self.gaps:
+            late = list(
+                ListeningHistory.objects.filter(reduce(or_, (Q(id__range=(low, high)) for low, high, _ in self.gaps)))
+                .order_by('id')
+                .values_list('id', *columns)
+            )
+            if late:
+                yield late
+        while True:
+            rows = list(
+                ListeningHistory.objects.filter(id__gt=self.position)
+                .order_by('id')
+                .values_list('id', *columns)[:chunk_size]
+            )
+            if not rows:
+                return
+            yield rows
+
+    def advance(self, rows):
+        ids = sorted(row[0] for row in rows)
+        gaps = _without(self.gaps, [pk for pk in ids if pk <= self.position])
+        now = time.time()
+        # Lần chạy đầu không có gì phía trước để chờ
+        previous = self.position if self.position else None
+        for pk in ids:
+            if pk <= self.position:
+                continue
+            if previous is not None and pk > previous + 1:
+                gaps.append([previous + 1, pk - 1, now])
+            previous = pk
+        if len(gaps) > MAX_GAPS:
+            logger.warning('%s: bỏ %d khoảng trống cũ nhất', self.watermark.name, len(gaps) - MAX_GAPS)
+            gaps = sorted(gaps, key=lambda gap: gap[2])[-MAX_GAPS:]
+        self.position = max(self.position, ids[-1]) if ids else self.position
+        self.gaps = sorted(gaps)
+        JobWatermark.objects.filter(pk=self.watermark.pk).update(position=self.position, gaps=self.gaps)
@@ -39,7 +39,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
+    'channels',
     'music',
     'payment',
     'chat',
@@ -53,13 +55,17 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
 }
 
+# Keyset pagination cho các endpoint danh sách của app music
+MUSIC_PAGE_SIZE = 50
+MUSIC_MAX_PAGE_SIZE = 200
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -68,15 +74,68 @@ SIMPLE_JWT = {
 }
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
+# Giây giữ user đã xác thực trong cache (xem accounts/authentication.py)
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Cache dùng chung cho các endpoint đọc của app music (xem music/cache.py).
+# Đặt CACHE_URL (vd: redis://127.0.0.1:6379/1) để dùng Redis, mặc định là LocMem.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'spotify-backend',
+        },
+    }
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],  # Redis chạy trên localhost:6379
+MUSIC_CACHE_TIMEOUT = 300
+MUSIC_CACHE_STALE_GRACE = 60
+
+# Ghi sự kiện nghe nhạc theo lô (xem music/playback.py)
+PLAY_EVENT_MAX_BATCH = 500
+PLAY_EVENT_FLUSH_SIZE = 500
+PLAY_EVENT_FLUSH_INTERVAL = 2.0
+
+# Số bài nhạc tối đa cho 1 lần thêm/xóa hàng loạt vào playlist
+PLAYLIST_BULK_MAX = 10000
+
+ASGI_APPLICATION = 'spotify_backend.asgi.application'
+
+# Đặt CHANNEL_REDIS_URL rỗng để dùng InMemoryChannelLayer (chỉ chạy được 1 process, dùng cho test)
+CHANNEL_REDIS_URL = config('CHANNEL_REDIS_URL', default='redis://127.0.0.1:6379')
+# Hàng đợi mỗi socket; mặc định 100 sẽ rớt tin khi 1 user nhận dồn dập
+CHANNEL_CAPACITY = 1000
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [CHANNEL_REDIS_URL],
+                "capacity": CHANNEL_CAPACITY,
+            },
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {
+                "capacity": CHANNEL_CAPACITY,
+            },
+        },
+    }
+
+# Ghi tin nhắn chat theo lô (xem chat/persistence.py)
+CHAT_FLUSH_SIZE = 200
+CHAT_FLUSH_INTERVAL = 0.5
+CHAT_MAX_MESSAGE_LENGTH = 4000
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
@@ -134,12 +193,16 @@ DATABASES = {
 
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@yourdomain.com')
+# Email được gửi bởi worker send_outbox (xem emailLogin/outbox.py)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
 
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': config('CLOUD_NAME'),
@@ -23,7 +23,8 @@ urlpatterns = [
      path('api', include([
         path('/', include('accounts.urls')),
         path('/', include('emailLogin.urls')),
-        path('/music/', include('music.urls'))
+        path('/music/', include('music.urls')),
+        path('/chat/', include('chat.urls'))
     ])),
 
 